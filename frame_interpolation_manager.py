@@ -47,6 +47,13 @@ class FrameInterpolationWorker(QThread):
             self.progress_updated.emit(f"开始处理: {os.path.basename(self.input_path)}")
             self.progress_updated.emit(f"命令: {' '.join(cmd)}")
             
+            # 插帧占用大量内存，让常驻的TTS模型在空闲时卸载权重，下次合成时自动重新加载
+            try:
+                from tts_manager import release_synthesis_engine_memory
+                release_synthesis_engine_memory()
+            except ImportError:
+                pass
+            
             # 执行ffmpeg命令
             process = subprocess.Popen(
                 cmd,
@@ -244,7 +244,12 @@ class BigVGAN(torch.nn.Module):
 
         # post conv
         x = self.activation_post(x)
-        x = self.conv_post(x)
+        if x.device.type == "cpu" and torch.is_autocast_cpu_enabled():
+            # CPU bf16 autocast: 输出层保持 fp32，避免 bf16 精度带来的量化噪声
+            with torch.autocast("cpu", enabled=False):
+                x = self.conv_post(x.float())
+        else:
+            x = self.conv_post(x)
         x = torch.tanh(x)
 
         return x, contrastive_loss
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+并发请求合并。
+
+``BatchingQueue`` 把短时间内到达的同音色请求（相同参考音频和生成参数）合并为一次 ``IndexTTS.infer_batch``，
+各请求的分句混合分桶、一起批量解码；合并后的任务提交给 ``SynthesisEngine`` 执行，仍遵循引擎的优先级调度。
+引擎上已有本队列的任务在执行时，新请求继续等待合并，负载越高批次越大。
+"""
+import json
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple
+
+from indextts.engine import PRIORITY_INTERACTIVE, SynthesisEngine
+
+
+class _BatchRequest:
+    def __init__(self, text: str, output_path: Optional[str], seed: Optional[int], kwargs: Dict, future: Future,
+                 progress: Optional[Callable] = None):
+        self.text = text
+        self.output_path = output_path
+        self.seed = seed
+        self.kwargs = kwargs
+        self.future = future
+        self.progress = progress
+        self.arrival = time.perf_counter()
+
+
+def _fan_out_progress(batch: List[_BatchRequest]) -> Optional[Callable]:
+    """把批次的合成进度转发给批次中每个请求各自的进度回调"""
+    callbacks = [request.progress for request in batch if request.progress is not None]
+    if not callbacks:
+        return None
+    if len(batch) == 1:
+        return callbacks[0]
+
+    def progress(value, desc=None):
+        desc = f"{desc} ({len(batch)} requests merged)" if desc else desc
+        for callback in callbacks:
+            try:
+                callback(value, desc=desc)
+            except Exception:
+                # 某个请求的进度显示出错（如页面已关闭）不影响整批合成
+                pass
+    return progress
+
+
+class BatchingQueue:
+    """
+    合并同音色的并发请求。
+
+    一组请求在以下任一条件满足时提交给引擎：
+        - 达到 ``max_batch_size``
+        - 最早的请求已等待 ``max_wait`` 秒，且引擎上本队列执行中 / 排队中的批次少于 ``max_inflight``
+
+    Example:
+        batching = BatchingQueue(engine, max_batch_size=8, max_wait=0.03)
+        futures = [batching.submit("voice.wav", text, seed=i) for i, text in enumerate(texts)]
+        sampling_rate, wav_data = futures[0].result()
+    """
+
+    def __init__(self, engine: SynthesisEngine, max_batch_size: int = 8, max_wait: float = 0.03, max_inflight: int = 1,
+                 priority: int = PRIORITY_INTERACTIVE):
+        """
+        Args:
+            max_batch_size: 每批最多合并的请求数
+            max_wait: 第一个请求到达后最多等待多少秒再提交（引擎空闲时）
+            max_inflight: 已提交给引擎、尚未完成的批次上限，达到上限时继续累积请求
+            priority: 提交给引擎的优先级
+        """
+        self.engine = engine
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_inflight = max_inflight
+        self.priority = priority
+        # 合并键 -> 等待中的请求，合并键由参考音频和生成参数决定
+        self._pending: Dict[Tuple[str, str], List[_BatchRequest]] = {}
+        self._requests: Dict[Future, Tuple[Tuple[str, str], _BatchRequest]] = {}
+        self._inflight = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self.stats = dict(requests=0, batches=0, max_batch_size=0, failed_batches=0)
+        self._thread = threading.Thread(target=self._run, name="tts_batching", daemon=True)
+        self._thread.start()
+
+    def submit(self, audio_prompt, text, output_path=None, seed=None, progress=None, **kwargs) -> Future:
+        """
+        提交一个请求，``kwargs`` 为 ``infer_batch`` 的生成参数（``max_text_tokens_per_sentence``、``top_p`` 等），
+        参数完全相同的请求才会合并。
+        ``progress(value, desc=...)`` 为本请求的进度回调（如 ``gr.Progress``），接收所在批次的合成进度。
+
+        Returns:
+            ``Future``，结果为输出路径或 ``(sampling_rate, wav_data)``
+        """
+        key = (audio_prompt, json.dumps(kwargs, sort_keys=True, default=str))
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("BatchingQueue is closed")
+            request = _BatchRequest(text, output_path, seed, kwargs, future, progress)
+            self._pending.setdefault(key, []).append(request)
+            self._requests[future] = (key, request)
+            self._cond.notify()
+        return future
+
+    def cancel(self, future: Future) -> bool:
+        """取消尚未提交给引擎的请求；已在批次中的请求无法单独取消，返回 False"""
+        with self._cond:
+            entry = self._requests.get(future)
+            if entry is None:
+                return False
+            key, request = entry
+            group = self._pending.get(key)
+            if group is None or request not in group:
+                return False
+            group.remove(request)
+            if not group:
+                del self._pending[key]
+            del self._requests[future]
+        future.cancel()
+        return True
+
+    @property
+    def pending(self) -> int:
+        with self._cond:
+            return sum(len(group) for group in self._pending.values())
+
+    def _take_ready(self) -> Tuple[List[Tuple[Tuple[str, str], List[_BatchRequest]]], Optional[float]]:
+        """取出可以提交的批次，并返回下一次需要检查的等待时间"""
+        now = time.perf_counter()
+        ready = []
+        timeout = None
+        for key in list(self._pending.keys()):
+            group = self._pending[key]
+            waited = now - group[0].arrival
+            full = len(group) >= self.max_batch_size
+            if full or self._closed or (waited >= self.max_wait and self._inflight < self.max_inflight):
+                batch, rest = group[:self.max_batch_size], group[self.max_batch_size:]
+                if rest:
+                    self._pending[key] = rest
+                else:
+                    del self._pending[key]
+                ready.append((key, batch))
+                self._inflight += 1
+            elif waited < self.max_wait:
+                timeout = min(timeout, self.max_wait - waited) if timeout is not None else self.max_wait - waited
+        return ready, timeout
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    ready, timeout = self._take_ready()
+                    if ready or (self._closed and not self._pending):
+                        break
+                    self._cond.wait(timeout)
+            if not ready:
+                break
+            for key, batch in ready:
+                self._dispatch(key[0], batch)
+
+    def _dispatch(self, audio_prompt, batch: List[_BatchRequest]):
+        with self._cond:
+            for request in batch:
+                self._requests.pop(request.future, None)
+            self.stats["requests"] += len(batch)
+            self.stats["batches"] += 1
+            self.stats["max_batch_size"] = max(self.stats["max_batch_size"], len(batch))
+        batch = [request for request in batch if request.future.set_running_or_notify_cancel()]
+        if not batch:
+            self._batch_done()
+            return
+        try:
+            job = self.engine.submit_batch(audio_prompt, [request.text for request in batch],
+                                           output_paths=[request.output_path for request in batch],
+                                           seeds=[request.seed for request in batch], priority=self.priority,
+                                           progress=_fan_out_progress(batch), **batch[0].kwargs)
+        except Exception as e:
+            self._batch_done()
+            for request in batch:
+                request.future.set_exception(e)
+            return
+        job.add_done_callback(lambda f: self._on_batch_done(audio_prompt, batch, f))
+
+    def _on_batch_done(self, audio_prompt, batch: List[_BatchRequest], job: Future):
+        try:
+            results = job.result()
+        except BaseException as e:
+            with self._cond:
+                self.stats["failed_batches"] += 1
+            if len(batch) > 1 and isinstance(e, (ValueError, RuntimeError)) and not self._closed:
+                # 逐个重试，只让出错的请求失败（例如正则化后为空的文本）
+                self._batch_done()
+                for request in batch:
+                    self._retry_alone(audio_prompt, request)
+                return
+            for request in batch:
+                request.future.set_exception(e)
+        else:
+            for request, result in zip(batch, results):
+                request.future.set_result(result)
+        self._batch_done()
+
+    def _retry_alone(self, audio_prompt, request: _BatchRequest):
+        try:
+            job = self.engine.submit_batch(audio_prompt, [request.text], output_paths=[request.output_path],
+                                           seeds=[request.seed], priority=self.priority, progress=request.progress,
+                                           **request.kwargs)
+        except Exception as e:
+            request.future.set_exception(e)
+            return
+
+        def done(f: Future):
+            try:
+                request.future.set_result(f.result()[0])
+            except BaseException as e:
+                request.future.set_exception(e)
+        job.add_done_callback(done)
+
+    def _batch_done(self):
+        with self._cond:
+            self._inflight -= 1
+            self._cond.notify()
+
+    def close(self):
+        """提交所有等待中的请求后停止合并线程（不关闭引擎）"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
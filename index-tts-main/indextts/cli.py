@@ -4,9 +4,222 @@ import warnings
 # Suppress warnings from tensorflow and other libraries
 warnings.filterwarnings("ignore", category=UserWarning)
 warnings.filterwarnings("ignore", category=FutureWarning)
+
+
+# 批量任务中除生成参数（``indextts.params.GENERATION_FIELDS``）外允许的字段，``error`` 为失败任务文件中记录的错误
+BATCH_JOB_FIELDS = ("id", "text", "voice", "output", "seed", "error")
+
+
+def _resolve_device(args):
+    import torch
+    if args.device is None:
+        if torch.cuda.is_available():
+            args.device = "cuda:0"
+        elif torch.mps.is_available():
+            args.device = "mps"
+        else:
+            args.device = "cpu"
+            args.fp16 = False # Disable FP16 on CPU
+            print("WARNING: Running on CPU may be slow.")
+    elif args.device.startswith("cpu"):
+        args.fp16 = False
+
+
+def load_batch_jobs(jobs_path, default_voice=None, output_dir="outputs"):
+    """
+    读取 JSONL 任务文件，每行一个任务：
+        {"text": "...", "voice": "prompt.wav", "output": "out/1.wav", "seed": 1, "top_p": 0.8, ...}
+    ``voice`` 默认为 ``--voice``，``output`` 默认为 ``<output_dir>/<id 或行号>.wav``，其余字段为 ``infer_batch`` 的生成参数。
+    Returns:
+        ``(jobs, invalid)``：有效任务列表（附加 ``params``、``line``），以及 ``(原始任务, 错误信息)`` 列表，
+        无法解析的行以原始字符串记录
+    """
+    import json
+    from indextts.params import GENERATION_FIELDS
+
+    jobs, invalid = [], []
+    with open(jobs_path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                job = json.loads(line)
+            except json.JSONDecodeError as e:
+                invalid.append((line, f"line {line_no}: invalid JSON: {e}"))
+                continue
+            if not isinstance(job, dict):
+                invalid.append((line, f"line {line_no}: job must be a JSON object"))
+                continue
+            unknown = [k for k in job if k not in BATCH_JOB_FIELDS and k not in GENERATION_FIELDS]
+            text = job.get("text")
+            voice = job.get("voice") or default_voice
+            if unknown:
+                invalid.append((job, f"line {line_no}: unknown fields: {', '.join(unknown)}"))
+            elif not isinstance(text, str) or len(text.strip()) == 0:
+                invalid.append((job, f"line {line_no}: text is empty"))
+            elif not voice or not os.path.isfile(voice):
+                invalid.append((job, f"line {line_no}: audio prompt file {voice} does not exist"))
+            else:
+                jobs.append(dict(job=job, line=line_no, text=text.strip(), voice=voice, seed=job.get("seed"),
+                                 output=job.get("output") or os.path.join(output_dir, f"{job.get('id', line_no)}.wav"),
+                                 params={k: v for k, v in job.items() if k in GENERATION_FIELDS}))
+    return jobs, invalid
+
+
+def run_batch_jobs(tts, jobs, max_batch_size=8, writers=4, on_failed=None):
+    """
+    按音色和生成参数分组，每组每 ``max_batch_size`` 个任务调用一次 ``infer_batch``，音频交给写入线程池保存，GPU 继续下一批。
+    一批失败时逐个重试，只有出错的任务失败。
+    Args:
+        on_failed: ``on_failed(job, error)``，任务失败时调用，默认只打印错误
+    Returns:
+        成功任务的音频总时长（秒）
+    """
+    import json
+    import torch
+    import torchaudio
+    from concurrent.futures import ThreadPoolExecutor
+
+    if on_failed is None:
+        def on_failed(job, error):
+            print(f">> job at line {job['line']} failed: {error}")
+
+    def save(job, sampling_rate, wav_data):
+        if os.path.dirname(job["output"]) != "":
+            os.makedirs(os.path.dirname(job["output"]), exist_ok=True)
+        torchaudio.save(job["output"], torch.from_numpy(wav_data.T), sampling_rate)
+        return wav_data.shape[0] / sampling_rate
+
+    def synthesize(group):
+        results = tts.infer_batch(group[0]["voice"], [job["text"] for job in group],
+                                  seeds=[job["seed"] for job in group], **group[0]["params"])
+        return [(job, pool.submit(save, job, *result)) for job, result in zip(group, results)]
+
+    # 保持任务首次出现的顺序分组
+    groups = {}
+    for job in jobs:
+        groups.setdefault((job["voice"], json.dumps(job["params"], sort_keys=True)), []).append(job)
+    audio_seconds = 0.0
+    done = 0
+    with ThreadPoolExecutor(max_workers=writers, thread_name_prefix="batch_writer") as pool:
+        pending_writes = []
+        for group_jobs in groups.values():
+            for start in range(0, len(group_jobs), max_batch_size):
+                group = group_jobs[start:start + max_batch_size]
+                try:
+                    pending_writes.extend(synthesize(group))
+                except (KeyboardInterrupt, SystemExit):
+                    raise
+                except Exception as e:
+                    if len(group) == 1:
+                        on_failed(group[0], f"{type(e).__name__}: {e}")
+                    else:
+                        print(f">> batch of {len(group)} jobs failed ({type(e).__name__}: {e}), retrying one by one")
+                        for job in group:
+                            try:
+                                pending_writes.extend(synthesize([job]))
+                            except Exception as e:
+                                on_failed(job, f"{type(e).__name__}: {e}")
+                done += len(group)
+                print(f">> batch progress: {done}/{len(jobs)} jobs")
+        for job, write in pending_writes:
+            try:
+                audio_seconds += write.result()
+            except Exception as e:
+                on_failed(job, f"write failed: {type(e).__name__}: {e}")
+    return audio_seconds
+
+
+def batch_main(argv=None):
+    import argparse
+    import json
+    import time
+    parser = argparse.ArgumentParser(prog="indextts batch", description="Synthesize many texts from a JSONL job file with a single model load")
+    parser.add_argument("jobs", type=str, help="JSONL file, one job per line: text, voice, output, seed and generation parameters")
+    parser.add_argument("-v", "--voice", type=str, default=None, help="Default audio prompt for jobs without `voice`")
+    parser.add_argument("-o", "--output_dir", type=str, default="outputs", help="Directory for jobs without `output`. Default is 'outputs'")
+    parser.add_argument("-c", "--config", type=str, default="checkpoints/config.yaml", help="Path to the config file. Default is 'checkpoints/config.yaml'")
+    parser.add_argument("--model_dir", type=str, default="checkpoints", help="Path to the model directory. Default is 'checkpoints'")
+    parser.add_argument("--fp16", action="store_true", default=True, help="Use FP16 for inference if available")
+    parser.add_argument("-d", "--device", type=str, default=None, help="Device to run the model on (cpu, cuda, mps)." )
+    parser.add_argument("-f", "--force", action="store_true", default=False, help="Overwrite existing outputs instead of skipping those jobs")
+    parser.add_argument("--max_batch_size", type=int, default=8, help="Maximum number of jobs synthesized in one batch")
+    parser.add_argument("--writers", type=int, default=4, help="Number of threads writing output files")
+    parser.add_argument("--failed", type=str, default=None, help="Where to write failed jobs. Default is '<jobs>.failed.jsonl'")
+    parser.add_argument("--cache_dir", type=str, default=None, help="Enable the sentence cache in this directory")
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.jobs):
+        print(f"Job file {args.jobs} does not exist.")
+        sys.exit(1)
+    if not os.path.exists(args.config):
+        print(f"Config file {args.config} does not exist.")
+        parser.print_help()
+        sys.exit(1)
+    failed_path = args.failed or os.path.splitext(args.jobs)[0] + ".failed.jsonl"
+
+    jobs, invalid = load_batch_jobs(args.jobs, args.voice, args.output_dir)
+    failed = [(job, error) for job, error in invalid]
+    for _, error in invalid:
+        print(f"WARNING: skipped invalid job, {error}")
+    total = len(jobs) + len(invalid)
+    skipped = 0
+    if not args.force:
+        # 已有输出的任务视为已完成，重跑同一任务文件即可续跑
+        skipped = len([job for job in jobs if os.path.exists(job["output"])])
+        jobs = [job for job in jobs if not os.path.exists(job["output"])]
+
+    try:
+        import torch
+    except ImportError:
+        print("ERROR: PyTorch is not installed. Please install it first.")
+        sys.exit(1)
+    _resolve_device(args)
+
+    from indextts.infer import IndexTTS
+    start_time = time.perf_counter()
+    audio_seconds = 0.0
+    if jobs:
+        tts = IndexTTS(cfg_path=args.config, model_dir=args.model_dir, is_fp16=args.fp16, device=args.device)
+        if args.cache_dir:
+            tts.enable_sentence_cache(args.cache_dir)
+        load_time = time.perf_counter() - start_time
+        synthesis_start = time.perf_counter()
+        try:
+            audio_seconds = run_batch_jobs(tts, jobs, args.max_batch_size, args.writers,
+                                           on_failed=lambda job, error: failed.append((job["job"], error)))
+        except KeyboardInterrupt:
+            # 未完成的任务一并写入失败任务文件，之后可重跑
+            print(">> interrupted, unfinished jobs are written to the failed job file")
+            failed_jobs = {id(job) for job, _ in failed}
+            failed.extend((job["job"], "interrupted") for job in jobs
+                          if id(job["job"]) not in failed_jobs and not os.path.exists(job["output"]))
+        synthesis_time = time.perf_counter() - synthesis_start
+    else:
+        load_time = synthesis_time = 0.0
+
+    succeeded = total - skipped - len(failed)
+    print(f">> batch finished: {succeeded} succeeded, {skipped} skipped (output exists), {len(failed)} failed, {total} total")
+    print(f">> model load: {load_time:.2f} seconds, synthesis: {synthesis_time:.2f} seconds")
+    if synthesis_time > 0 and succeeded > 0:
+        print(f">> throughput: {succeeded / synthesis_time * 60:.1f} jobs/min, "
+              f"{audio_seconds / synthesis_time:.2f} audio seconds/s, RTF: {synthesis_time / audio_seconds:.4f}")
+    if failed:
+        with open(failed_path, "w", encoding="utf-8") as f:
+            for job, error in failed:
+                # 无法解析的行原样写回，修改后即可重跑
+                f.write((json.dumps(dict(job, error=error), ensure_ascii=False) if isinstance(job, dict) else job) + "\n")
+        print(f">> failed jobs saved to: {failed_path}, retry with: indextts batch {failed_path}")
+        sys.exit(1)
+    elif os.path.exists(failed_path):
+        os.remove(failed_path)
+
+
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        return batch_main(sys.argv[2:])
     import argparse
-    parser = argparse.ArgumentParser(description="IndexTTS Command Line")
+    parser = argparse.ArgumentParser(description="IndexTTS Command Line. Use `indextts batch jobs.jsonl` to synthesize many texts with one model load")
     parser.add_argument("text", type=str, help="Text to be synthesized")
     parser.add_argument("-v", "--voice", type=str, required=True, help="Path to the audio prompt file (wav format)")
     parser.add_argument("-o", "--output_path", type=str, default="gen.wav", help="Path to the output wav file")
@@ -15,6 +228,12 @@ def main():
     parser.add_argument("--fp16", action="store_true", default=True, help="Use FP16 for inference if available")
     parser.add_argument("-f", "--force", action="store_true", default=False, help="Force to overwrite the output file if it exists")
     parser.add_argument("-d", "--device", type=str, default=None, help="Device to run the model on (cpu, cuda, mps)." )
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible sampling. Default is not fixed.")
+    parser.add_argument("--bf16", action="store_true", default=False, help="Use bfloat16 autocast for CPU inference")
+    parser.add_argument("--long_form", action="store_true", default=False, help="Write audio to the output file sentence by sentence to bound memory for long texts")
+    parser.add_argument("--ref_max_seconds", type=float, default=None, help="Trim silence from the audio prompt and use at most this many seconds of it")
+    parser.add_argument("--trace", type=str, default=None, help="Write per-stage timings (including model loading) to this Chrome trace JSON file")
+    parser.add_argument("--memory_profile", action="store_true", default=False, help="Report peak memory per stage and suggest batch limits for the available memory")
     args = parser.parse_args()
     if len(args.text.strip()) == 0:
         print("ERROR: Text is empty.")
@@ -44,19 +263,37 @@ def main():
         print("ERROR: PyTorch is not installed. Please install it first.")
         sys.exit(1)
 
-    if args.device is None:
-        if torch.cuda.is_available():
-            args.device = "cuda:0"
-        elif torch.mps.is_available():
-            args.device = "mps"
-        else:
-            args.device = "cpu"
-            args.fp16 = False # Disable FP16 on CPU
-            print("WARNING: Running on CPU may be slow.")
+    _resolve_device(args)
 
     from indextts.infer import IndexTTS
-    tts = IndexTTS(cfg_path=args.config, model_dir=args.model_dir, is_fp16=args.fp16, device=args.device)
-    tts.infer(audio_prompt=args.voice, text=args.text.strip(), output_path=output_path)
+    if args.bf16 and torch.device(args.device).type != "cpu":
+        print("WARNING: --bf16 is only supported on CPU, ignored.")
+        args.bf16 = False
+    tts = IndexTTS(cfg_path=args.config, model_dir=args.model_dir, is_fp16=args.fp16, device=args.device,
+                   dtype="bfloat16" if args.bf16 else None)
+    if args.ref_max_seconds is not None:
+        tts.set_reference_options(trim_silence=True, max_seconds=args.ref_max_seconds)
+    if args.memory_profile:
+        tts.enable_memory_profiling()
+    tts.infer(audio_prompt=args.voice, text=args.text.strip(), output_path=output_path, seed=args.seed,
+              long_form=args.long_form)
+    if args.memory_profile:
+        profile = tts.last_profile
+        print(">> peak memory:", ", ".join(f"{k}: {v} MB" for k, v in profile.meta.items() if k.startswith("peak_")))
+        for span in profile.spans:
+            if span.name in ("generate", "vocode") and "peak_rss_mb" in span.attrs:
+                parts = [f"peak RSS {span.attrs['peak_rss_mb']} MB"]
+                if "peak_accelerator_mb" in span.attrs:
+                    parts.append(f"accelerator {span.attrs['peak_accelerator_mb']} MB")
+                if "kv_cache_mb" in span.attrs:
+                    parts.append(f"KV cache {span.attrs['kv_cache_mb']} MB")
+                print(f"   {span.name} {span.attrs.get('sentence', span.attrs.get('sentences', ''))}:", ", ".join(parts))
+        print(">> suggested infer_fast limits:", tts.suggest_generation_limits())
+    if args.trace:
+        profile = tts.last_profile
+        profile.extend(tts.load_profile)
+        profile.save_chrome_trace(args.trace)
+        print(">> chrome trace saved to:", args.trace)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,337 @@
+# -*- coding: utf-8 -*-
+"""
+常驻合成引擎。
+
+``SynthesisEngine`` 在后台线程中常驻加载一个 ``IndexTTS``，所有合成请求进入同一个优先级队列：
+交互试听（``PRIORITY_INTERACTIVE``）排在批量渲染（``PRIORITY_BATCH``）之前，同优先级按提交顺序执行。
+高优先级任务到达时，正在执行的低优先级任务在下一个分句边界让出，试听完成后自动重新排队继续；
+已完成的分句从分句缓存中复用（需先 ``enable_sentence_cache``），不会重复合成。
+可选的内存策略：空闲一段时间、设备可用内存不足或应用主动请求时卸载模型权重（``IndexTTS.offload_weights``），
+下一个任务开始前再重新加载。
+启用 ``warmup`` 时，模型加载后以最低优先级在后台预热（``IndexTTS.warmup``），第一次试听不再承担冷启动开销。
+"""
+import heapq
+import itertools
+import threading
+import time
+import traceback
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+
+from indextts.infer import IndexTTS
+from indextts.utils.memory import MB, available_memory
+from indextts.utils.cancellation import CancellationToken, SynthesisCancelled, SynthesisPreempted
+from indextts.utils.log import get_logger
+
+
+logger = get_logger("engine")
+
+# 数值越小优先级越高
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+# 预热排在所有合成任务之后，有任务到达时让出，之后从未完成的批大小继续
+PRIORITY_WARMUP = 20
+
+
+class _EngineJob:
+    def __init__(self, priority: int, seq: int, method: str, kwargs: Dict, future: Future,
+                 progress: Optional[Callable] = None):
+        self.priority = priority
+        self.seq = seq
+        self.method = method
+        self.kwargs = kwargs
+        self.future = future
+        self.progress = progress
+        self.token = CancellationToken()
+        self.started = False
+        self.preemptions = 0
+
+    def __lt__(self, other: "_EngineJob"):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class SynthesisEngine:
+    """
+    常驻模型 + 优先级调度。
+
+    ``infer`` 任务在每个分句之间检查抢占，``infer_fast`` 任务在长文本模式的窗口之间检查（非长文本模式下整段执行完才让出）。
+    被抢占的任务保留原来的提交序号重新入队，因此在同优先级任务中仍排在最前面。
+
+    Example:
+        engine = SynthesisEngine("checkpoints/config.yaml", "checkpoints",
+                                 setup=lambda tts: tts.enable_sentence_cache("cache/tts_sentences"))
+        batch = [engine.submit("voice.wav", text, f"outputs/{i}.wav") for i, text in enumerate(texts)]
+        preview = engine.submit("voice.wav", edited_text, "outputs/preview.wav", priority=PRIORITY_INTERACTIVE)
+        preview.result()  # 不必等待 batch 完成
+    """
+
+    def __init__(self, cfg_path="checkpoints/config.yaml", model_dir="checkpoints", tts: Optional[IndexTTS] = None,
+                 setup: Optional[Callable[[IndexTTS], None]] = None, idle_offload: Optional[float] = None,
+                 low_memory_mb: Optional[float] = None, offload_dir: Optional[str] = None,
+                 memory_check_interval: float = 5.0, warmup: bool = False, warmup_voice: Optional[str] = None,
+                 **tts_kwargs):
+        """
+        Args:
+            tts (IndexTTS): 已加载的模型实例，默认在引擎线程中用 ``cfg_path`` / ``model_dir`` / ``tts_kwargs`` 加载
+            setup: 模型加载后在引擎线程中调用一次，用于启用分句缓存、设置参考音频选项等
+            idle_offload: 空闲多少秒后卸载模型权重，默认不卸载
+            low_memory_mb: 空闲时每隔 ``memory_check_interval`` 秒检查设备可用内存（CUDA 为显存，其他为系统内存），
+                低于该值（MB）时立即卸载权重；任务结束后低于该值时释放缓存分配器中未使用的显存
+            offload_dir: 权重快照目录，见 ``IndexTTS.offload_weights``
+            warmup: 模型加载后是否在后台预热，预热结果（各批大小的冷 / 热耗时）见 ``warmup_future`` 或 ``tts.warmup_stats``
+            warmup_voice: 预热使用的参考音频，默认使用临时生成的噪声
+        """
+        self.tts = tts
+        self._init_kwargs = dict(cfg_path=cfg_path, model_dir=model_dir, **tts_kwargs)
+        self._setup = setup
+        self.idle_offload = idle_offload
+        self.low_memory_mb = low_memory_mb
+        self.offload_dir = offload_dir
+        self.memory_check_interval = memory_check_interval
+        self._offload_requested = False
+        self._last_active = time.monotonic()
+        self.offload_stats = dict(offloads=0, reloads=0, reload_seconds=0.0)
+        self.warmup = warmup
+        self.warmup_voice = warmup_voice
+        self.warmup_future: Optional[Future] = None
+        self._queue: List[_EngineJob] = []
+        self._jobs: Dict[Future, _EngineJob] = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._current: Optional[_EngineJob] = None
+        self._closed = False
+        self._ready = threading.Event()
+        self._load_error: Optional[str] = None
+        self._thread = threading.Thread(target=self._run, name="tts_engine", daemon=True)
+        self._thread.start()
+
+    def wait_ready(self, timeout=None) -> IndexTTS:
+        """等待模型加载完成并返回 ``IndexTTS`` 实例，加载失败时抛出 ``RuntimeError``"""
+        if not self._ready.wait(timeout):
+            raise TimeoutError("synthesis engine is still loading the model")
+        if self._load_error is not None:
+            raise RuntimeError(f"synthesis engine failed to load the model:\n{self._load_error}")
+        return self.tts
+
+    def submit(self, audio_prompt, text, output_path=None, priority=PRIORITY_BATCH, fast=False, progress=None,
+               **kwargs) -> Future:
+        """
+        提交一个合成任务，参数与 ``IndexTTS.infer`` / ``infer_fast`` 相同。
+        提交的任务优先级高于正在执行的任务时，后者在下一个分句边界让出。
+        ``progress(value, desc=...)`` 只接收本任务的进度（执行期间作为 ``IndexTTS.gr_progress``），如 ``gr.Progress``。
+
+        Returns:
+            ``Future``，结果为 ``infer`` 的返回值；任务被 ``cancel`` 时抛出 ``SynthesisCancelled``
+        """
+        kwargs.update(audio_prompt=audio_prompt, text=text, output_path=output_path)
+        return self._enqueue(priority, "infer_fast" if fast else "infer", kwargs, progress)
+
+    def submit_batch(self, audio_prompt, texts, output_paths=None, priority=PRIORITY_BATCH, progress=None,
+                     **kwargs) -> Future:
+        """
+        提交一个同音色的多文本合成任务，参数与 ``IndexTTS.infer_batch`` 相同，整批只在开始执行前可被抢占。
+
+        Returns:
+            ``Future``，结果为 ``infer_batch`` 返回的列表
+        """
+        kwargs.update(audio_prompt=audio_prompt, texts=texts, output_paths=output_paths)
+        return self._enqueue(priority, "infer_batch", kwargs, progress)
+
+    def _enqueue(self, priority: int, method: str, kwargs: Dict, progress: Optional[Callable] = None) -> Future:
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("SynthesisEngine is closed")
+            job = _EngineJob(priority, next(self._seq), method, kwargs, future, progress)
+            self._jobs[future] = job
+            heapq.heappush(self._queue, job)
+            if self._current is not None and job < self._current:
+                self._current.token.request_preemption()
+            self._cond.notify()
+        return future
+
+    def cancel(self, future: Future) -> bool:
+        """取消任务：排队中的任务直接移除，正在执行的任务在下一个解码步停止"""
+        with self._cond:
+            job = self._jobs.get(future)
+            if job is None:
+                return False
+            if job is self._current:
+                job.token.cancel()
+                return True
+            self._queue.remove(job)
+            heapq.heapify(self._queue)
+            del self._jobs[future]
+        if not future.cancel():
+            # 被抢占过的任务已处于 running 状态，无法再 cancel()
+            future.set_exception(SynthesisCancelled("synthesis cancelled"))
+        return True
+
+    @property
+    def ready(self) -> bool:
+        """模型已加载成功"""
+        return self._ready.is_set() and self._load_error is None
+
+    @property
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._queue) + (self._current is not None)
+
+    def request_offload(self):
+        """请求卸载模型权重（如即将运行占用大量内存的其他任务），引擎空闲时执行，下一个任务开始前自动重新加载"""
+        with self._cond:
+            self._offload_requested = True
+            self._cond.notify()
+
+    def _load(self):
+        try:
+            if self.tts is None:
+                self.tts = IndexTTS(**self._init_kwargs)
+            if self._setup is not None:
+                self._setup(self.tts)
+        except Exception:
+            self._load_error = traceback.format_exc()
+        self._ready.set()
+
+    def _next_job(self, timeout: Optional[float] = None) -> Optional[_EngineJob]:
+        """取出下一个任务；引擎关闭、请求卸载权重或等待 ``timeout`` 秒仍没有任务时返回 None"""
+        with self._cond:
+            while True:
+                if not self._cond.wait_for(lambda: self._queue or self._closed or self._offload_requested, timeout):
+                    return None
+                if self._closed or not self._queue:
+                    return None
+                job = heapq.heappop(self._queue)
+                if job.started or job.future.set_running_or_notify_cancel():
+                    break
+                # 排队期间已被 Future.cancel() 取消
+                del self._jobs[job.future]
+            job.started = True
+            job.token.clear_preemption()
+            self._current = job
+            return job
+
+    def _idle_timeout(self) -> Optional[float]:
+        """空闲时距离下一次内存策略检查的秒数，无需检查时返回 None"""
+        if self.tts is None or self._load_error is not None or self.tts.weights_offloaded:
+            return None
+        timeouts = []
+        if self.idle_offload is not None:
+            timeouts.append(self.idle_offload - (time.monotonic() - self._last_active))
+        if self.low_memory_mb is not None:
+            timeouts.append(self.memory_check_interval)
+        return max(0.0, min(timeouts)) if timeouts else None
+
+    def _low_memory(self) -> Optional[int]:
+        """设备可用内存低于 ``low_memory_mb`` 时返回可用字节数，否则返回 None"""
+        if self.low_memory_mb is None:
+            return None
+        available = available_memory(self.tts.device)
+        if available is not None and available < self.low_memory_mb * MB:
+            return available
+        return None
+
+    def _maintain_idle(self):
+        """引擎空闲时执行内存策略（在引擎线程中，不持有队列锁）"""
+        with self._cond:
+            requested, self._offload_requested = self._offload_requested, False
+        if self.tts is None or self._load_error is not None or self.tts.weights_offloaded:
+            return
+        reason = None
+        if requested:
+            reason = "offload requested"
+        elif self.idle_offload is not None and time.monotonic() - self._last_active >= self.idle_offload:
+            reason = f"idle for {time.monotonic() - self._last_active:.0f} seconds"
+        else:
+            available = self._low_memory()
+            if available is not None:
+                reason = f"low memory, {available / MB:.0f} MB available"
+        if reason is None:
+            return
+        logger.info(">> offloading model weights: %s", reason)
+        try:
+            self.tts.offload_weights(self.offload_dir)
+        except Exception:
+            logger.exception(">> failed to offload model weights")
+            return
+        self.offload_stats["offloads"] += 1
+
+    def _run(self):
+        self._load()
+        self._last_active = time.monotonic()
+        if self.warmup and self._load_error is None:
+            # 被抢占后重新入队时跳过已完成的批大小
+            self.warmup_future = self._enqueue(PRIORITY_WARMUP, "warmup", dict(audio_prompt=self.warmup_voice, resume=True))
+        while True:
+            job = self._next_job(self._idle_timeout())
+            if job is None:
+                if self._closed:
+                    break
+                self._maintain_idle()
+                continue
+            if self._load_error is not None:
+                self._finish(job, exception=RuntimeError(f"synthesis engine failed to load the model:\n{self._load_error}"))
+                continue
+            if self.tts.weights_offloaded:
+                self.offload_stats["reloads"] += 1
+                self.offload_stats["reload_seconds"] += self.tts.reload_weights()
+            start_time = time.perf_counter()
+            # 进度回调只在本任务执行期间生效，并发请求的进度互不干扰
+            previous_progress = self.tts.gr_progress
+            if job.progress is not None:
+                self.tts.gr_progress = job.progress
+            try:
+                result = getattr(self.tts, job.method)(cancel_token=job.token, **job.kwargs)
+            except SynthesisPreempted:
+                job.preemptions += 1
+                with self._cond:
+                    requeue = not self._closed
+                    if requeue:
+                        self._current = None
+                        heapq.heappush(self._queue, job)
+                if not requeue:
+                    # close() 已清空队列，重新入队的任务不会再执行
+                    self._finish(job, exception=RuntimeError("SynthesisEngine is closed"))
+                    continue
+                logger.info(">> synthesis job %d preempted after %.2f seconds, requeued", job.seq, time.perf_counter() - start_time)
+                continue
+            except BaseException as e:
+                self._finish(job, exception=e)
+                continue
+            finally:
+                self.tts.gr_progress = previous_progress
+                self._last_active = time.monotonic()
+                if self._low_memory() is not None:
+                    self.tts.torch_empty_cache()
+            self._finish(job, result=result)
+
+    def _finish(self, job: _EngineJob, result=None, exception: Optional[BaseException] = None):
+        with self._cond:
+            self._current = None
+            self._jobs.pop(job.future, None)
+        if exception is not None:
+            job.future.set_exception(exception)
+        else:
+            job.future.set_result(result)
+
+    def close(self, cancel_running=False):
+        """停止引擎：排队中的任务以 ``RuntimeError`` 结束，正在执行的任务执行完毕（或 ``cancel_running`` 时取消）后退出"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            queued, self._queue = self._queue, []
+            if cancel_running and self._current is not None:
+                self._current.token.cancel()
+            self._cond.notify_all()
+        for job in queued:
+            self._jobs.pop(job.future, None)
+            if job.started or job.future.set_running_or_notify_cancel():
+                job.future.set_exception(RuntimeError("SynthesisEngine is closed"))
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -3,7 +3,7 @@ import functools
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
-from transformers import GPT2Config, GPT2PreTrainedModel, LogitsProcessorList, GenerationMixin
+from transformers import GPT2Config, GPT2PreTrainedModel, LogitsProcessorList, GenerationMixin, StoppingCriteriaList
 from transformers.modeling_outputs import CausalLMOutputWithCrossAttentions
 from transformers.utils.model_parallel_utils import (assert_device_map,
                                                      get_device_map)
@@ -11,6 +11,8 @@ from transformers.utils.model_parallel_utils import (assert_device_map,
 from indextts.gpt.conformer_encoder import ConformerEncoder
 from indextts.gpt.perceiver import PerceiverResampler
 from indextts.utils.arch_util import AttentionBlock
+from indextts.utils.seeded_sampling import (build_seeded_sampling_processors, seeded_generators,
+                                             seeded_sample_without_replacement)
 from indextts.utils.typical_sampling import TypicalLogitsWarper
 
 
@@ -52,6 +54,8 @@ class GPT2InferenceModel(GPT2PreTrainedModel, GenerationMixin):
         self.model_parallel = False
         self.device_map = None
         self.cached_mel_emb = None
+        # per-row RNGs for seeded beam sampling, set by `UnifiedVoice.inference_speech` for the duration of `generate`
+        self.sampling_generators = None
 
     def parallelize(self, device_map=None):
         self.device_map = (
@@ -178,6 +182,9 @@ class GPT2InferenceModel(GPT2PreTrainedModel, GenerationMixin):
             hidden_states = hidden_states.to(self.lm_head.weight.device)
 
         lm_logits = self.lm_head(hidden_states)
+        if lm_logits.dtype == torch.bfloat16:
+            # bf16 只有 8 位有效位，重复惩罚和 top-p 等采样处理在 fp32 下进行
+            lm_logits = lm_logits.float()
 
         if not return_dict:
             return (lm_logits,) + transformer_outputs[1:]
@@ -191,6 +198,76 @@ class GPT2InferenceModel(GPT2PreTrainedModel, GenerationMixin):
             cross_attentions=transformer_outputs.cross_attentions,
         )
 
+    def beam_sample(self, input_ids, beam_scorer, logits_processor=None, stopping_criteria=None, logits_warper=None,
+                    max_length=None, pad_token_id=None, eos_token_id=None, output_attentions=None,
+                    output_hidden_states=None, output_scores=None, return_dict_in_generate=None, synced_gpus=False,
+                    **model_kwargs):
+        """
+        HF `beam_sample` with the multinomial draw replaced by per-row seeded Gumbel-top-k when
+        `sampling_generators` is set: each row of the batch (one sentence, all of its beams) draws its noise from
+        its own generator, and the noise only selects the candidates, the beam scores accumulate the processed
+        log-probabilities exactly as in HF `beam_sample`.
+        """
+        if self.sampling_generators is None:
+            return super().beam_sample(
+                input_ids, beam_scorer, logits_processor=logits_processor, stopping_criteria=stopping_criteria,
+                logits_warper=logits_warper, max_length=max_length, pad_token_id=pad_token_id,
+                eos_token_id=eos_token_id, output_attentions=output_attentions,
+                output_hidden_states=output_hidden_states, output_scores=output_scores,
+                return_dict_in_generate=return_dict_in_generate, synced_gpus=synced_gpus, **model_kwargs)
+        if return_dict_in_generate or output_scores or output_attentions or output_hidden_states or synced_gpus:
+            raise ValueError("seeded beam sampling only returns sequences")
+        logits_processor = logits_processor if logits_processor is not None else LogitsProcessorList()
+        logits_warper = logits_warper if logits_warper is not None else LogitsProcessorList()
+        stopping_criteria = stopping_criteria if stopping_criteria is not None else StoppingCriteriaList()
+        pad_token_id = pad_token_id if pad_token_id is not None else self.generation_config.pad_token_id
+        eos_token_id = eos_token_id if eos_token_id is not None else self.generation_config.eos_token_id
+        if isinstance(eos_token_id, int):
+            eos_token_id = [eos_token_id]
+
+        batch_size = len(beam_scorer._beam_hyps)
+        num_beams = beam_scorer.num_beams
+        if len(self.sampling_generators) != batch_size:
+            raise ValueError(f"expected {batch_size} generators for seeded sampling, got {len(self.sampling_generators)}")
+        beam_scores = torch.zeros((batch_size * num_beams,), dtype=torch.float, device=input_ids.device)
+        decoder_prompt_len = input_ids.shape[-1]
+        while True:
+            model_inputs = self.prepare_inputs_for_generation(input_ids, **model_kwargs)
+            outputs = self(**model_inputs, return_dict=True)
+            next_token_scores = F.log_softmax(outputs.logits[:, -1, :], dim=-1)
+            next_token_scores = logits_warper(input_ids, logits_processor(input_ids, next_token_scores))
+            next_token_scores = next_token_scores + beam_scores[:, None].expand_as(next_token_scores)
+
+            vocab_size = next_token_scores.shape[-1]
+            next_token_scores = next_token_scores.view(batch_size, num_beams * vocab_size)
+            next_tokens = seeded_sample_without_replacement(next_token_scores, 2 * num_beams, self.sampling_generators)
+            next_token_scores = torch.gather(next_token_scores, -1, next_tokens)
+            next_token_scores, _indices = torch.sort(next_token_scores, descending=True, dim=1)
+            next_tokens = torch.gather(next_tokens, -1, _indices)
+            next_indices = torch.div(next_tokens, vocab_size, rounding_mode="floor")
+            next_tokens = next_tokens % vocab_size
+
+            beam_outputs = beam_scorer.process(
+                input_ids, next_token_scores, next_tokens, next_indices,
+                pad_token_id=pad_token_id, eos_token_id=eos_token_id, decoder_prompt_len=decoder_prompt_len,
+            )
+            beam_scores = beam_outputs["next_beam_scores"]
+            beam_next_tokens = beam_outputs["next_beam_tokens"]
+            beam_idx = beam_outputs["next_beam_indices"]
+            input_ids = torch.cat([input_ids[beam_idx, :], beam_next_tokens.unsqueeze(-1)], dim=-1)
+
+            model_kwargs = self._update_model_kwargs_for_generation(outputs, model_kwargs)
+            if model_kwargs["past_key_values"] is not None:
+                model_kwargs["past_key_values"] = self._temporary_reorder_cache(model_kwargs["past_key_values"], beam_idx)
+            if beam_scorer.is_done or stopping_criteria(input_ids, None):
+                break
+
+        sequence_outputs = beam_scorer.finalize(
+            input_ids, beam_scores, next_tokens, next_indices, pad_token_id=pad_token_id, eos_token_id=eos_token_id,
+            max_length=stopping_criteria.max_length, decoder_prompt_len=decoder_prompt_len,
+        )
+        return sequence_outputs["sequences"]
+
     @staticmethod
     def _reorder_cache(past, beam_idx):
         """
@@ -653,7 +730,7 @@ class UnifiedVoice(nn.Module):
         fake_inputs[:, -1] = self.start_mel_token
         return fake_inputs, batched_mel_emb, attention_mask
     def inference_speech(self, speech_conditioning_mel, text_inputs, cond_mel_lengths=None, input_tokens=None, num_return_sequences=1,
-                         max_generate_length=None, typical_sampling=False, typical_mass=.9, **hf_generate_kwargs):
+                         max_generate_length=None, typical_sampling=False, typical_mass=.9, seeds=None, **hf_generate_kwargs):
         """
         Args:
             speech_conditioning_mel: (b, n_mels, frames) or (n_mels, frames)
@@ -661,6 +738,8 @@ class UnifiedVoice(nn.Module):
             cond_mel_lengths: lengths of the conditioning mel spectrograms in shape (b,) or (1,)
             input_tokens: additional tokens for generation in shape (b, s) or (s,)
             max_generate_length: limit the number of generated tokens
+            seeds: optional list of b random seeds, one per row of `text_inputs`. When sampling, each row uses its own
+                RNG so the generated tokens do not depend on batching.
             hf_generate_kwargs: kwargs for `GPT2InferenceModel.generate(**hf_generate_kwargs)`
         """
         if speech_conditioning_mel.ndim == 2:
@@ -694,13 +773,34 @@ class UnifiedVoice(nn.Module):
                 raise ValueError(f"`typical_mass` has to be a float > 0 and < 1, but is {typical_mass}")
             min_tokens_to_keep = 2 if hf_generate_kwargs.get("num_beams", 1) > 1 else 1
             logits_processor.append(TypicalLogitsWarper(mass=typical_mass, min_tokens_to_keep=min_tokens_to_keep))
+        sampling_generators = None
+        if seeds is not None and hf_generate_kwargs.get("do_sample", False):
+            # replace the shared-RNG multinomial sampling by per-row seeded sampling
+            assert len(seeds) == text_inputs.shape[0], f"seeds count mismatch: {len(seeds)} vs {text_inputs.shape[0]}"
+            assert num_return_sequences == 1, "seeded sampling does not support num_return_sequences > 1"
+            if hf_generate_kwargs.get("num_beams", 1) > 1:
+                # HF dispatches to `GPT2InferenceModel.beam_sample`, which draws from these generators
+                sampling_generators = seeded_generators(seeds)
+            else:
+                # greedy search over Gumbel-perturbed scores == multinomial sampling
+                hf_generate_kwargs["do_sample"] = False
+                logits_processor.extend(build_seeded_sampling_processors(
+                    seeds,
+                    temperature=hf_generate_kwargs.pop("temperature", 1.0),
+                    top_k=hf_generate_kwargs.pop("top_k", None),
+                    top_p=hf_generate_kwargs.pop("top_p", None),
+                ))
         max_length = (trunc_index + self.max_mel_tokens - 1) if max_generate_length is None else trunc_index + max_generate_length
-        output = self.inference_model.generate(inputs, 
-                                            bos_token_id=self.start_mel_token, pad_token_id=self.stop_mel_token,
-                                            eos_token_id=self.stop_mel_token, attention_mask=attention_mask,
-                                            max_length=max_length, logits_processor=logits_processor,
-                                            num_return_sequences=num_return_sequences,
-                                            **hf_generate_kwargs)
+        self.inference_model.sampling_generators = sampling_generators
+        try:
+            output = self.inference_model.generate(inputs, 
+                                                bos_token_id=self.start_mel_token, pad_token_id=self.stop_mel_token,
+                                                eos_token_id=self.stop_mel_token, attention_mask=attention_mask,
+                                                max_length=max_length, logits_processor=logits_processor,
+                                                num_return_sequences=num_return_sequences,
+                                                **hf_generate_kwargs)
+        finally:
+            self.inference_model.sampling_generators = None
         if isinstance(output, torch.Tensor):
             return output[:, trunc_index:]
         # GenerateOutput
@@ -1,14 +1,20 @@
+import functools
+import logging
 import os
-import sys
+import random
+import tempfile
+import threading
 import time
 from subprocess import CalledProcessError
 from typing import Dict, List, Tuple
 
+import numpy as np
 import torch
 import torchaudio
 from torch.nn.utils.rnn import pad_sequence
 from omegaconf import OmegaConf
 from tqdm import tqdm
+from transformers import StoppingCriteriaList
 
 import warnings
 
@@ -17,15 +23,85 @@ warnings.filterwarnings("ignore", category=UserWarning)
 
 from indextts.BigVGAN.models import BigVGAN as Generator
 from indextts.gpt.model import UnifiedVoice
+from indextts.utils.cancellation import CancellationStoppingCriteria, ImmediatePreemptionToken, SynthesisPreempted
 from indextts.utils.checkpoint import load_checkpoint
-from indextts.utils.feature_extractors import MelSpectrogramFeatures
+from indextts.utils.feature_extractors import get_mel_extractor, get_resampler
 
-from indextts.utils.front import TextNormalizer, TextTokenizer
+from indextts.utils.front import TextNormalizer, TextPrefetcher, TextTokenizer
+from indextts.utils.log import get_logger, lazy
+from indextts.utils.memory import MB, MemoryMonitor, available_memory, kv_cache_bytes
+from indextts.utils.offload import WeightOffloader
+from indextts.utils.profiling import SynthesisProfile
+from indextts.utils.reference_audio import select_reference_window
+from indextts.utils.seeded_sampling import SEEDED_SAMPLING_VERSION, derive_seed
+from indextts.utils.synthesis_cache import SentenceCache, file_content_hash
+from indextts.utils.wav_writer import AsyncWavWriter, IncrementalWavWriter, SynthesisResult, write_wav
+
+
+logger = get_logger("infer")
+
+
+def cpu_supports_bf16():
+    """CPU 是否支持原生 bf16 指令（仅 Linux 可检测，其他平台返回 True）"""
+    try:
+        with open("/proc/cpuinfo", "r") as f:
+            flags = f.read()
+    except OSError:
+        return True
+    return "avx512_bf16" in flags or "amx_bf16" in flags
+
+
+class _NormalizerLoader(threading.Thread):
+    """在后台线程中加载 TextNormalizer，``join()`` 时重新抛出加载异常"""
+
+    def __init__(self, normalizer: TextNormalizer):
+        super().__init__(name="normalizer_loader", daemon=True)
+        self.normalizer = normalizer
+        self.start_time = 0.0
+        self.elapsed = 0.0
+        self.error = None
+
+    def run(self):
+        self.start_time = time.perf_counter()
+        try:
+            self.normalizer.load()
+        except BaseException as e:
+            self.error = e
+        self.elapsed = time.perf_counter() - self.start_time
+
+    def join(self, timeout=None):
+        super().join(timeout)
+        if self.error is not None:
+            raise self.error
+
+
+def _memory_profiled(method):
+    """启用内存分析（``enable_memory_profiling``）时，在合成期间运行内存采样"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.memory_monitor is None:
+            return method(self, *args, **kwargs)
+        self.memory_monitor.start()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.memory_monitor.stop()
+    return wrapper
+
+
+def _weights_loaded(method):
+    """权重已卸载（``offload_weights``）时先重新加载"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self.reload_weights()
+        return method(self, *args, **kwargs)
+    return wrapper
 
 
 class IndexTTS:
     def __init__(
         self, cfg_path="checkpoints/config.yaml", model_dir="checkpoints", is_fp16=True, device=None, use_cuda_kernel=None,
+        dtype=None,
     ):
         """
         Args:
@@ -34,6 +110,8 @@ class IndexTTS:
             is_fp16 (bool): whether to use fp16.
             device (str): device to use (e.g., 'cuda:0', 'cpu'). If None, it will be set automatically based on the availability of CUDA or MPS.
             use_cuda_kernel (None | bool): whether to use BigVGan custom fused activation CUDA kernel, only for CUDA device.
+            dtype (None | str): autocast dtype for CPU inference, only "bfloat16" is supported. Weights stay in fp32,
+                matmuls and convolutions run in bf16, logits and the vocoder output layer stay in fp32.
         """
         if device is not None:
             self.device = device
@@ -51,13 +129,29 @@ class IndexTTS:
             self.device = "cpu"
             self.is_fp16 = False
             self.use_cuda_kernel = False
-            print(">> Be patient, it may take a while to run in CPU mode.")
+            logger.info(">> Be patient, it may take a while to run in CPU mode.")
 
         self.cfg = OmegaConf.load(cfg_path)
         self.model_dir = model_dir
         self.dtype = torch.float16 if self.is_fp16 else None
+        if dtype is not None:
+            if str(dtype).replace("torch.", "") != "bfloat16":
+                raise ValueError(f"unsupported dtype: {dtype}, only 'bfloat16' is supported")
+            if torch.device(self.device).type != "cpu":
+                raise ValueError("dtype='bfloat16' is only supported on CPU, use is_fp16 on GPU")
+            self.dtype = torch.bfloat16
+            if not cpu_supports_bf16():
+                logger.warning(">> WARNING: this CPU has no native bf16 instructions (avx512_bf16/amx_bf16), bf16 may be slower than fp32.")
         self.stop_mel_token = self.cfg.gpt.stop_mel_token
 
+        # TextNormalizer 的 FST 加载与模型权重加载互不依赖，放到后台线程并行执行
+        load_start_time = time.perf_counter()
+        # 模型加载各部分的耗时
+        self.load_profile = SynthesisProfile("load")
+        self.normalizer = TextNormalizer()
+        normalizer_loader = _NormalizerLoader(self.normalizer)
+        normalizer_loader.start()
+
         # Comment-off to load the VQ-VAE model for debugging tokenizer
         #   https://github.com/index-tts/index-tts/issues/34
         #
@@ -71,6 +165,7 @@ class IndexTTS:
         # else:
         #     self.dvae.eval()
         # print(">> vqvae weights restored from:", self.dvae_path)
+        m_start_time = time.perf_counter()
         self.gpt = UnifiedVoice(**self.cfg.gpt)
         self.gpt_path = os.path.join(self.model_dir, self.cfg.gpt_checkpoint)
         load_checkpoint(self.gpt, self.gpt_path)
@@ -79,7 +174,7 @@ class IndexTTS:
             self.gpt.eval().half()
         else:
             self.gpt.eval()
-        print(">> GPT weights restored from:", self.gpt_path)
+        logger.info(">> GPT weights restored from: %s", self.gpt_path)
         if self.is_fp16:
             try:
                 import deepspeed
@@ -87,26 +182,26 @@ class IndexTTS:
                 use_deepspeed = True
             except (ImportError, OSError, CalledProcessError) as e:
                 use_deepspeed = False
-                print(f">> DeepSpeed加载失败，回退到标准推理: {e}")
-                print("See more details https://www.deepspeed.ai/tutorials/advanced-install/")
+                logger.warning(">> DeepSpeed加载失败，回退到标准推理: %s", e)
+                logger.warning("See more details https://www.deepspeed.ai/tutorials/advanced-install/")
 
             self.gpt.post_init_gpt2_config(use_deepspeed=use_deepspeed, kv_cache=True, half=True)
         else:
             self.gpt.post_init_gpt2_config(use_deepspeed=False, kv_cache=True, half=False)
+        self.load_profile.add("load", m_start_time, component="gpt")
 
         if self.use_cuda_kernel:
             # preload the CUDA kernel for BigVGAN
             try:
                 from indextts.BigVGAN.alias_free_activation.cuda import load as anti_alias_activation_loader
                 anti_alias_activation_cuda = anti_alias_activation_loader.load()
-                print(">> Preload custom CUDA kernel for BigVGAN", anti_alias_activation_cuda)
+                logger.info(">> Preload custom CUDA kernel for BigVGAN %s", anti_alias_activation_cuda)
             except Exception as e:
-                print(">> Failed to load custom CUDA kernel for BigVGAN. Falling back to torch.", e, file=sys.stderr)
-                print(" Reinstall with `pip install -e . --no-deps --no-build-isolation` to prebuild `anti_alias_activation_cuda` kernel.", file=sys.stderr)
-                print(
-                    "See more details: https://github.com/index-tts/index-tts/issues/164#issuecomment-2903453206", file=sys.stderr
-                )
+                logger.warning(">> Failed to load custom CUDA kernel for BigVGAN. Falling back to torch. %s", e)
+                logger.warning(" Reinstall with `pip install -e . --no-deps --no-build-isolation` to prebuild `anti_alias_activation_cuda` kernel.")
+                logger.warning("See more details: https://github.com/index-tts/index-tts/issues/164#issuecomment-2903453206")
                 self.use_cuda_kernel = False
+        m_start_time = time.perf_counter()
         self.bigvgan = Generator(self.cfg.bigvgan, use_cuda_kernel=self.use_cuda_kernel)
         self.bigvgan_path = os.path.join(self.model_dir, self.cfg.bigvgan_checkpoint)
         vocoder_dict = torch.load(self.bigvgan_path, map_location="cpu")
@@ -115,18 +210,47 @@ class IndexTTS:
         # remove weight norm on eval mode
         self.bigvgan.remove_weight_norm()
         self.bigvgan.eval()
-        print(">> bigvgan weights restored from:", self.bigvgan_path)
+        self.load_profile.add("load", m_start_time, component="bigvgan")
+        logger.info(">> bigvgan weights restored from: %s", self.bigvgan_path)
+        model_load_time = time.perf_counter() - load_start_time
         self.bpe_path = os.path.join(self.model_dir, self.cfg.dataset["bpe_model"])
-        self.normalizer = TextNormalizer()
-        self.normalizer.load()
-        print(">> TextNormalizer loaded")
+        normalizer_loader.join()
+        self.load_profile.add("load", normalizer_loader.start_time, normalizer_loader.start_time + normalizer_loader.elapsed,
+                              thread_id=normalizer_loader.ident, component="normalizer")
+        load_time = time.perf_counter() - load_start_time
+        logger.info(">> TextNormalizer loaded in %.2f seconds, saved %.2f seconds by loading in background",
+                    normalizer_loader.elapsed, max(0.0, normalizer_loader.elapsed + model_load_time - load_time))
+        m_start_time = time.perf_counter()
         self.tokenizer = TextTokenizer(self.bpe_path, self.normalizer)
-        print(">> bpe model loaded from:", self.bpe_path)
+        self.load_profile.add("load", m_start_time, component="tokenizer")
+        logger.info(">> bpe model loaded from: %s", self.bpe_path)
+        # 文本前端预取（按需创建）
+        self.text_prefetcher = None
+        # 分句合成结果缓存（可选，见 enable_sentence_cache）
+        self.sentence_cache = None
+        self.cache_voice_hashes = {}
         # 缓存参考音频mel：
         self.cache_audio_prompt = None
         self.cache_cond_mel = None
+        # 参考音频预处理（见 set_reference_options），cache_ref_window 为缓存的 cond_mel 所用的片段（秒）
+        self.ref_trim_silence = False
+        self.ref_max_seconds = None
+        self.cache_ref_window = None
         # 进度引用显示（可选）
         self.gr_progress = None
+        # 最近一次 infer / infer_fast 的分阶段计时
+        self.last_profile = None
+        # 内存采样（可选，见 enable_memory_profiling）
+        self.memory_monitor = None
+        # return_result 时在后台写入输出文件
+        self.wav_writer = AsyncWavWriter()
+        # 权重卸载（可选，见 offload_weights），按组件名称
+        self.weight_offloaders: Dict[str, WeightOffloader] = {}
+        # 已完成的合成次数（不含预热），预热之前的第一次合成的计时标记为冷启动
+        self.synthesis_count = 0
+        self._warming_up = False
+        # 预热各批大小的冷 / 热耗时（见 warmup）
+        self.warmup_stats: List[Dict] = []
         self.model_version = self.cfg.version if hasattr(self.cfg, "version") else None
 
     def remove_long_silence(self, codes: torch.Tensor, silent_token=52, max_consecutive=30):
@@ -204,7 +328,7 @@ class IndexTTS:
             for sent in sorted(outputs, key=lambda x: x["len"]):
                 current_sent_len = sent["len"]
                 if current_sent_len == 0:
-                    print(">> skip empty sentence")
+                    logger.debug(">> skip empty sentence")
                     continue
                 if last_bucket is None \
                         or current_sent_len >= int(last_bucket_sent_len_median * factor) \
@@ -274,264 +398,878 @@ class IndexTTS:
         if self.gr_progress is not None:
             self.gr_progress(value, desc=desc)
 
-    # 快速推理：对于“多句长文本”，可实现至少 2~10 倍以上的速度提升~ （First modified by sunnyboxs 2025-04-16）
-    def infer_fast(self, audio_prompt, text, output_path, verbose=False, max_text_tokens_per_sentence=100, sentences_bucket_max_size=4, **generation_kwargs):
+    def enable_sentence_cache(self, cache_dir, max_size_mb=2048):
         """
+        启用分句合成结果缓存：文本、参考音频和参数都未改变的分句直接复用上次的音频，只合成未命中的分句。
         Args:
-            ``max_text_tokens_per_sentence``: 分句的最大token数，默认``100``，可以根据GPU硬件情况调整
-                - 越小，batch 越多，推理速度越*快*，占用内存更多，可能影响质量
-                - 越大，batch 越少，推理速度越*慢*，占用内存和质量更接近于非快速推理
-            ``sentences_bucket_max_size``: 分句分桶的最大容量，默认``4``，可以根据GPU内存调整
-                - 越大，bucket数量越少，batch越多，推理速度越*快*，占用内存更多，可能影响质量
-                - 越小，bucket数量越多，batch越少，推理速度越*慢*，占用内存和质量更接近于非快速推理
+            cache_dir (str): 缓存目录
+            max_size_mb (float): 缓存大小上限，超出后按 LRU 淘汰
         """
-        print(">> start fast inference...")
-        
-        self._set_gr_progress(0, "start fast inference...")
-        if verbose:
-            print(f"origin text:{text}")
-        start_time = time.perf_counter()
+        self.sentence_cache = SentenceCache(cache_dir, max_size_mb=max_size_mb)
+        checkpoints = []
+        for path in (self.gpt_path, self.bigvgan_path):
+            stat = os.stat(path)
+            checkpoints.append((os.path.basename(path), stat.st_size, stat.st_mtime))
+        # 模型版本、权重文件、推理精度和固定种子采样的实现变化时，旧缓存全部失效
+        self.model_fingerprint = SentenceCache.make_key(
+            version=self.model_version, checkpoints=checkpoints, dtype=self.dtype, device=torch.device(self.device).type,
+            sampling=SEEDED_SAMPLING_VERSION,
+        )
+        logger.info(">> sentence cache enabled: %s", cache_dir)
 
+    def enable_memory_profiling(self, interval=0.005):
+        """
+        启用内存分析：合成期间在后台采样进程 RSS 和加速器显存，
+        各阶段、各分桶的峰值记录在 ``last_profile`` 的区间属性中（``peak_rss_mb``、``peak_accelerator_mb``），
+        整次合成的峰值记录在 ``last_profile.meta``，导出的 Chrome trace 中包含内存曲线。
+        Args:
+            interval (float): 采样间隔（秒）
+        """
+        self.memory_monitor = MemoryMonitor(self.device, interval=interval)
+        logger.info(">> memory profiling enabled")
+
+    def disable_memory_profiling(self):
+        self.memory_monitor = None
+
+    @property
+    def weights_offloaded(self) -> bool:
+        return any(offloader.offloaded for offloader in self.weight_offloaders.values())
+
+    def offload_weights(self, offload_dir=None):
+        """
+        卸载 GPT 和 BigVGAN 权重（见 ``indextts.utils.offload``）：加速器上释放显存，CPU 上改由磁盘快照的内存映射提供，
+        下一次合成前自动重新加载。第一次卸载时写出权重快照，模型文件和推理精度不变时之后的卸载（包括重启后）直接复用。
+        Args:
+            offload_dir (str): 快照目录，默认为系统临时目录下的 ``indextts_offload``
+        Returns:
+            耗时（秒）
+        """
+        if not self.weight_offloaders:
+            offload_dir = offload_dir or os.path.join(tempfile.gettempdir(), "indextts_offload")
+            components = [("bigvgan", self.bigvgan, self.bigvgan_path)]
+            if getattr(self.gpt, "ds_engine", None) is None:
+                components.append(("gpt", self.gpt, self.gpt_path))
+            else:
+                # DeepSpeed 持有自己的权重引用，替换后无法保证一致
+                logger.info(">> GPT runs with DeepSpeed, only BigVGAN weights will be offloaded")
+            for name, module, checkpoint_path in components:
+                stat = os.stat(checkpoint_path)
+                key = SentenceCache.make_key(
+                    component=name, checkpoint=(os.path.abspath(checkpoint_path), stat.st_size, stat.st_mtime),
+                    version=self.model_version, is_fp16=self.is_fp16, use_cuda_kernel=self.use_cuda_kernel,
+                )
+                self.weight_offloaders[name] = WeightOffloader(
+                    module, os.path.join(offload_dir, f"{name}_{key[:16]}.pt"), self.device)
+        elapsed = sum(offloader.offload() for offloader in self.weight_offloaders.values())
+        self.torch_empty_cache()
+        logger.info(">> model weights offloaded in %.2f seconds", elapsed)
+        return elapsed
+
+    def reload_weights(self):
+        """重新加载 ``offload_weights`` 卸载的权重，未卸载时直接返回。Returns: 耗时（秒）"""
+        if not self.weights_offloaded:
+            return 0.0
+        elapsed = sum(offloader.reload() for offloader in self.weight_offloaders.values())
+        logger.info(">> model weights reloaded in %.2f seconds", elapsed)
+        return elapsed
+
+    def warmup(self, audio_prompt=None, batch_sizes=None, text="你好，欢迎使用。Hello world.", max_mel_tokens=50,
+               cancel_token=None, resume=False):
+        """
+        预热：按每个分桶批大小各合成两次短文本，第一次承担分配器扩容、算子选择、生成流程初始化等一次性开销（冷），
+        第二次为正常耗时（热），两者记录在 ``warmup_stats`` 和 ``load_profile`` 的 ``warmup`` 区间中。
+        预热不写入分句缓存，不计入 ``synthesis_count``，也不改变参考音频缓存和 ``last_profile``。
+        Args:
+            audio_prompt (str): 参考音频，默认使用临时生成的噪声
+            batch_sizes (list): 要预热的批大小，默认为 ``infer_fast`` 默认分桶容量内的 1、2、4（CPU 上不分桶，只预热 1）
+            cancel_token: ``CancellationToken``，取消时抛出 ``SynthesisCancelled``；
+                请求抢占时（预热结果可以丢弃）在下一个解码步、分桶或声码器 chunk 处停止并抛出 ``SynthesisPreempted``，
+                已完成的合成保留在 ``warmup_stats``
+            resume (bool): 保留 ``warmup_stats``，跳过其中已完成的合成（被抢占后重新执行时使用），默认重新测量
+        Returns:
+            ``warmup_stats``：每个批大小一项 ``{"batch_size", "cold_seconds", "warm_seconds"}``
+        """
+        if batch_sizes is None:
+            batch_sizes = [1, 2, 4] if self.device != "cpu" else [1]
+        tmp_prompt = None
+        if audio_prompt is None:
+            fd, tmp_prompt = tempfile.mkstemp(prefix="indextts_warmup_", suffix=".wav")
+            os.close(fd)
+            noise = np.random.RandomState(0).randn(24000 * 3) * 1000
+            audio_prompt = write_wav(tmp_prompt, noise, 24000)
+        saved_state = (self.sentence_cache, self.cache_audio_prompt, self.cache_cond_mel, self.cache_ref_window,
+                       self.last_profile, self.gr_progress)
+        self.sentence_cache = None
+        self.gr_progress = None
+        self._warming_up = True
+        if not resume:
+            self.warmup_stats = []
+        records = {record["batch_size"]: record for record in self.warmup_stats}
+        # 抢占请求视为取消，正在进行的预热合成立即让出，不等到合成结束
+        token = ImmediatePreemptionToken(cancel_token) if cancel_token is not None else None
+        logger.info(">> warming up batch sizes: %s", batch_sizes)
+        try:
+            for batch_size in batch_sizes:
+                record = records.get(batch_size, dict(batch_size=batch_size))
+                if "warm_seconds" in record:
+                    continue
+                for run in ("cold", "warm"):
+                    if f"{run}_seconds" in record:
+                        continue
+                    try:
+                        self._check_cancelled(token)
+                        start_time = time.perf_counter()
+                        self.infer_batch(audio_prompt, [text] * batch_size, max_text_tokens_per_sentence=120,
+                                         sentences_bucket_max_size=batch_size, max_mel_tokens=max_mel_tokens,
+                                         cancel_token=token)
+                    except SynthesisPreempted:
+                        logger.info(">> warmup preempted at batch size %d (%s run)", batch_size, run)
+                        raise
+                    self.load_profile.add("warmup", start_time, batch_size=batch_size, run=run)
+                    record[f"{run}_seconds"] = time.perf_counter() - start_time
+                    if batch_size not in records:
+                        records[batch_size] = record
+                        self.warmup_stats.append(record)
+                logger.info(">> warmup batch size %d: cold %.2f seconds, warm %.2f seconds",
+                            batch_size, record["cold_seconds"], record["warm_seconds"])
+        finally:
+            self._warming_up = False
+            (self.sentence_cache, self.cache_audio_prompt, self.cache_cond_mel, self.cache_ref_window,
+             self.last_profile, self.gr_progress) = saved_state
+            if tmp_prompt is not None and os.path.isfile(tmp_prompt):
+                os.remove(tmp_prompt)
+            self.torch_empty_cache()
+        return self.warmup_stats
+
+    def estimate_kv_cache_bytes(self, batch_size, text_tokens, mel_tokens, num_beams=1):
+        """
+        估算 GPT 解码时的 KV cache 大小（字节）。
+        序列长度为 条件 latent + 文本（含起止符）+ 开始符 + 生成的 mel token，beam search 时每个 beam 各一份。
+        """
+        seq_len = self.gpt.cond_num + text_tokens + 3 + mel_tokens
+        element_size = torch.finfo(self.dtype).bits // 8 if self.dtype is not None else 4
+        return kv_cache_bytes(self.gpt.layers, self.gpt.model_dim, batch_size * max(1, num_beams), seq_len, element_size)
+
+    def suggest_generation_limits(self, available_bytes=None, max_mel_tokens=600, num_beams=3, safety=0.8,
+                                  overhead=2.0, max_text_tokens_options=(120, 100, 80, 60, 40),
+                                  bucket_size_options=(16, 8, 4, 2, 1)):
+        """
+        根据可用内存给出 ``infer_fast`` 的 ``sentences_bucket_max_size`` 和 ``max_text_tokens_per_sentence`` 建议：
+        优先保留较大的分句长度（影响质量），在此基础上选最大的分桶（影响速度），都放不下时再缩短分句。
+        估算以 KV cache 为主，``overhead`` 覆盖 beam search 重排 cache 时的临时副本和中间激活；
+        启用内存分析后，会用最近一次合成中实测的 ``generate`` 内存增长校正 ``overhead``（只会调大）。
+        注意 ``device="cpu"`` 时 ``infer_fast`` 不分桶，建议的分桶大小不生效。
+        Args:
+            available_bytes (int): 可用内存，默认取设备当前的可用内存（模型权重已加载，不再计入）
+            safety (float): 只使用可用内存的这一比例
+        Returns:
+            dict: ``sentences_bucket_max_size``、``max_text_tokens_per_sentence``、``estimated_mb``、``available_mb``、``overhead``；
+            内存不足以合成最短的分句时两项建议均为 ``None``
+        """
+        if available_bytes is None:
+            available_bytes = available_memory(self.device)
+            if available_bytes is None:
+                raise RuntimeError(f"cannot determine available memory for device {self.device}, pass available_bytes")
+        if self.last_profile is not None:
+            for span in self.last_profile.spans:
+                # KV cache 很小时内存增长主要来自分配器的粒度，不用于校正
+                if span.name == "generate" and span.attrs.get("rss_growth_mb") and span.attrs.get("kv_cache_mb", 0) >= 64:
+                    overhead = max(overhead, span.attrs["rss_growth_mb"] / span.attrs["kv_cache_mb"])
+        budget = available_bytes * safety
+        suggestion = dict(sentences_bucket_max_size=None, max_text_tokens_per_sentence=None, estimated_mb=None,
+                          available_mb=round(available_bytes / MB, 1), overhead=round(overhead, 2))
+        for max_text_tokens in sorted(max_text_tokens_options, reverse=True):
+            for bucket_size in sorted(bucket_size_options, reverse=True):
+                estimated = overhead * self.estimate_kv_cache_bytes(bucket_size, max_text_tokens, max_mel_tokens, num_beams)
+                if estimated <= budget:
+                    suggestion.update(sentences_bucket_max_size=bucket_size, max_text_tokens_per_sentence=max_text_tokens,
+                                      estimated_mb=round(estimated / MB, 1))
+                    return suggestion
+        return suggestion
+
+    def _voice_hash(self, audio_prompt):
+        stat = os.stat(audio_prompt)
+        sig = (os.path.abspath(audio_prompt), stat.st_size, stat.st_mtime)
+        if sig not in self.cache_voice_hashes:
+            self.cache_voice_hashes[sig] = file_content_hash(audio_prompt)
+        return self.cache_voice_hashes[sig]
+
+    def _sentence_cache_key(self, voice_hash, sent, generation_params):
+        parts = dict(voice=voice_hash, tokens=sent, params=generation_params, model=self.model_fingerprint)
+        if self.cache_ref_window is not None:
+            parts["reference_window"] = self.cache_ref_window
+        return SentenceCache.make_key(**parts)
+
+    def set_reference_options(self, trim_silence=True, max_seconds=None):
+        """
+        参考音频在提取 mel 之前的预处理。长参考音频会增加条件编码器的计算量，而几秒干净的语音已足够表达音色。
+        Args:
+            trim_silence (bool): 是否按能量去掉首尾静音
+            max_seconds (float): 参考音频的最大时长，超过时选取语音最密集的窗口，``None`` 表示不限制
+        """
+        self.ref_trim_silence = trim_silence
+        self.ref_max_seconds = max_seconds
+        # 预处理方式变化后需要重新计算 cond_mel
+        self.cache_cond_mel = None
+        self.cache_ref_window = None
+
+    def get_conditioning(self, audio_prompt, verbose=False, profile=None):
+        """
+        计算参考音频的 cond_mel
+        """
         # 如果参考音频改变了，才需要重新生成 cond_mel, 提升速度
-        if self.cache_cond_mel is None or self.cache_audio_prompt != audio_prompt:
+        start_time = time.perf_counter()
+        cached = not (self.cache_cond_mel is None or self.cache_audio_prompt != audio_prompt)
+        if not cached:
             audio, sr = torchaudio.load(audio_prompt)
             audio = torch.mean(audio, dim=0, keepdim=True)
             if audio.shape[0] > 1:
                 audio = audio[0].unsqueeze(0)
-            audio = torchaudio.transforms.Resample(sr, 24000)(audio)
-            cond_mel = MelSpectrogramFeatures()(audio).to(self.device)
-            cond_mel_frame = cond_mel.shape[-1]
-            if verbose:
-                print(f"cond_mel shape: {cond_mel.shape}", "dtype:", cond_mel.dtype)
+            audio = get_resampler(sr, 24000)(audio)
+            ref_window = None
+            if self.ref_trim_silence or self.ref_max_seconds:
+                start, end = select_reference_window(audio, 24000, max_seconds=self.ref_max_seconds,
+                                                     trim_silence=self.ref_trim_silence)
+                ref_window = (start / 24000, end / 24000)
+                logger.info(">> reference audio window: %.2fs - %.2fs of %.2fs", ref_window[0], ref_window[1],
+                            audio.shape[-1] / 24000)
+                audio = audio[:, start:end]
+            cond_mel = get_mel_extractor()(audio).to(self.device)
+            logger.debug("cond_mel shape: %s dtype: %s", cond_mel.shape, cond_mel.dtype)
 
             self.cache_audio_prompt = audio_prompt
             self.cache_cond_mel = cond_mel
-        else:
-            cond_mel = self.cache_cond_mel
-            cond_mel_frame = cond_mel.shape[-1]
-            pass
-
-        auto_conditioning = cond_mel
-        cond_mel_lengths = torch.tensor([cond_mel_frame], device=self.device)
+            self.cache_ref_window = ref_window
+        if profile is not None:
+            profile.add("conditioning", start_time, cached=cached, frames=int(self.cache_cond_mel.shape[-1]))
+        return self.cache_cond_mel
 
-        # text_tokens
-        text_tokens_list = self.tokenizer.tokenize(text)
+    def prefetch_text(self, text, max_text_tokens_per_sentence=120):
+        """
+        在后台提前完成 ``text`` 的正则化、分词和分句，之后以相同参数调用 ``infer``/``infer_fast`` 时直接使用结果。
+        """
+        if self.text_prefetcher is None:
+            self.text_prefetcher = TextPrefetcher(self.tokenizer)
+        self.text_prefetcher.submit(text, max_text_tokens_per_sentence)
 
+    def split_text(self, text, max_text_tokens_per_sentence=120, profile=None):
+        """
+        Returns:
+            (text_tokens_list, sentences): 分词结果及按 ``max_text_tokens_per_sentence`` 切分后的句子
+        """
+        start_time = time.perf_counter()
+        if self.text_prefetcher is not None:
+            text_tokens_list, sentences = self.text_prefetcher.get(text, max_text_tokens_per_sentence)
+            if profile is not None:
+                # 正则化和分词已在后台完成（或在此处补做），只记录等待时间
+                profile.add("tokenize", start_time, prefetched=True,
+                            text_tokens=len(text_tokens_list), sentences=len(sentences))
+            return text_tokens_list, sentences
+        normalized_text = self.tokenizer.preprocess(text)
+        if profile is not None:
+            profile.add("normalize", start_time, chars=len(text))
+        start_time = time.perf_counter()
+        text_tokens_list = self.tokenizer.tokenize(normalized_text, preprocessed=True)
         sentences = self.tokenizer.split_sentences(text_tokens_list, max_tokens_per_sentence=max_text_tokens_per_sentence)
-        if verbose:
-            print(">> text token count:", len(text_tokens_list))
-            print("   splited sentences count:", len(sentences))
-            print("   max_text_tokens_per_sentence:", max_text_tokens_per_sentence)
-            print(*sentences, sep="\n")
+        if profile is not None:
+            profile.add("tokenize", start_time, text_tokens=len(text_tokens_list), sentences=len(sentences))
+        return text_tokens_list, sentences
+
+    @_weights_loaded
+    def infer_latents(self, audio_prompt, text, max_text_tokens_per_sentence=120, seed=None, cancel_token=None,
+                      **generation_kwargs):
+        """
+        逐句运行 GPT（生成 codes 并计算 latent），不做声码器解码，供 GPT 与 BigVGAN 分进程流水线使用。
+        采样参数和默认值与 ``infer`` 相同，相同种子下得到与 ``infer`` 一致的 codes。
+        ``cancel_token`` 被取消后在下一个解码步停止并抛出 ``SynthesisCancelled``。
+        Yields:
+            dict: ``idx``、``count``（分句总数）、``codes``（裁剪长静音前）、``text_tokens``、``latent``
+        """
+        cond_mel = self.get_conditioning(audio_prompt)
+        cond_mel_lengths = torch.tensor([cond_mel.shape[-1]], device=self.device)
+        _, sentences = self.split_text(text, max_text_tokens_per_sentence)
         do_sample = generation_kwargs.pop("do_sample", True)
         top_p = generation_kwargs.pop("top_p", 0.8)
         top_k = generation_kwargs.pop("top_k", 30)
         temperature = generation_kwargs.pop("temperature", 1.0)
-        autoregressive_batch_size = 1
         length_penalty = generation_kwargs.pop("length_penalty", 0.0)
         num_beams = generation_kwargs.pop("num_beams", 3)
         repetition_penalty = generation_kwargs.pop("repetition_penalty", 10.0)
         max_mel_tokens = generation_kwargs.pop("max_mel_tokens", 600)
-        sampling_rate = 24000
-        # lang = "EN"
-        # lang = "ZH"
-        wavs = []
-        gpt_gen_time = 0
-        gpt_forward_time = 0
-        bigvgan_time = 0
+        cancel_kwargs = self._cancel_generation_kwargs(cancel_token)
+        for sent_idx, sent in enumerate(sentences):
+            self._check_cancelled(cancel_token, boundary=True)
+            text_tokens = self.tokenizer.convert_tokens_to_ids(sent)
+            text_tokens = torch.tensor(text_tokens, dtype=torch.int32, device=self.device).unsqueeze(0)
+            with torch.no_grad():
+                with torch.amp.autocast(text_tokens.device.type, enabled=self.dtype is not None, dtype=self.dtype):
+                    codes = self.gpt.inference_speech(cond_mel, text_tokens,
+                                                      cond_mel_lengths=cond_mel_lengths,
+                                                      seeds=None if seed is None else [derive_seed(seed, sent_idx)],
+                                                      do_sample=do_sample,
+                                                      top_p=top_p,
+                                                      top_k=top_k,
+                                                      temperature=temperature,
+                                                      num_return_sequences=1,
+                                                      length_penalty=length_penalty,
+                                                      num_beams=num_beams,
+                                                      repetition_penalty=repetition_penalty,
+                                                      max_generate_length=max_mel_tokens,
+                                                      **cancel_kwargs,
+                                                      **generation_kwargs)
+                    self._check_cancelled(cancel_token)
+                    trimmed_codes, code_lens = self.remove_long_silence(codes, silent_token=52, max_consecutive=30)
+                    latent = self.gpt(cond_mel, text_tokens,
+                                      torch.tensor([text_tokens.shape[-1]], device=text_tokens.device), trimmed_codes,
+                                      code_lens*self.gpt.mel_length_compression,
+                                      cond_mel_lengths=cond_mel_lengths,
+                                      return_latent=True, clip_inputs=False)
+            yield dict(idx=sent_idx, count=len(sentences), codes=codes, text_tokens=text_tokens, latent=latent)
 
-        # text processing
-        all_text_tokens: List[List[torch.Tensor]] = []
-        self._set_gr_progress(0.1, "text processing...")
-        bucket_max_size = sentences_bucket_max_size if self.device != "cpu" else 1
-        all_sentences = self.bucket_sentences(sentences, bucket_max_size=bucket_max_size)
-        bucket_count = len(all_sentences)
-        if verbose:
-            print(">> sentences bucket_count:", bucket_count,
-                  "bucket sizes:", [(len(s), [t["idx"] for t in s]) for s in all_sentences],
-                  "bucket_max_size:", bucket_max_size)
-        for sentences in all_sentences:
-            temp_tokens: List[torch.Tensor] = []
-            all_text_tokens.append(temp_tokens)
-            for item in sentences:
-                sent = item["sent"]
-                text_tokens = self.tokenizer.convert_tokens_to_ids(sent)
-                text_tokens = torch.tensor(text_tokens, dtype=torch.int32, device=self.device).unsqueeze(0)
-                if verbose:
-                    print(text_tokens)
-                    print(f"text_tokens shape: {text_tokens.shape}, text_tokens type: {text_tokens.dtype}")
-                    # debug tokenizer
-                    text_token_syms = self.tokenizer.convert_ids_to_tokens(text_tokens[0].tolist())
-                    print("text_token_syms is same as sentence tokens", text_token_syms == sent) 
-                temp_tokens.append(text_tokens)
-        
-            
-        # Sequential processing of bucketing data
-        all_batch_num = sum(len(s) for s in all_sentences)
-        all_batch_codes = []
-        processed_num = 0
-        for item_tokens in all_text_tokens:
-            batch_num = len(item_tokens)
-            if batch_num > 1:
-                batch_text_tokens = self.pad_tokens_cat(item_tokens)
+    def vocode(self, latent, cond_mel):
+        """BigVGAN 解码单个 latent，返回 int16 取值范围的 float 音频 ``[1, T]``（CPU）"""
+        with torch.no_grad():
+            with torch.amp.autocast(latent.device.type, enabled=self.dtype is not None, dtype=self.dtype):
+                wav, _ = self.bigvgan(latent, cond_mel.transpose(1, 2))
+                wav = wav.squeeze(1)
+        wav = torch.clamp(32767 * wav.float(), -32767.0, 32767.0)
+        return wav.cpu()
+
+    @staticmethod
+    def _cancel_generation_kwargs(cancel_token) -> Dict:
+        """取消标记对应的 ``generate`` 参数：取消后在下一个解码步停止"""
+        if cancel_token is None:
+            return {}
+        return {"stopping_criteria": StoppingCriteriaList([CancellationStoppingCriteria(cancel_token)])}
+
+    @staticmethod
+    def _check_cancelled(cancel_token, writer=None, boundary=False):
+        """
+        已取消时删除长文本模式写了一半的文件，并抛出 ``SynthesisCancelled``；
+        ``boundary`` 为 True（分句 / 窗口边界）时同样处理抢占请求，抛出 ``SynthesisPreempted``。
+        """
+        if cancel_token is None:
+            return
+        if not cancel_token.cancelled and not (boundary and cancel_token.preemption_requested):
+            return
+        if writer is not None:
+            writer.discard()
+        cancel_token.raise_if_cancelled()
+        cancel_token.raise_if_preempted()
+
+    def _finish_profile(self, profile, result, save_start_time, trace_path=None, return_profile=False):
+        """记录保存阶段和整体区间，保存 ``last_profile``，按需导出 Chrome trace"""
+        profile.add("save", save_start_time)
+        profile.meta["cold_start"] = self.synthesis_count == 0 and not self.warmup_stats
+        if not self._warming_up:
+            self.synthesis_count += 1
+        profile.add(profile.name, profile.origin, **profile.meta)
+        if self.memory_monitor is not None:
+            self.memory_monitor.annotate(profile)
+        self.last_profile = profile
+        if trace_path:
+            profile.save_chrome_trace(trace_path)
+            logger.info(">> chrome trace saved to: %s", trace_path)
+        if return_profile:
+            return result, profile
+        return result
+
+    def _make_result(self, wavs: List[torch.Tensor], sampling_rate, output_path=None) -> SynthesisResult:
+        """拼接各分句音频为 ``SynthesisResult``，指定了 ``output_path`` 时交给 ``wav_writer`` 在后台写入"""
+        offsets = np.cumsum([0] + [wav.shape[-1] for wav in wavs[:-1]]).tolist()
+        wav_data = torch.cat(wavs, dim=1).type(torch.int16).numpy().T
+        saved = None
+        if output_path:
+            saved = self.wav_writer.submit(output_path, wav_data, sampling_rate)
+            logger.info(">> wav file queued for saving: %s", output_path)
+        return SynthesisResult(sampling_rate, wav_data, offsets, output_path, saved)
+
+    @staticmethod
+    def _generation_params(generation_kwargs) -> Dict:
+        """取出 GPT 生成参数（带默认值），其余参数原样传给 ``generate``"""
+        generation = dict(
+            do_sample=generation_kwargs.pop("do_sample", True),
+            top_p=generation_kwargs.pop("top_p", 0.8),
+            top_k=generation_kwargs.pop("top_k", 30),
+            temperature=generation_kwargs.pop("temperature", 1.0),
+            length_penalty=generation_kwargs.pop("length_penalty", 0.0),
+            num_beams=generation_kwargs.pop("num_beams", 3),
+            repetition_penalty=generation_kwargs.pop("repetition_penalty", 10.0),
+            max_mel_tokens=generation_kwargs.pop("max_mel_tokens", 600),
+        )
+        generation.update(generation_kwargs)
+        return generation
+
+    def _synthesize_sentences_fast(self, audio_prompt, auto_conditioning, sentences, profile, generation, seeds=None,
+                                   cache_params=None, groups=None, max_text_tokens_per_sentence=100, bucket_max_size=4,
+                                   window_size=None, writer=None, cancel_token=None, keep_records=False,
+                                   summary_level=logging.DEBUG):
+        """
+        ``infer_fast`` / ``infer_batch`` 的分句合成：查分句缓存，未命中的分句分桶批量解码，再逐句求 latent、按 chunk 声码。
+        Args:
+            sentences: 分句的 token 列表
+            generation: ``_generation_params`` 的结果
+            seeds: 每个分句的随机种子，``None`` 表示不固定
+            cache_params: 每个分句写入缓存键的生成参数，启用分句缓存时使用
+            groups: 每个分句所属的文本序号，声码器 chunk 不跨文本拼接；``None`` 表示同一段文本
+            window_size: 每个窗口的分句数，每个窗口完成后写入 ``writer`` 并释放
+        Returns:
+            ``(sentence_wavs, sentence_records, stats)``：分句序号到音频 / 记录的字典（写入 ``writer`` 的分句不保留），
+            以及 ``batch_num``、``bucket_count``、``chunk_length`` 统计
+        """
+        generation = dict(generation)
+        max_mel_tokens = generation.pop("max_mel_tokens")
+        num_beams = generation["num_beams"]
+        autoregressive_batch_size = 1
+        cancel_kwargs = self._cancel_generation_kwargs(cancel_token)
+        cond_mel_lengths = torch.tensor([auto_conditioning.shape[-1]], device=self.device)
+        window_size = window_size or max(1, len(sentences))
+
+        # 命中分句缓存的句子直接复用音频，只合成未命中的句子
+        sentence_wavs: Dict[int, torch.Tensor] = {}
+        cache_keys: Dict[int, str] = {}
+        # 各分句的 GPT codes / latent，用于写入缓存和 save_codes
+        sentence_records: Dict[int, Dict[str, np.ndarray]] = {}
+        if self.sentence_cache is not None:
+            voice_hash = self._voice_hash(audio_prompt)
+        stats = dict(batch_num=0, bucket_count=0, chunk_length=0)
+        for window_start in range(0, len(sentences), window_size):
+            self._check_cancelled(cancel_token, writer, boundary=True)
+            window_idxs = list(range(window_start, min(window_start + window_size, len(sentences))))
+            if self.sentence_cache is not None:
+                m_start_time = time.perf_counter()
+                for idx in window_idxs:
+                    cache_keys[idx] = self._sentence_cache_key(voice_hash, sentences[idx], cache_params[idx])
+                    cached = self.sentence_cache.get(cache_keys[idx])
+                    if cached is not None:
+                        sentence_wavs[idx] = torch.from_numpy(cached.pop("wav")).float()
+                        sentence_records[idx] = cached
+                profile.add("cache", m_start_time, sentences=len(window_idxs),
+                            hits=len([idx for idx in window_idxs if idx in sentence_wavs]))
+                logger.log(summary_level, ">> sentence cache hits: %d/%d",
+                           len([idx for idx in window_idxs if idx in sentence_wavs]), len(window_idxs))
+            pending_idxs = [idx for idx in window_idxs if idx not in sentence_wavs]
+
+            # text processing
+            all_text_tokens: List[List[torch.Tensor]] = []
+            self._set_gr_progress(0.1, "text processing...")
+            if len(pending_idxs) > 0:
+                all_sentences = self.bucket_sentences([sentences[idx] for idx in pending_idxs], bucket_max_size=bucket_max_size)
             else:
-                batch_text_tokens = item_tokens[0]
-            processed_num += batch_num
-            # gpt speech
-            self._set_gr_progress(0.2 + 0.3 * processed_num/all_batch_num, f"gpt inference speech... {processed_num}/{all_batch_num}")
-            m_start_time = time.perf_counter()
-            with torch.no_grad():
-                with torch.amp.autocast(batch_text_tokens.device.type, enabled=self.dtype is not None, dtype=self.dtype):
-                    temp_codes = self.gpt.inference_speech(auto_conditioning, batch_text_tokens,
-                                        cond_mel_lengths=cond_mel_lengths,
-                                        # text_lengths=text_len,
-                                        do_sample=do_sample,
-                                        top_p=top_p,
-                                        top_k=top_k,
-                                        temperature=temperature,
-                                        num_return_sequences=autoregressive_batch_size,
-                                        length_penalty=length_penalty,
-                                        num_beams=num_beams,
-                                        repetition_penalty=repetition_penalty,
-                                        max_generate_length=max_mel_tokens,
-                                        **generation_kwargs)
-                    all_batch_codes.append(temp_codes)
-            gpt_gen_time += time.perf_counter() - m_start_time
-
-        # gpt latent
-        self._set_gr_progress(0.5, "gpt inference latents...")
-        all_idxs = []
-        all_latents = []
-        has_warned = False
-        for batch_codes, batch_tokens, batch_sentences in zip(all_batch_codes, all_text_tokens, all_sentences):
-            for i in range(batch_codes.shape[0]):
-                codes = batch_codes[i]  # [x]
-                if not has_warned and codes[-1] != self.stop_mel_token:
-                    warnings.warn(
-                        f"WARN: generation stopped due to exceeding `max_mel_tokens` ({max_mel_tokens}). "
-                        f"Consider reducing `max_text_tokens_per_sentence`({max_text_tokens_per_sentence}) or increasing `max_mel_tokens`.",
-                        category=RuntimeWarning
-                    )
-                    has_warned = True
-                codes = codes.unsqueeze(0)  # [x] -> [1, x]
-                if verbose:
-                    print("codes:", codes.shape)
-                    print(codes)
-                codes, code_lens = self.remove_long_silence(codes, silent_token=52, max_consecutive=30)
-                if verbose:
-                    print("fix codes:", codes.shape)
-                    print(codes)
-                    print("code_lens:", code_lens)
-                text_tokens = batch_tokens[i]
-                all_idxs.append(batch_sentences[i]["idx"])
+                all_sentences = []
+            bucket_count = len(all_sentences)
+            logger.log(summary_level, ">> sentences bucket_count: %d bucket sizes: %s bucket_max_size: %d", bucket_count,
+                       lazy(lambda: [(len(s), [t["idx"] for t in s]) for s in all_sentences]), bucket_max_size)
+            for bucket in all_sentences:
+                temp_tokens: List[torch.Tensor] = []
+                all_text_tokens.append(temp_tokens)
+                for item in bucket:
+                    sent = item["sent"]
+                    text_tokens = self.tokenizer.convert_tokens_to_ids(sent)
+                    text_tokens = torch.tensor(text_tokens, dtype=torch.int32, device=self.device).unsqueeze(0)
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("text_tokens: %s, shape: %s, type: %s", text_tokens, text_tokens.shape, text_tokens.dtype)
+                        # debug tokenizer
+                        text_token_syms = self.tokenizer.convert_ids_to_tokens(text_tokens[0].tolist())
+                        logger.debug("text_token_syms is same as sentence tokens: %s", text_token_syms == sent)
+                    temp_tokens.append(text_tokens)
+
+            # Sequential processing of bucketing data
+            all_batch_num = sum(len(s) for s in all_sentences)
+            all_batch_codes = []
+            processed_num = 0
+            for item_tokens, batch_sentences in zip(all_text_tokens, all_sentences):
+                self._check_cancelled(cancel_token, writer)
+                batch_num = len(item_tokens)
+                if batch_num > 1:
+                    batch_text_tokens = self.pad_tokens_cat(item_tokens)
+                else:
+                    batch_text_tokens = item_tokens[0]
+                processed_num += batch_num
+                # gpt speech
+                self._set_gr_progress(0.2 + 0.3 * processed_num/all_batch_num, f"gpt inference speech... {processed_num}/{all_batch_num}")
                 m_start_time = time.perf_counter()
                 with torch.no_grad():
-                    with torch.amp.autocast(text_tokens.device.type, enabled=self.dtype is not None, dtype=self.dtype):
-                        latent = \
-                            self.gpt(auto_conditioning, text_tokens,
-                                        torch.tensor([text_tokens.shape[-1]], device=text_tokens.device), codes,
-                                        code_lens*self.gpt.mel_length_compression,
-                                        cond_mel_lengths=torch.tensor([auto_conditioning.shape[-1]], device=text_tokens.device),
-                                        return_latent=True, clip_inputs=False)
-                        gpt_forward_time += time.perf_counter() - m_start_time
-                        all_latents.append(latent)
-        del all_batch_codes, all_text_tokens, all_sentences
-        # bigvgan chunk
-        chunk_size = 2
-        all_latents = [all_latents[all_idxs.index(i)] for i in range(len(all_latents))]
-        if verbose:
-            print(">> all_latents:", len(all_latents))
-            print("  latents length:", [l.shape[1] for l in all_latents])
-        chunk_latents = [all_latents[i : i + chunk_size] for i in range(0, len(all_latents), chunk_size)]
-        chunk_length = len(chunk_latents)
-        latent_length = len(all_latents)
-
-        # bigvgan chunk decode
-        self._set_gr_progress(0.7, "bigvgan decode...")
-        tqdm_progress = tqdm(total=latent_length, desc="bigvgan")
-        for items in chunk_latents:
-            tqdm_progress.update(len(items))
-            latent = torch.cat(items, dim=1)
-            with torch.no_grad():
-                with torch.amp.autocast(latent.device.type, enabled=self.dtype is not None, dtype=self.dtype):
+                    with torch.amp.autocast(batch_text_tokens.device.type, enabled=self.dtype is not None, dtype=self.dtype):
+                        temp_codes = self.gpt.inference_speech(auto_conditioning, batch_text_tokens,
+                                            cond_mel_lengths=cond_mel_lengths,
+                                            # text_lengths=text_len,
+                                            seeds=None if seeds is None else
+                                                [seeds[pending_idxs[item["idx"]]] for item in batch_sentences],
+                                            num_return_sequences=autoregressive_batch_size,
+                                            max_generate_length=max_mel_tokens,
+                                            **cancel_kwargs,
+                                            **generation)
+                        self._check_cancelled(cancel_token, writer)
+                        all_batch_codes.append(temp_codes)
+                profile.add("generate", m_start_time, bucket=stats["bucket_count"] + len(all_batch_codes) - 1,
+                            sentences=[pending_idxs[item["idx"]] for item in batch_sentences],
+                            text_tokens=sum(int(t.shape[-1]) for t in item_tokens),
+                            mel_tokens=int((temp_codes != self.stop_mel_token).sum()),
+                            kv_cache_mb=round(self.estimate_kv_cache_bytes(
+                                batch_num, batch_text_tokens.shape[-1], temp_codes.shape[-1], num_beams) / MB, 2))
+
+            # gpt latent
+            self._set_gr_progress(0.5, "gpt inference latents...")
+            all_idxs = []
+            all_latents = []
+            has_warned = False
+            for batch_codes, batch_tokens, batch_sentences in zip(all_batch_codes, all_text_tokens, all_sentences):
+                for i in range(batch_codes.shape[0]):
+                    codes = batch_codes[i]  # [x]
+                    if not has_warned and codes[-1] != self.stop_mel_token:
+                        warnings.warn(
+                            f"WARN: generation stopped due to exceeding `max_mel_tokens` ({max_mel_tokens}). "
+                            f"Consider reducing `max_text_tokens_per_sentence`({max_text_tokens_per_sentence}) or increasing `max_mel_tokens`.",
+                            category=RuntimeWarning
+                        )
+                        has_warned = True
+                    codes = codes.unsqueeze(0)  # [x] -> [1, x]
+                    raw_codes = codes
+                    logger.debug("codes: %s %s", codes.shape, codes)
+                    codes, code_lens = self.remove_long_silence(codes, silent_token=52, max_consecutive=30)
+                    logger.debug("fix codes: %s %s, code_lens: %s", codes.shape, codes, code_lens)
+                    text_tokens = batch_tokens[i]
+                    sent_idx = pending_idxs[batch_sentences[i]["idx"]]
+                    all_idxs.append(sent_idx)
                     m_start_time = time.perf_counter()
-                    wav, _ = self.bigvgan(latent, auto_conditioning.transpose(1, 2))
-                    bigvgan_time += time.perf_counter() - m_start_time
-                    wav = wav.squeeze(1)
-                    pass
-            wav = torch.clamp(32767 * wav, -32767.0, 32767.0)
-            wavs.append(wav.cpu()) # to cpu before saving
+                    with torch.no_grad():
+                        with torch.amp.autocast(text_tokens.device.type, enabled=self.dtype is not None, dtype=self.dtype):
+                            latent = \
+                                self.gpt(auto_conditioning, text_tokens,
+                                            torch.tensor([text_tokens.shape[-1]], device=text_tokens.device), codes,
+                                            code_lens*self.gpt.mel_length_compression,
+                                            cond_mel_lengths=torch.tensor([auto_conditioning.shape[-1]], device=text_tokens.device),
+                                            return_latent=True, clip_inputs=False)
+                            profile.add("latent", m_start_time, sentence=sent_idx, mel_tokens=int(code_lens[0]))
+                            all_latents.append(latent)
+                    if keep_records:
+                        sentence_records[sent_idx] = self._sentence_record(raw_codes, text_tokens, latent)
+            del all_batch_codes, all_text_tokens, all_sentences
+            # bigvgan chunk
+            chunk_size = 2
+            # 恢复为原始分句顺序
+            order = sorted(range(len(all_idxs)), key=lambda k: all_idxs[k])
+            all_idxs = [all_idxs[k] for k in order]
+            all_latents = [all_latents[k] for k in order]
+            logger.log(summary_level, ">> all_latents: %d, latents length: %s", len(all_latents),
+                       lazy(lambda: [l.shape[1] for l in all_latents]))
+            # 相邻分句每 chunk_size 个拼成一个 chunk，不跨文本
+            chunk_latents: List[List[torch.Tensor]] = []
+            chunk_idxs: List[List[int]] = []
+            for idx, latent in zip(all_idxs, all_latents):
+                if chunk_idxs and len(chunk_idxs[-1]) < chunk_size and \
+                        (groups is None or groups[chunk_idxs[-1][-1]] == groups[idx]):
+                    chunk_idxs[-1].append(idx)
+                    chunk_latents[-1].append(latent)
+                else:
+                    chunk_idxs.append([idx])
+                    chunk_latents.append([latent])
+            chunk_length = len(chunk_latents)
+            latent_length = len(all_latents)
+
+            # bigvgan chunk decode
+            self._set_gr_progress(0.7, "bigvgan decode...")
+            tqdm_progress = tqdm(total=latent_length, desc="bigvgan")
+            for items, idxs in zip(chunk_latents, chunk_idxs):
+                if cancel_token is not None and cancel_token.cancelled:
+                    tqdm_progress.close()
+                    self._check_cancelled(cancel_token, writer)
+                tqdm_progress.update(len(items))
+                latent = torch.cat(items, dim=1)
+                with torch.no_grad():
+                    with torch.amp.autocast(latent.device.type, enabled=self.dtype is not None, dtype=self.dtype):
+                        m_start_time = time.perf_counter()
+                        wav, _ = self.bigvgan(latent, auto_conditioning.transpose(1, 2))
+                        profile.add("vocode", m_start_time, sentences=list(idxs), frames=int(latent.shape[1]))
+                        wav = wav.squeeze(1)
+                        pass
+                wav = torch.clamp(32767 * wav, -32767.0, 32767.0)
+                wav = wav.cpu() # to cpu before saving
+                # 按各分句的 latent 长度把 chunk 音频切回分句
+                samples_per_frame = wav.shape[-1] // latent.shape[1]
+                offset = 0
+                for item_latent, idx in zip(items, idxs):
+                    length = item_latent.shape[1] * samples_per_frame
+                    sentence_wavs[idx] = wav[:, offset : offset + length]
+                    offset += length
+                    if idx in cache_keys:
+                        self.sentence_cache.put(cache_keys[idx], sentence_wavs[idx].type(torch.int16).numpy(),
+                                                **sentence_records[idx])
+
+            # clear cache
+            tqdm_progress.close()  # 确保进度条被关闭
+            del all_latents, chunk_latents
+            stats["batch_num"] += all_batch_num
+            stats["bucket_count"] += bucket_count
+            stats["chunk_length"] += chunk_length
+            if writer is not None:
+                for idx in window_idxs:
+                    # 分桶时会跳过空白分句，这些分句没有音频
+                    wav = sentence_wavs.pop(idx, None)
+                    sentence_records.pop(idx, None)
+                    if wav is not None:
+                        writer.write(wav)
+        return sentence_wavs, sentence_records, stats
+
+    # 快速推理：对于“多句长文本”，可实现至少 2~10 倍以上的速度提升~ （First modified by sunnyboxs 2025-04-16）
+    @_memory_profiled
+    @_weights_loaded
+    def infer_fast(self, audio_prompt, text, output_path, verbose=False, max_text_tokens_per_sentence=100, sentences_bucket_max_size=4,
+                   seed=None, save_codes=False, long_form=False, long_form_window=32, cancel_token=None, trace_path=None,
+                   return_profile=False, return_result=False, **generation_kwargs):
+        """
+        Args:
+            ``verbose``: 以 INFO 级别输出分句、分桶和缓存命中等摘要；逐句的 token / codes 张量只在 DEBUG 级别输出（见 ``indextts.utils.log``）
+            ``max_text_tokens_per_sentence``: 分句的最大token数，默认``100``，可以根据GPU硬件情况调整
+                - 越小，batch 越多，推理速度越*快*，占用内存更多，可能影响质量
+                - 越大，batch 越少，推理速度越*慢*，占用内存和质量更接近于非快速推理
+            ``sentences_bucket_max_size``: 分句分桶的最大容量，默认``4``，可以根据GPU内存调整
+                - 越大，bucket数量越少，batch越多，推理速度越*快*，占用内存更多，可能影响质量
+                - 越小，bucket数量越多，batch越少，推理速度越*慢*，占用内存和质量更接近于非快速推理
+            ``seed``: 随机种子（如条目 id），每个分句的种子由它和分句序号派生，默认``None``不固定
+                - 相同种子下输出可复现，且与分桶方式无关
+                - 相同种子下各分句的 GPT codes 与 ``infer`` 一致；但声码器按整个分桶 chunk 运行，音频与 ``infer`` 略有差异
+            ``save_codes``: 是否在 ``output_path`` 旁保存同名 ``.npz``（各分句的 GPT codes 和 latent），之后可用 ``revocode`` 只重跑声码器
+            ``long_form``: 长文本模式，每 ``long_form_window`` 个分句为一个窗口分批合成，完成后立即写入 ``output_path`` 并释放，
+                峰值内存与文本长度无关；需要指定 ``output_path``，不支持 ``save_codes``
+            ``cancel_token``: ``CancellationToken``，取消后在下一个解码步、分桶或声码器 chunk 处停止并抛出 ``SynthesisCancelled``，
+                已完成的分句仍会写入分句缓存；抢占请求在窗口之间生效（非长文本模式下整段文本为一个窗口）
+            ``trace_path``: 把本次合成的分阶段计时（``SynthesisProfile``）导出为 Chrome trace JSON
+            ``return_profile``: 为 True 时返回 ``(原返回值, SynthesisProfile)``；计时也总会保存在 ``self.last_profile``
+            ``return_result``: 为 True 时返回 ``SynthesisResult``（int16 音频、时长和各分句的起始位置），
+                ``output_path`` 由 ``self.wav_writer`` 在后台写入，读取文件前需 ``wait_saved``
+        """
+        if long_form and (not output_path or save_codes):
+            raise ValueError("long_form requires output_path and does not support save_codes")
+        logger.info(">> start fast inference...")
+        # verbose 时摘要信息记为 INFO，否则记为 DEBUG；逐句的张量信息总是 DEBUG
+        summary_level = logging.INFO if verbose else logging.DEBUG
+        self._set_gr_progress(0, "start fast inference...")
+        logger.log(summary_level, "origin text: %s", text)
+        start_time = time.perf_counter()
+        profile = SynthesisProfile("infer_fast")
+
+        cond_mel = self.get_conditioning(audio_prompt, verbose=verbose, profile=profile)
+        cond_mel_frame = cond_mel.shape[-1]
+
+        auto_conditioning = cond_mel
 
-        # clear cache
-        tqdm_progress.close()  # 确保进度条被关闭
-        del all_latents, chunk_latents
+        # text_tokens
+        text_tokens_list, sentences = self.split_text(text, max_text_tokens_per_sentence, profile=profile)
+        logger.log(summary_level, ">> text token count: %d, splited sentences count: %d, max_text_tokens_per_sentence: %d",
+                   len(text_tokens_list), len(sentences), max_text_tokens_per_sentence)
+        logger.debug("sentences:\n%s", lazy(lambda: "\n".join(str(sent) for sent in sentences)))
+        generation = self._generation_params(generation_kwargs)
+        sampling_rate = 24000
+        bucket_max_size = sentences_bucket_max_size if self.device != "cpu" else 1
+        # 长文本模式下按窗口分批合成，每个窗口完成后写入文件并释放，否则整段文本作为一个窗口
+        writer = IncrementalWavWriter(output_path, sampling_rate) if long_form else None
+        sentence_seeds = None if seed is None else [derive_seed(seed, idx) for idx in range(len(sentences))]
+        try:
+            sentence_wavs, sentence_records, stats = self._synthesize_sentences_fast(
+                audio_prompt, auto_conditioning, sentences, profile, generation, seeds=sentence_seeds,
+                # 缓存键使用各分句实际的种子：重复的分句、换了位置的分句不会命中其他序号的结果
+                cache_params=[dict(generation, seed=None if seed is None else sentence_seeds[idx])
+                              for idx in range(len(sentences))],
+                max_text_tokens_per_sentence=max_text_tokens_per_sentence, bucket_max_size=bucket_max_size,
+                window_size=long_form_window if long_form else max(1, len(sentences)), writer=writer,
+                cancel_token=cancel_token, keep_records=save_codes or self.sentence_cache is not None,
+                summary_level=summary_level)
+        except BaseException:
+            # 出错或取消时不留下截断的音频文件
+            if writer is not None:
+                writer.discard()
+            raise
+        sentence_idxs = sorted(sentence_wavs.keys())
+        wavs = [sentence_wavs[idx] for idx in sentence_idxs]
         end_time = time.perf_counter()
         self.torch_empty_cache()
 
         # wav audio output
         self._set_gr_progress(0.9, "save audio...")
-        wav = torch.cat(wavs, dim=1)
-        wav_length = wav.shape[-1] / sampling_rate
-        print(f">> Reference audio length: {cond_mel_frame * 256 / sampling_rate:.2f} seconds")
-        print(f">> gpt_gen_time: {gpt_gen_time:.2f} seconds")
-        print(f">> gpt_forward_time: {gpt_forward_time:.2f} seconds")
-        print(f">> bigvgan_time: {bigvgan_time:.2f} seconds")
-        print(f">> Total fast inference time: {end_time - start_time:.2f} seconds")
-        print(f">> Generated audio length: {wav_length:.2f} seconds")
-        print(f">> [fast] bigvgan chunk_length: {chunk_length}")
-        print(f">> [fast] batch_num: {all_batch_num} bucket_max_size: {bucket_max_size}", f"bucket_count: {bucket_count}" if bucket_max_size > 1 else "")
-        print(f">> [fast] RTF: {(end_time - start_time) / wav_length:.4f}")
+        save_start_time = time.perf_counter()
+        if writer is not None:
+            writer.close()
+            wav_length = writer.duration
+        else:
+            wav = torch.cat(wavs, dim=1)
+            wav_length = wav.shape[-1] / sampling_rate
+        totals = profile.totals()
+        logger.info(">> Reference audio length: %.2f seconds", cond_mel_frame * 256 / sampling_rate)
+        logger.info(">> gpt_gen_time: %.2f seconds", totals.get("generate", 0))
+        logger.info(">> gpt_forward_time: %.2f seconds", totals.get("latent", 0))
+        logger.info(">> bigvgan_time: %.2f seconds", totals.get("vocode", 0))
+        logger.info(">> Total fast inference time: %.2f seconds", end_time - start_time)
+        logger.info(">> Generated audio length: %.2f seconds", wav_length)
+        logger.info(">> [fast] bigvgan chunk_length: %d", stats["chunk_length"])
+        logger.info(">> [fast] batch_num: %d bucket_max_size: %d %s", stats["batch_num"], bucket_max_size,
+                    f"bucket_count: {stats['bucket_count']}" if bucket_max_size > 1 else "")
+        logger.info(">> [fast] RTF: %.4f", (end_time - start_time) / wav_length)
+        profile.meta.update(audio_seconds=wav_length, rtf=(end_time - start_time) / wav_length,
+                            sentences=len(sentences), text_tokens=len(text_tokens_list))
 
+        if writer is not None:
+            logger.info(">> wav file saved to: %s", output_path)
+            result = output_path
+            if return_result:
+                result = SynthesisResult(sampling_rate, None, writer.offsets, output_path, num_samples=writer.num_samples)
+            return self._finish_profile(profile, result, save_start_time, trace_path, return_profile)
+        if return_result:
+            result = self._make_result(wavs, sampling_rate, output_path)
+            if save_codes and output_path:
+                self._save_codes(output_path, auto_conditioning,
+                                 [sentence_records[idx] for idx in sentence_idxs])
+            return self._finish_profile(profile, result, save_start_time, trace_path, return_profile)
         # save audio
         wav = wav.cpu()  # to cpu
         if output_path:
             # 直接保存音频到指定路径中
             os.makedirs(os.path.dirname(output_path), exist_ok=True)
             torchaudio.save(output_path, wav.type(torch.int16), sampling_rate)
-            print(">> wav file saved to:", output_path)
-            return output_path
+            logger.info(">> wav file saved to: %s", output_path)
+            if save_codes:
+                self._save_codes(output_path, auto_conditioning,
+                                 [sentence_records[idx] for idx in sentence_idxs])
+            return self._finish_profile(profile, output_path, save_start_time, trace_path, return_profile)
         else:
             # 返回以符合Gradio的格式要求
             wav_data = wav.type(torch.int16)
             wav_data = wav_data.numpy().T
-            return (sampling_rate, wav_data)
+            return self._finish_profile(profile, (sampling_rate, wav_data), save_start_time, trace_path, return_profile)
+
+    @_memory_profiled
+    @_weights_loaded
+    def infer_batch(self, audio_prompt, texts, output_paths=None, verbose=False, max_text_tokens_per_sentence=100,
+                    sentences_bucket_max_size=4, seeds=None, cancel_token=None, trace_path=None, return_profile=False,
+                    return_result=False, **generation_kwargs):
+        """
+        同一参考音频合成多段文本：各段文本的分句混合分桶、一起批量解码，适合合并同一音色的多个并发请求。
+        Args:
+            ``texts``: 文本列表，每段文本正则化后不能为空
+            ``output_paths``: 与 ``texts`` 等长的输出路径列表，默认``None``返回音频数据
+            ``seeds``: 与 ``texts`` 等长的随机种子列表，元素为``None``表示不固定；
+                固定种子的文本的 GPT codes 与单独调用 ``infer_fast`` 一致，与同批的其他文本无关（声码器分块不同，音频可能略有差异）
+            其余参数与 ``infer_fast`` 相同
+        Returns:
+            与 ``texts`` 一一对应的列表，每项为输出路径或 ``(sampling_rate, wav_data)``，``return_result`` 时为 ``SynthesisResult``
+        """
+        if output_paths is not None and len(output_paths) != len(texts):
+            raise ValueError(f"output_paths count mismatch: {len(output_paths)} vs {len(texts)}")
+        if seeds is not None and len(seeds) != len(texts):
+            raise ValueError(f"seeds count mismatch: {len(seeds)} vs {len(texts)}")
+        logger.info(">> start batch inference: %d texts", len(texts))
+        summary_level = logging.INFO if verbose else logging.DEBUG
+        self._set_gr_progress(0, "start batch inference...")
+        start_time = time.perf_counter()
+        profile = SynthesisProfile("infer_batch")
+
+        auto_conditioning = self.get_conditioning(audio_prompt, verbose=verbose, profile=profile)
+        cond_mel_frame = auto_conditioning.shape[-1]
+
+        # 各段文本的分句依次排列，offsets[i]:offsets[i + 1] 为第 i 段文本的分句
+        sentences: List[List[str]] = []
+        groups: List[int] = []
+        offsets = [0]
+        text_token_count = 0
+        for i, text in enumerate(texts):
+            text_tokens_list, text_sentences = self.split_text(text, max_text_tokens_per_sentence, profile=profile)
+            if len(text_sentences) == 0:
+                raise ValueError(f"text {i} is empty after normalization: {text!r}")
+            sentences.extend(text_sentences)
+            groups.extend([i] * len(text_sentences))
+            offsets.append(len(sentences))
+            text_token_count += len(text_tokens_list)
+        logger.log(summary_level, ">> texts: %d, text token count: %d, splited sentences count: %d, max_text_tokens_per_sentence: %d",
+                   len(texts), text_token_count, len(sentences), max_text_tokens_per_sentence)
+        generation = self._generation_params(generation_kwargs)
+        seeds = list(seeds) if seeds is not None else [None] * len(texts)
+        # 部分文本固定了种子时，其余文本使用随机种子，整批统一按分句独立采样
+        sentence_seeds = None
+        if any(seed is not None for seed in seeds):
+            request_seeds = [random.getrandbits(63) if seed is None else seed for seed in seeds]
+            sentence_seeds = [derive_seed(request_seeds[groups[idx]], idx - offsets[groups[idx]])
+                              for idx in range(len(sentences))]
+        sampling_rate = 24000
+        bucket_max_size = sentences_bucket_max_size if self.device != "cpu" else 1
+        sentence_wavs, _, stats = self._synthesize_sentences_fast(
+            audio_prompt, auto_conditioning, sentences, profile, generation, seeds=sentence_seeds,
+            cache_params=[dict(generation, seed=None if seeds[group] is None else sentence_seeds[idx])
+                          for idx, group in enumerate(groups)], groups=groups,
+            max_text_tokens_per_sentence=max_text_tokens_per_sentence, bucket_max_size=bucket_max_size,
+            cancel_token=cancel_token, keep_records=self.sentence_cache is not None, summary_level=summary_level)
+        end_time = time.perf_counter()
+        self.torch_empty_cache()
+
+        # wav audio output
+        self._set_gr_progress(0.9, "save audio...")
+        save_start_time = time.perf_counter()
+        results = []
+        wav_length = 0
+        for i in range(len(texts)):
+            text_wavs = [sentence_wavs[idx] for idx in range(offsets[i], offsets[i + 1])]
+            if return_result:
+                results.append(self._make_result(text_wavs, sampling_rate, output_paths[i] if output_paths else None))
+                wav_length += results[-1].duration
+                continue
+            wav = torch.cat(text_wavs, dim=1)
+            wav_length += wav.shape[-1] / sampling_rate
+            if output_paths is not None and output_paths[i]:
+                if os.path.dirname(output_paths[i]) != "":
+                    os.makedirs(os.path.dirname(output_paths[i]), exist_ok=True)
+                torchaudio.save(output_paths[i], wav.type(torch.int16), sampling_rate)
+                results.append(output_paths[i])
+            else:
+                results.append((sampling_rate, wav.type(torch.int16).numpy().T))
+        totals = profile.totals()
+        logger.info(">> Reference audio length: %.2f seconds", cond_mel_frame * 256 / sampling_rate)
+        logger.info(">> gpt_gen_time: %.2f seconds", totals.get("generate", 0))
+        logger.info(">> gpt_forward_time: %.2f seconds", totals.get("latent", 0))
+        logger.info(">> bigvgan_time: %.2f seconds", totals.get("vocode", 0))
+        logger.info(">> Total batch inference time: %.2f seconds", end_time - start_time)
+        logger.info(">> Generated audio length: %.2f seconds (%d texts)", wav_length, len(texts))
+        logger.info(">> [batch] batch_num: %d bucket_max_size: %d %s", stats["batch_num"], bucket_max_size,
+                    f"bucket_count: {stats['bucket_count']}" if bucket_max_size > 1 else "")
+        logger.info(">> [batch] RTF: %.4f", (end_time - start_time) / wav_length)
+        profile.meta.update(audio_seconds=wav_length, rtf=(end_time - start_time) / wav_length, texts=len(texts),
+                            sentences=len(sentences), text_tokens=text_token_count)
+        return self._finish_profile(profile, results, save_start_time, trace_path, return_profile)
 
     # 原始推理模式
-    def infer(self, audio_prompt, text, output_path, verbose=False, max_text_tokens_per_sentence=120, **generation_kwargs):
-        print(">> start inference...")
+    @_memory_profiled
+    @_weights_loaded
+    def infer(self, audio_prompt, text, output_path, verbose=False, max_text_tokens_per_sentence=120, seed=None, save_codes=False,
+              long_form=False, cancel_token=None, trace_path=None, return_profile=False, return_result=False,
+              **generation_kwargs):
+        """
+        Args:
+            ``verbose``: 以 INFO 级别输出分句摘要；逐句的 token / codes 张量只在 DEBUG 级别输出（见 ``indextts.utils.log``）
+            ``long_form``: 长文本模式，每个分句合成后立即写入 ``output_path`` 并释放，峰值内存与文本长度无关；
+                需要指定 ``output_path``，不支持 ``save_codes``
+            ``cancel_token``: ``CancellationToken``，取消后在下一个解码步或分句处停止并抛出 ``SynthesisCancelled``，
+                已完成的分句仍会写入分句缓存；抢占请求在分句之间生效
+            ``trace_path``: 把本次合成的分阶段计时（``SynthesisProfile``）导出为 Chrome trace JSON
+            ``return_profile``: 为 True 时返回 ``(原返回值, SynthesisProfile)``；计时也总会保存在 ``self.last_profile``
+            ``return_result``: 为 True 时返回 ``SynthesisResult``，``output_path`` 在后台写入，见 ``infer_fast``
+        """
+        if long_form and (not output_path or save_codes):
+            raise ValueError("long_form requires output_path and does not support save_codes")
+        logger.info(">> start inference...")
+        summary_level = logging.INFO if verbose else logging.DEBUG
         self._set_gr_progress(0, "start inference...")
-        if verbose:
-            print(f"origin text:{text}")
+        logger.log(summary_level, "origin text: %s", text)
         start_time = time.perf_counter()
+        profile = SynthesisProfile("infer")
 
-        # 如果参考音频改变了，才需要重新生成 cond_mel, 提升速度
-        if self.cache_cond_mel is None or self.cache_audio_prompt != audio_prompt:
-            audio, sr = torchaudio.load(audio_prompt)
-            audio = torch.mean(audio, dim=0, keepdim=True)
-            if audio.shape[0] > 1:
-                audio = audio[0].unsqueeze(0)
-            audio = torchaudio.transforms.Resample(sr, 24000)(audio)
-            cond_mel = MelSpectrogramFeatures()(audio).to(self.device)
-            cond_mel_frame = cond_mel.shape[-1]
-            if verbose:
-                print(f"cond_mel shape: {cond_mel.shape}", "dtype:", cond_mel.dtype)
-
-            self.cache_audio_prompt = audio_prompt
-            self.cache_cond_mel = cond_mel
-        else:
-            cond_mel = self.cache_cond_mel
-            cond_mel_frame = cond_mel.shape[-1]
-            pass
+        cond_mel = self.get_conditioning(audio_prompt, verbose=verbose, profile=profile)
+        cond_mel_frame = cond_mel.shape[-1]
 
         self._set_gr_progress(0.1, "text processing...")
         auto_conditioning = cond_mel
-        text_tokens_list = self.tokenizer.tokenize(text)
-        sentences = self.tokenizer.split_sentences(text_tokens_list, max_text_tokens_per_sentence)
-        if verbose:
-            print("text token count:", len(text_tokens_list))
-            print("sentences count:", len(sentences))
-            print("max_text_tokens_per_sentence:", max_text_tokens_per_sentence)
-            print(*sentences, sep="\n")
+        text_tokens_list, sentences = self.split_text(text, max_text_tokens_per_sentence, profile=profile)
+        logger.log(summary_level, "text token count: %d, sentences count: %d, max_text_tokens_per_sentence: %d",
+                   len(text_tokens_list), len(sentences), max_text_tokens_per_sentence)
+        logger.debug("sentences:\n%s", lazy(lambda: "\n".join(str(sent) for sent in sentences)))
         do_sample = generation_kwargs.pop("do_sample", True)
         top_p = generation_kwargs.pop("top_p", 0.8)
         top_k = generation_kwargs.pop("top_k", 30)
@@ -541,6 +1279,7 @@ class IndexTTS:
         num_beams = generation_kwargs.pop("num_beams", 3)
         repetition_penalty = generation_kwargs.pop("repetition_penalty", 10.0)
         max_mel_tokens = generation_kwargs.pop("max_mel_tokens", 600)
+        cancel_kwargs = self._cancel_generation_kwargs(cancel_token)
         sampling_rate = 24000
         # lang = "EN"
         # lang = "ZH"
@@ -550,114 +1289,254 @@ class IndexTTS:
         bigvgan_time = 0
         progress = 0
         has_warned = False
-        for sent in sentences:
-            text_tokens = self.tokenizer.convert_tokens_to_ids(sent)
-            text_tokens = torch.tensor(text_tokens, dtype=torch.int32, device=self.device).unsqueeze(0)
-            # text_tokens = F.pad(text_tokens, (0, 1))  # This may not be necessary.
-            # text_tokens = F.pad(text_tokens, (1, 0), value=0)
-            # text_tokens = F.pad(text_tokens, (0, 1), value=1)
-            if verbose:
-                print(text_tokens)
-                print(f"text_tokens shape: {text_tokens.shape}, text_tokens type: {text_tokens.dtype}")
-                # debug tokenizer
-                text_token_syms = self.tokenizer.convert_ids_to_tokens(text_tokens[0].tolist())
-                print("text_token_syms is same as sentence tokens", text_token_syms == sent)
-
-            # text_len = torch.IntTensor([text_tokens.size(1)], device=text_tokens.device)
-            # print(text_len)
-            progress += 1
-            self._set_gr_progress(0.2 + 0.4 * (progress-1) / len(sentences), f"gpt inference latent... {progress}/{len(sentences)}")
-            m_start_time = time.perf_counter()
-            with torch.no_grad():
-                with torch.amp.autocast(text_tokens.device.type, enabled=self.dtype is not None, dtype=self.dtype):
-                    codes = self.gpt.inference_speech(auto_conditioning, text_tokens,
-                                                        cond_mel_lengths=torch.tensor([auto_conditioning.shape[-1]],
-                                                                                      device=text_tokens.device),
-                                                        # text_lengths=text_len,
-                                                        do_sample=do_sample,
-                                                        top_p=top_p,
-                                                        top_k=top_k,
-                                                        temperature=temperature,
-                                                        num_return_sequences=autoregressive_batch_size,
-                                                        length_penalty=length_penalty,
-                                                        num_beams=num_beams,
-                                                        repetition_penalty=repetition_penalty,
-                                                        max_generate_length=max_mel_tokens,
-                                                        **generation_kwargs)
-                gpt_gen_time += time.perf_counter() - m_start_time
-                if not has_warned and (codes[:, -1] != self.stop_mel_token).any():
-                    warnings.warn(
-                        f"WARN: generation stopped due to exceeding `max_mel_tokens` ({max_mel_tokens}). "
-                        f"Input text tokens: {text_tokens.shape[1]}. "
-                        f"Consider reducing `max_text_tokens_per_sentence`({max_text_tokens_per_sentence}) or increasing `max_mel_tokens`.",
-                        category=RuntimeWarning
-                    )
-                    has_warned = True
-
-                code_lens = torch.tensor([codes.shape[-1]], device=codes.device, dtype=codes.dtype)
-                if verbose:
-                    print(codes, type(codes))
-                    print(f"codes shape: {codes.shape}, codes type: {codes.dtype}")
-                    print(f"code len: {code_lens}")
-
-                # remove ultra-long silence if exits
-                # temporarily fix the long silence bug.
-                codes, code_lens = self.remove_long_silence(codes, silent_token=52, max_consecutive=30)
-                if verbose:
-                    print(codes, type(codes))
-                    print(f"fix codes shape: {codes.shape}, codes type: {codes.dtype}")
-                    print(f"code len: {code_lens}")
-                self._set_gr_progress(0.2 + 0.4 * progress / len(sentences), f"gpt inference speech... {progress}/{len(sentences)}")
+        # 各分句的 GPT codes / latent，用于写入缓存和 save_codes
+        sentence_records: List[Dict[str, np.ndarray]] = []
+        keep_records = save_codes or self.sentence_cache is not None
+        writer = IncrementalWavWriter(output_path, sampling_rate) if long_form else None
+        if self.sentence_cache is not None:
+            voice_hash = self._voice_hash(audio_prompt)
+            generation_params = dict(do_sample=do_sample, top_p=top_p, top_k=top_k, temperature=temperature,
+                                     length_penalty=length_penalty, num_beams=num_beams,
+                                     repetition_penalty=repetition_penalty, max_mel_tokens=max_mel_tokens,
+                                     **generation_kwargs)
+        try:
+            for sent_idx, sent in enumerate(sentences):
+                self._check_cancelled(cancel_token, writer, boundary=True)
+                cache_key = None
+                if self.sentence_cache is not None:
+                    # 命中分句缓存则直接复用音频
+                    m_start_time = time.perf_counter()
+                    # 缓存键使用分句实际的种子，重复或换了位置的分句不会命中其他序号的结果
+                    cache_key = self._sentence_cache_key(
+                        voice_hash, sent, dict(generation_params, seed=None if seed is None else derive_seed(seed, sent_idx)))
+                    cached = self.sentence_cache.get(cache_key)
+                    profile.add("cache", m_start_time, sentence=sent_idx, hits=int(cached is not None))
+                    if cached is not None:
+                        progress += 1
+                        wavs.append(torch.from_numpy(cached.pop("wav")).float())
+                        sentence_records.append(cached)
+                        if writer is not None:
+                            writer.write(wavs.pop())
+                            sentence_records.clear()
+                        continue
+                text_tokens = self.tokenizer.convert_tokens_to_ids(sent)
+                text_tokens = torch.tensor(text_tokens, dtype=torch.int32, device=self.device).unsqueeze(0)
+                # text_tokens = F.pad(text_tokens, (0, 1))  # This may not be necessary.
+                # text_tokens = F.pad(text_tokens, (1, 0), value=0)
+                # text_tokens = F.pad(text_tokens, (0, 1), value=1)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("text_tokens: %s, shape: %s, type: %s", text_tokens, text_tokens.shape, text_tokens.dtype)
+                    # debug tokenizer
+                    text_token_syms = self.tokenizer.convert_ids_to_tokens(text_tokens[0].tolist())
+                    logger.debug("text_token_syms is same as sentence tokens: %s", text_token_syms == sent)
+
+                # text_len = torch.IntTensor([text_tokens.size(1)], device=text_tokens.device)
+                # print(text_len)
+                progress += 1
+                self._set_gr_progress(0.2 + 0.4 * (progress-1) / len(sentences), f"gpt inference latent... {progress}/{len(sentences)}")
                 m_start_time = time.perf_counter()
-                # latent, text_lens_out, code_lens_out = \
-                with torch.amp.autocast(text_tokens.device.type, enabled=self.dtype is not None, dtype=self.dtype):
-                    latent = \
-                        self.gpt(auto_conditioning, text_tokens,
-                                    torch.tensor([text_tokens.shape[-1]], device=text_tokens.device), codes,
-                                    code_lens*self.gpt.mel_length_compression,
-                                    cond_mel_lengths=torch.tensor([auto_conditioning.shape[-1]], device=text_tokens.device),
-                                    return_latent=True, clip_inputs=False)
-                    gpt_forward_time += time.perf_counter() - m_start_time
+                with torch.no_grad():
+                    with torch.amp.autocast(text_tokens.device.type, enabled=self.dtype is not None, dtype=self.dtype):
+                        codes = self.gpt.inference_speech(auto_conditioning, text_tokens,
+                                                            cond_mel_lengths=torch.tensor([auto_conditioning.shape[-1]],
+                                                                                          device=text_tokens.device),
+                                                            # text_lengths=text_len,
+                                                            seeds=None if seed is None else [derive_seed(seed, sent_idx)],
+                                                            do_sample=do_sample,
+                                                            top_p=top_p,
+                                                            top_k=top_k,
+                                                            temperature=temperature,
+                                                            num_return_sequences=autoregressive_batch_size,
+                                                            length_penalty=length_penalty,
+                                                            num_beams=num_beams,
+                                                            repetition_penalty=repetition_penalty,
+                                                            max_generate_length=max_mel_tokens,
+                                                            **cancel_kwargs,
+                                                            **generation_kwargs)
+                    gpt_gen_time += profile.add("generate", m_start_time, sentence=sent_idx,
+                                                text_tokens=int(text_tokens.shape[-1]),
+                                                mel_tokens=int((codes != self.stop_mel_token).sum()),
+                                                kv_cache_mb=round(self.estimate_kv_cache_bytes(
+                                                    1, text_tokens.shape[-1], codes.shape[-1], num_beams) / MB, 2)
+                                                ).duration
+                    self._check_cancelled(cancel_token, writer)
+                    if not has_warned and (codes[:, -1] != self.stop_mel_token).any():
+                        warnings.warn(
+                            f"WARN: generation stopped due to exceeding `max_mel_tokens` ({max_mel_tokens}). "
+                            f"Input text tokens: {text_tokens.shape[1]}. "
+                            f"Consider reducing `max_text_tokens_per_sentence`({max_text_tokens_per_sentence}) or increasing `max_mel_tokens`.",
+                            category=RuntimeWarning
+                        )
+                        has_warned = True
 
+                    code_lens = torch.tensor([codes.shape[-1]], device=codes.device, dtype=codes.dtype)
+                    logger.debug("codes: %s, shape: %s, type: %s, code len: %s", codes, codes.shape, codes.dtype, code_lens)
+
+                    # remove ultra-long silence if exits
+                    # temporarily fix the long silence bug.
+                    raw_codes = codes
+                    codes, code_lens = self.remove_long_silence(codes, silent_token=52, max_consecutive=30)
+                    logger.debug("fix codes: %s, shape: %s, type: %s, code len: %s", codes, codes.shape, codes.dtype, code_lens)
+                    self._set_gr_progress(0.2 + 0.4 * progress / len(sentences), f"gpt inference speech... {progress}/{len(sentences)}")
                     m_start_time = time.perf_counter()
-                    wav, _ = self.bigvgan(latent, auto_conditioning.transpose(1, 2))
-                    bigvgan_time += time.perf_counter() - m_start_time
-                    wav = wav.squeeze(1)
+                    # latent, text_lens_out, code_lens_out = \
+                    with torch.amp.autocast(text_tokens.device.type, enabled=self.dtype is not None, dtype=self.dtype):
+                        latent = \
+                            self.gpt(auto_conditioning, text_tokens,
+                                        torch.tensor([text_tokens.shape[-1]], device=text_tokens.device), codes,
+                                        code_lens*self.gpt.mel_length_compression,
+                                        cond_mel_lengths=torch.tensor([auto_conditioning.shape[-1]], device=text_tokens.device),
+                                        return_latent=True, clip_inputs=False)
+                        gpt_forward_time += profile.add("latent", m_start_time, sentence=sent_idx,
+                                                        mel_tokens=int(code_lens[0])).duration
+                        if keep_records:
+                            sentence_records.append(self._sentence_record(raw_codes, text_tokens, latent))
 
-                wav = torch.clamp(32767 * wav, -32767.0, 32767.0)
-                if verbose:
-                    print(f"wav shape: {wav.shape}", "min:", wav.min(), "max:", wav.max())
-                # wavs.append(wav[:, :-512])
-                wavs.append(wav.cpu())  # to cpu before saving
+                        m_start_time = time.perf_counter()
+                        wav, _ = self.bigvgan(latent, auto_conditioning.transpose(1, 2))
+                        bigvgan_time += profile.add("vocode", m_start_time, sentence=sent_idx,
+                                                    frames=int(latent.shape[1])).duration
+                        wav = wav.squeeze(1)
+
+                    wav = torch.clamp(32767 * wav, -32767.0, 32767.0)
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("wav shape: %s min: %s max: %s", wav.shape, wav.min().item(), wav.max().item())
+                    # wavs.append(wav[:, :-512])
+                    wavs.append(wav.cpu())  # to cpu before saving
+                    if cache_key is not None:
+                        self.sentence_cache.put(cache_key, wavs[-1].type(torch.int16).numpy(), **sentence_records[-1])
+                    if writer is not None:
+                        writer.write(wavs.pop())
+                        sentence_records.clear()
+        except BaseException:
+            # 出错或取消时不留下截断的音频文件
+            if writer is not None:
+                writer.discard()
+            raise
         end_time = time.perf_counter()
         self._set_gr_progress(0.9, "save audio...")
-        wav = torch.cat(wavs, dim=1)
-        wav_length = wav.shape[-1] / sampling_rate
-        print(f">> Reference audio length: {cond_mel_frame * 256 / sampling_rate:.2f} seconds")
-        print(f">> gpt_gen_time: {gpt_gen_time:.2f} seconds")
-        print(f">> gpt_forward_time: {gpt_forward_time:.2f} seconds")
-        print(f">> bigvgan_time: {bigvgan_time:.2f} seconds")
-        print(f">> Total inference time: {end_time - start_time:.2f} seconds")
-        print(f">> Generated audio length: {wav_length:.2f} seconds")
-        print(f">> RTF: {(end_time - start_time) / wav_length:.4f}")
+        save_start_time = time.perf_counter()
+        if writer is not None:
+            writer.close()
+            wav_length = writer.duration
+        else:
+            wav = torch.cat(wavs, dim=1)
+            wav_length = wav.shape[-1] / sampling_rate
+        logger.info(">> Reference audio length: %.2f seconds", cond_mel_frame * 256 / sampling_rate)
+        logger.info(">> gpt_gen_time: %.2f seconds", gpt_gen_time)
+        logger.info(">> gpt_forward_time: %.2f seconds", gpt_forward_time)
+        logger.info(">> bigvgan_time: %.2f seconds", bigvgan_time)
+        logger.info(">> Total inference time: %.2f seconds", end_time - start_time)
+        logger.info(">> Generated audio length: %.2f seconds", wav_length)
+        logger.info(">> RTF: %.4f", (end_time - start_time) / wav_length)
+        profile.meta.update(audio_seconds=wav_length, rtf=(end_time - start_time) / wav_length,
+                            sentences=len(sentences), text_tokens=len(text_tokens_list))
 
+        if writer is not None:
+            logger.info(">> wav file saved to: %s", output_path)
+            result = output_path
+            if return_result:
+                result = SynthesisResult(sampling_rate, None, writer.offsets, output_path, num_samples=writer.num_samples)
+            return self._finish_profile(profile, result, save_start_time, trace_path, return_profile)
+        if return_result:
+            result = self._make_result(wavs, sampling_rate, output_path)
+            if save_codes and output_path:
+                self._save_codes(output_path, auto_conditioning, sentence_records)
+            return self._finish_profile(profile, result, save_start_time, trace_path, return_profile)
         # save audio
         wav = wav.cpu()  # to cpu
         if output_path:
             # 直接保存音频到指定路径中
             if os.path.isfile(output_path):
                 os.remove(output_path)
-                print(">> remove old wav file:", output_path)
+                logger.info(">> remove old wav file: %s", output_path)
             if os.path.dirname(output_path) != "":
                 os.makedirs(os.path.dirname(output_path), exist_ok=True)
             torchaudio.save(output_path, wav.type(torch.int16), sampling_rate)
-            print(">> wav file saved to:", output_path)
-            return output_path
+            logger.info(">> wav file saved to: %s", output_path)
+            if save_codes:
+                self._save_codes(output_path, auto_conditioning, sentence_records)
+            return self._finish_profile(profile, output_path, save_start_time, trace_path, return_profile)
         else:
             # 返回以符合Gradio的格式要求
             wav_data = wav.type(torch.int16)
             wav_data = wav_data.numpy().T
-            return (sampling_rate, wav_data)
+            return self._finish_profile(profile, (sampling_rate, wav_data), save_start_time, trace_path, return_profile)
+
+    @staticmethod
+    def _sentence_record(codes, text_tokens, latent) -> Dict[str, np.ndarray]:
+        return {
+            "codes": codes[0].cpu().numpy(),
+            "text_tokens": text_tokens[0].cpu().numpy(),
+            "latent": latent[0].float().cpu().numpy(),
+        }
+
+    def _save_codes(self, output_path, auto_conditioning, sentence_records):
+        """
+        保存各分句的 GPT codes 和 latent 到 ``output_path`` 同名的 ``.npz``。
+        """
+        arrays = {
+            "cond_mel": auto_conditioning.float().cpu().numpy(),
+            "sentence_count": np.array(len(sentence_records)),
+            "silent_token": np.array(52),
+            "max_consecutive": np.array(30),
+        }
+        for i, record in enumerate(sentence_records):
+            for name, value in record.items():
+                arrays[f"{name}_{i}"] = value
+        codes_path = os.path.splitext(output_path)[0] + ".npz"
+        np.savez(codes_path, **arrays)
+        logger.info(">> mel codes saved to: %s", codes_path)
+        return codes_path
+
+    @_weights_loaded
+    def revocode(self, codes_path, output_path=None, max_consecutive=None, sampling_rate=24000):
+        """
+        用 ``save_codes=True`` 保存的 GPT codes/latent 重新生成音频，不再运行 GPT 自回归生成，只需声码器的时间。
+        Args:
+            codes_path (str): ``infer``/``infer_fast`` 保存的 ``.npz`` 文件
+            output_path (str): 输出 wav 路径，为 ``None`` 时返回 ``(sampling_rate, wav_data)``
+            max_consecutive (int): 长静音裁剪阈值，与保存时不同时由 codes 重新计算 latent（一次 GPT 前向，无需生成）
+            sampling_rate (int): 输出采样率，与模型的 24000 不同时重采样
+        """
+        start_time = time.perf_counter()
+        data = np.load(codes_path)
+        auto_conditioning = torch.from_numpy(data["cond_mel"]).to(self.device)
+        silent_token = int(data["silent_token"])
+        recompute_latent = max_consecutive is not None and max_consecutive != int(data["max_consecutive"])
+        wavs = []
+        for i in range(int(data["sentence_count"])):
+            with torch.no_grad():
+                with torch.amp.autocast(auto_conditioning.device.type, enabled=self.dtype is not None, dtype=self.dtype):
+                    if recompute_latent:
+                        codes = torch.from_numpy(data[f"codes_{i}"]).unsqueeze(0).to(self.device)
+                        text_tokens = torch.from_numpy(data[f"text_tokens_{i}"]).unsqueeze(0).to(self.device)
+                        codes, code_lens = self.remove_long_silence(codes, silent_token=silent_token, max_consecutive=max_consecutive)
+                        latent = self.gpt(auto_conditioning, text_tokens,
+                                          torch.tensor([text_tokens.shape[-1]], device=text_tokens.device), codes,
+                                          code_lens*self.gpt.mel_length_compression,
+                                          cond_mel_lengths=torch.tensor([auto_conditioning.shape[-1]], device=text_tokens.device),
+                                          return_latent=True, clip_inputs=False)
+                    else:
+                        latent = torch.from_numpy(data[f"latent_{i}"]).unsqueeze(0).to(self.device)
+                    wav, _ = self.bigvgan(latent, auto_conditioning.transpose(1, 2))
+                    wav = wav.squeeze(1)
+            wav = torch.clamp(32767 * wav.float(), -32767.0, 32767.0)
+            wavs.append(wav.cpu())
+        data.close()
+        wav = torch.cat(wavs, dim=1)
+        if sampling_rate != 24000:
+            wav = get_resampler(24000, sampling_rate)(wav)
+        logger.info(">> Total revocode time: %.2f seconds", time.perf_counter() - start_time)
+        if output_path:
+            if os.path.dirname(output_path) != "":
+                os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            torchaudio.save(output_path, wav.type(torch.int16), sampling_rate)
+            logger.info(">> wav file saved to: %s", output_path)
+            return output_path
+        wav_data = wav.type(torch.int16)
+        wav_data = wav_data.numpy().T
+        return (sampling_rate, wav_data)
 
 
 if __name__ == "__main__":
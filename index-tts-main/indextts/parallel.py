@@ -0,0 +1,445 @@
+# -*- coding: utf-8 -*-
+"""
+CPU 多进程合成。
+
+单个 ``IndexTTS`` 实例只占一个进程，batch=1 的自回归解码在 torch 的 intra-op 多线程下扩展性很差。
+``CPUSynthesisPool`` 启动 N 个工作进程，共享同一份只读的 GPT / BigVGAN 权重（``share_memory()``），
+每个进程使用少量线程，从任务队列领取条目合成。
+``StagePipeline`` 把 GPT 和 BigVGAN 拆到不同进程，两级流水线并行。
+"""
+import abc
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import traceback
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Sequence
+
+import torch
+import torch.multiprocessing as torch_mp
+import torchaudio
+
+from indextts.infer import IndexTTS
+from indextts.utils.log import get_logger
+
+
+logger = get_logger("parallel")
+
+
+def available_cores() -> List[int]:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def split_cores(num_groups: int, threads_per_group: int, cores: Optional[Sequence[int]] = None) -> List[List[int]]:
+    """把可用 CPU 核心依次分成 ``num_groups`` 组，每组 ``threads_per_group`` 个（核心不足时循环复用）"""
+    cores = list(cores) if cores is not None else available_cores()
+    return [[cores[(i * threads_per_group + j) % len(cores)] for j in range(threads_per_group)] for i in range(num_groups)]
+
+
+def configure_process(num_threads: int, cores: Optional[Sequence[int]] = None):
+    """设置当前进程的 torch 线程数，并可选地绑定到指定 CPU 核心（仅 Linux 支持绑定）"""
+    torch.set_num_threads(num_threads)
+    if cores:
+        if hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, set(cores))
+        else:
+            logger.warning(">> CPU core pinning is not supported on this platform, ignored.")
+
+
+def _pool_worker(worker_id, tts, init_kwargs, task_queue, result_queue, num_threads, cores):
+    configure_process(num_threads, cores)
+    try:
+        if tts is None:
+            tts = IndexTTS(**init_kwargs)
+    except Exception:
+        result_queue.put(("ready", worker_id, traceback.format_exc()))
+        return
+    result_queue.put(("ready", worker_id, None))
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+        job_id, method, kwargs = task
+        start_time = time.perf_counter()
+        try:
+            result = getattr(tts, method)(**kwargs)
+            result_queue.put(("done", job_id, (result, time.perf_counter() - start_time)))
+        except Exception:
+            result_queue.put(("error", job_id, traceback.format_exc()))
+
+
+def _gpt_stage(tts, task_queue, latent_queue, num_threads, cores):
+    configure_process(num_threads, cores)
+    sent_voices = set()
+    while True:
+        task = task_queue.get()
+        if task is None:
+            latent_queue.put(None)
+            break
+        job_id, kwargs = task
+        try:
+            audio_prompt = kwargs.pop("audio_prompt")
+            output_path = kwargs.pop("output_path")
+            text = kwargs.pop("text")
+            # 每个参考音频的 cond_mel 只发送一次，之后的消息只带参考音频路径
+            if audio_prompt not in sent_voices:
+                latent_queue.put(("voice", audio_prompt, tts.get_conditioning(audio_prompt)))
+                sent_voices.add(audio_prompt)
+            latent_queue.put(("job", job_id, (audio_prompt, output_path, time.time())))
+            for item in tts.infer_latents(audio_prompt, text, **kwargs):
+                latent_queue.put(("latent", job_id, item["latent"]))
+            latent_queue.put(("end", job_id, None))
+        except Exception:
+            latent_queue.put(("error", job_id, traceback.format_exc()))
+
+
+def _vocoder_stage(tts, latent_queue, result_queue, num_producers, num_threads, cores):
+    configure_process(num_threads, cores)
+    voices = {}
+    jobs = {}
+    finished_producers = 0
+    while finished_producers < num_producers:
+        message = latent_queue.get()
+        if message is None:
+            finished_producers += 1
+            continue
+        kind, key, payload = message
+        if kind == "voice":
+            voices[key] = payload
+            continue
+        if kind == "error":
+            jobs.pop(key, None)
+            result_queue.put(("error", key, payload))
+            continue
+        try:
+            if kind == "job":
+                audio_prompt, output_path, start_time = payload
+                jobs[key] = dict(audio_prompt=audio_prompt, output_path=output_path, start_time=start_time, wavs=[])
+            elif key in jobs:
+                job = jobs[key]
+                if kind == "latent":
+                    job["wavs"].append(tts.vocode(payload, voices[job["audio_prompt"]]))
+                elif kind == "end":
+                    del jobs[key]
+                    result = _wav_output(torch.cat(job["wavs"], dim=1), job["output_path"])
+                    result_queue.put(("done", key, (result, time.time() - job["start_time"])))
+        except Exception:
+            jobs.pop(key, None)
+            result_queue.put(("error", key, traceback.format_exc()))
+
+
+def _wav_output(wav, output_path, sampling_rate=24000):
+    if output_path:
+        if os.path.dirname(output_path) != "":
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        torchaudio.save(output_path, wav.type(torch.int16), sampling_rate)
+        return output_path
+    return (sampling_rate, wav.type(torch.int16).numpy().T)
+
+
+def _load_shared_model(cfg_path, model_dir):
+    tts = IndexTTS(cfg_path=cfg_path, model_dir=model_dir, is_fp16=False, device="cpu")
+    tts.gpt.share_memory()
+    tts.bigvgan.share_memory()
+    return tts
+
+
+class _ProcessExecutor(abc.ABC):
+    """工作进程通过 ``result_queue`` 回传 ``(status, job_id, payload)``，由收集线程转换为 ``Future`` 的结果"""
+
+    name = "executor"
+
+    def __init__(self, ctx):
+        self._result_queue = ctx.Queue()
+        self._futures: Dict[int, Future] = {}
+        self._lock = threading.Lock()
+        self._next_job_id = 0
+        self._closed = False
+        self._processes = []
+
+    def _start_collector(self):
+        self._collector = threading.Thread(target=self._collect, name=f"{self.name}_collector", daemon=True)
+        self._collector.start()
+
+    def _collect(self):
+        while True:
+            try:
+                message = self._result_queue.get(timeout=1.0)
+            except queue.Empty:
+                if not self._closed and any(not process.is_alive() for process in self._processes):
+                    self._fail_pending(RuntimeError("a synthesis process exited unexpectedly"))
+                    return
+                continue
+            if message is None:
+                return
+            status, job_id, payload = message
+            with self._lock:
+                future = self._futures.pop(job_id, None)
+            if future is None:
+                continue
+            if status == "done":
+                future.set_result(payload)
+            else:
+                future.set_exception(RuntimeError(f"synthesis job {job_id} failed:\n{payload}"))
+
+    def _fail_pending(self, error: Exception):
+        with self._lock:
+            futures, self._futures = self._futures, {}
+        for future in futures.values():
+            future.set_exception(error)
+
+    def _new_job(self):
+        if self._closed:
+            raise RuntimeError(f"{type(self).__name__} is closed")
+        future = Future()
+        with self._lock:
+            job_id = self._next_job_id
+            self._next_job_id += 1
+            self._futures[job_id] = future
+        return job_id, future
+
+    def map(self, jobs: List[Dict]) -> List:
+        """按顺序提交多个条目（每个条目为 ``submit`` 的关键字参数），返回各条目的结果"""
+        futures = [self.submit(**job) for job in jobs]
+        return [future.result() for future in futures]
+
+    @abc.abstractmethod
+    def _stop_processes(self):
+        """通知工作进程退出并等待结束，由 ``close`` 调用"""
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._stop_processes()
+        self._result_queue.put(None)
+        self._fail_pending(RuntimeError(f"{type(self).__name__} is closed"))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class CPUSynthesisPool(_ProcessExecutor):
+    """
+    共享模型权重的 CPU 多进程合成池。
+
+    支持 ``fork`` 的平台（Linux）上由主进程加载一次模型并把权重移到共享内存，工作进程直接继承，
+    N 个进程只占一份权重内存；其他平台退化为每个工作进程各自加载模型。
+    主进程在创建合成池之前不要先做推理，以免 fork 时继承已初始化的 OpenMP 线程池。
+
+    Example:
+        with CPUSynthesisPool("checkpoints/config.yaml", "checkpoints", num_workers=4) as pool:
+            futures = [pool.submit("voice.wav", text, f"outputs/{i}.wav") for i, text in enumerate(texts)]
+            for future in futures:
+                output_path, elapsed = future.result()
+    """
+
+    name = "tts_pool"
+
+    def __init__(self, cfg_path="checkpoints/config.yaml", model_dir="checkpoints", num_workers=None,
+                 threads_per_worker=None, pin_cores=False):
+        """
+        Args:
+            num_workers (int): 工作进程数，默认为 CPU 核心数
+            threads_per_worker (int): 每个工作进程的 torch 线程数，默认 ``CPU 核心数 // num_workers``（至少为 1）
+            pin_cores (bool): 是否把每个工作进程绑定到各自独立的一组 CPU 核心
+        """
+        cpu_count = os.cpu_count() or 1
+        self.num_workers = num_workers or cpu_count
+        self.threads_per_worker = threads_per_worker or max(1, cpu_count // self.num_workers)
+        init_kwargs = dict(cfg_path=cfg_path, model_dir=model_dir, is_fp16=False, device="cpu")
+        if "fork" in multiprocessing.get_all_start_methods():
+            ctx = torch_mp.get_context("fork")
+            self.tts = _load_shared_model(cfg_path, model_dir)
+        else:
+            ctx = torch_mp.get_context("spawn")
+            self.tts = None
+            logger.warning(">> fork is not available, each worker process loads its own copy of the model weights.")
+        super().__init__(ctx)
+        cores = split_cores(self.num_workers, self.threads_per_worker) if pin_cores else [None] * self.num_workers
+
+        self._task_queue = ctx.Queue()
+        for i in range(self.num_workers):
+            worker = ctx.Process(
+                target=_pool_worker, name=f"tts_worker_{i}", daemon=True,
+                args=(i, self.tts, init_kwargs, self._task_queue, self._result_queue, self.threads_per_worker, cores[i]),
+            )
+            worker.start()
+            self._processes.append(worker)
+        self._wait_ready()
+        self._start_collector()
+        logger.info(">> CPUSynthesisPool started: %s workers x %s threads", self.num_workers, self.threads_per_worker)
+
+    def _wait_ready(self):
+        ready = 0
+        while ready < self.num_workers:
+            try:
+                _, worker_id, error = self._result_queue.get(timeout=1.0)
+            except queue.Empty:
+                if any(not worker.is_alive() for worker in self._processes):
+                    self.close()
+                    raise RuntimeError("a synthesis worker exited during startup")
+                continue
+            if error is not None:
+                self.close()
+                raise RuntimeError(f"synthesis worker {worker_id} failed to load the model:\n{error}")
+            ready += 1
+
+    def submit(self, audio_prompt, text, output_path=None, fast=False, **kwargs) -> Future:
+        """
+        提交一个合成条目，参数与 ``IndexTTS.infer`` / ``infer_fast`` 相同。
+
+        Returns:
+            ``Future``，结果为 ``(infer 的返回值, 合成耗时秒数)``
+        """
+        job_id, future = self._new_job()
+        kwargs.update(audio_prompt=audio_prompt, text=text, output_path=output_path)
+        self._task_queue.put((job_id, "infer_fast" if fast else "infer", kwargs))
+        return future
+
+    def _stop_processes(self):
+        for _ in self._processes:
+            self._task_queue.put(None)
+        for worker in self._processes:
+            worker.join()
+
+
+class StagePipeline(_ProcessExecutor):
+    """
+    GPT 与 BigVGAN 分进程的两级流水线（仅支持 ``fork`` 的平台）。
+
+    GPT 自回归解码受延迟限制、少量线程即可，BigVGAN 是吞吐型卷积计算、适合更多线程；拆到两个进程后各自使用独立的线程数
+    （可绑定到不同核心），GPT 进程生成下一句的同时声码器进程解码上一句。
+    GPT 进程逐句把 latent 通过有界队列发给声码器进程，张量经 ``torch.multiprocessing`` 以共享内存传递，
+    队列深度 ``queue_depth`` 限制在途的分句数，声码器跟不上时 GPT 进程会阻塞等待。
+
+    Example:
+        with StagePipeline("checkpoints/config.yaml", "checkpoints", pin_cores=True) as pipeline:
+            futures = [pipeline.submit("voice.wav", text, f"outputs/{i}.wav") for i, text in enumerate(texts)]
+            for future in futures:
+                output_path, elapsed = future.result()
+    """
+
+    name = "tts_pipeline"
+
+    def __init__(self, cfg_path="checkpoints/config.yaml", model_dir="checkpoints", gpt_workers=1, gpt_threads=None,
+                 vocoder_threads=None, gpt_cores=None, vocoder_cores=None, pin_cores=False, queue_depth=8):
+        """
+        Args:
+            gpt_workers (int): GPT 进程数，多个 GPT 进程共用一个声码器进程
+            gpt_threads (int): 每个 GPT 进程的 torch 线程数，默认 ``CPU 核心数 // (2 * gpt_workers)``（至少为 1）
+            vocoder_threads (int): 声码器进程的 torch 线程数，默认为剩余的核心数（至少为 1）
+            gpt_cores (List[List[int]]): 各 GPT 进程绑定的核心，默认在 ``pin_cores`` 时按线程数依次分配
+            vocoder_cores (List[int]): 声码器进程绑定的核心，默认在 ``pin_cores`` 时使用 GPT 进程之后的核心
+            pin_cores (bool): 是否绑定核心
+            queue_depth (int): GPT 与声码器之间在途的最大消息数
+        """
+        if "fork" not in multiprocessing.get_all_start_methods():
+            raise RuntimeError("StagePipeline requires the fork start method, use CPUSynthesisPool on this platform")
+        cpu_count = os.cpu_count() or 1
+        self.gpt_workers = gpt_workers
+        self.gpt_threads = gpt_threads or max(1, cpu_count // (2 * gpt_workers))
+        self.vocoder_threads = vocoder_threads or max(1, cpu_count - self.gpt_threads * gpt_workers)
+        if pin_cores:
+            cores = available_cores()
+            gpt_cores = gpt_cores or split_cores(gpt_workers, self.gpt_threads, cores)
+            vocoder_cores = vocoder_cores or (cores[self.gpt_threads * gpt_workers:] or cores)[:self.vocoder_threads]
+        gpt_cores = gpt_cores or [None] * gpt_workers
+        ctx = torch_mp.get_context("fork")
+        self.tts = _load_shared_model(cfg_path, model_dir)
+        super().__init__(ctx)
+
+        self._task_queue = ctx.Queue()
+        self._latent_queue = ctx.Queue(maxsize=queue_depth)
+        self._gpt_processes = []
+        for i in range(gpt_workers):
+            process = ctx.Process(
+                target=_gpt_stage, name=f"tts_gpt_{i}", daemon=True,
+                args=(self.tts, self._task_queue, self._latent_queue, self.gpt_threads, gpt_cores[i]),
+            )
+            process.start()
+            self._gpt_processes.append(process)
+        self._vocoder_process = ctx.Process(
+            target=_vocoder_stage, name="tts_vocoder", daemon=True,
+            args=(self.tts, self._latent_queue, self._result_queue, gpt_workers, self.vocoder_threads, vocoder_cores),
+        )
+        self._vocoder_process.start()
+        self._processes = self._gpt_processes + [self._vocoder_process]
+        self._start_collector()
+        logger.info(">> StagePipeline started: %s gpt x %s threads, vocoder x %s threads, queue_depth: %s",
+                    gpt_workers, self.gpt_threads, self.vocoder_threads, queue_depth)
+
+    def submit(self, audio_prompt, text, output_path=None, max_text_tokens_per_sentence=120, seed=None,
+               **generation_kwargs) -> Future:
+        """
+        提交一个合成条目，参数与 ``IndexTTS.infer`` 相同。
+
+        Returns:
+            ``Future``，结果为 ``(output_path 或 (sampling_rate, wav_data), 合成耗时秒数)``
+        """
+        job_id, future = self._new_job()
+        generation_kwargs.update(audio_prompt=audio_prompt, text=text, output_path=output_path,
+                                 max_text_tokens_per_sentence=max_text_tokens_per_sentence, seed=seed)
+        self._task_queue.put((job_id, generation_kwargs))
+        return future
+
+    def _stop_processes(self):
+        for _ in self._gpt_processes:
+            self._task_queue.put(None)
+        for process in self._processes:
+            process.join()
+
+
+def benchmark(cfg_path, model_dir, audio_prompt, texts, worker_counts=None, threads_per_worker=None, pin_cores=False, fast=False,
+              **generation_kwargs):
+    """
+    依次使用不同的工作进程数合成同一组文本，打印吞吐量，用于选择 ``num_workers`` / ``threads_per_worker``。
+    """
+    cpu_count = os.cpu_count() or 1
+    if not worker_counts:
+        worker_counts = sorted({min(2 ** i, cpu_count) for i in range(cpu_count.bit_length() + 1)})
+    results = []
+    for num_workers in worker_counts:
+        with CPUSynthesisPool(cfg_path, model_dir, num_workers=num_workers,
+                              threads_per_worker=threads_per_worker, pin_cores=pin_cores) as pool:
+            start_time = time.perf_counter()
+            outputs = pool.map([dict(audio_prompt=audio_prompt, text=text, fast=fast, **generation_kwargs) for text in texts])
+            wall_time = time.perf_counter() - start_time
+            audio_seconds = sum(wav_data.shape[0] / sampling_rate for (sampling_rate, wav_data), _ in outputs)
+            results.append(dict(workers=num_workers, threads=pool.threads_per_worker, wall_time=wall_time,
+                                items_per_second=len(texts) / wall_time, rtf=wall_time / audio_seconds))
+    logger.info("%8s %8s %10s %10s %8s", "workers", "threads", "wall(s)", "items/s", "RTF")
+    for r in results:
+        logger.info("%8d %8d %10.2f %10.3f %8.4f", r["workers"], r["threads"], r["wall_time"], r["items_per_second"], r["rtf"])
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="IndexTTS CPU multi-process scaling benchmark")
+    parser.add_argument("-v", "--voice", type=str, required=True, help="Path to the audio prompt file (wav format)")
+    parser.add_argument("-c", "--config", type=str, default="checkpoints/config.yaml", help="Path to the config file")
+    parser.add_argument("--model_dir", type=str, default="checkpoints", help="Path to the model directory")
+    parser.add_argument("--text_file", type=str, default=None, help="Text file with one item per line")
+    parser.add_argument("--items", type=int, default=16, help="Number of items to synthesize per run")
+    parser.add_argument("--workers", type=int, nargs="*", default=None, help="Worker counts to test. Default is 1, 2, 4, ... up to all cores")
+    parser.add_argument("--threads", type=int, default=None, help="Torch threads per worker. Default is cores // workers")
+    parser.add_argument("--pin_cores", action="store_true", default=False, help="Pin each worker to its own CPU cores")
+    parser.add_argument("--fast", action="store_true", default=False, help="Use infer_fast instead of infer")
+    args = parser.parse_args()
+
+    if args.text_file:
+        with open(args.text_file, "r", encoding="utf-8") as f:
+            lines = [line.strip() for line in f if line.strip()]
+    else:
+        lines = ["大家好，我现在正在测试多进程合成的吞吐量。", "Hello, this is a multi-process synthesis benchmark."]
+    benchmark(args.config, args.model_dir, args.voice, [lines[i % len(lines)] for i in range(args.items)],
+              worker_counts=args.workers, threads_per_worker=args.threads, pin_cores=args.pin_cores, fast=args.fast)
@@ -0,0 +1,10 @@
+"""
+对外接口（HTTP 服务、批量命令行）共用的合成参数定义，不依赖模型和服务端代码。
+"""
+
+# 请求 / 批量任务中允许的生成参数及其类型，与 ``infer_fast`` / ``infer_batch`` 的参数同名
+GENERATION_FIELDS = {
+    "max_text_tokens_per_sentence": int, "sentences_bucket_max_size": int, "do_sample": bool, "top_p": float,
+    "top_k": int, "temperature": float, "length_penalty": float, "num_beams": int, "repetition_penalty": float,
+    "max_mel_tokens": int,
+}
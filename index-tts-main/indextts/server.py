@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+"""
+本地 HTTP 合成服务。
+
+只依赖标准库 asyncio：进程内常驻一个 ``SynthesisEngine``，并发的非流式请求经 ``BatchingQueue`` 按音色合并为批量合成，
+流式请求逐句返回。默认只监听 127.0.0.1，``voice`` 是服务端本地的参考音频路径。
+```
+python -m indextts.server --model_dir checkpoints --voice tests/sample_prompt.wav --port 8300
+curl -s localhost:8300/tts -d '{"text": "你好，欢迎使用。"}' -o out.wav
+```
+接口：
+    ``POST /tts``: JSON 请求体，``text``、``voice``（默认为 ``--voice``）、可选的 ``seed``、``stream`` 和生成参数
+        （见 ``GENERATION_FIELDS``），返回 ``audio/wav``；``stream`` 为 true 时以 chunked 编码逐句返回，
+        WAV 头中的长度字段为 ``0xFFFFFFFF``（流式 WAV 的惯例，播放器读到连接结束为止）
+    ``GET /health``: 模型加载状态、引擎和合并队列的统计
+"""
+import argparse
+import asyncio
+import json
+import os
+import struct
+import tempfile
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+from indextts.batching import BatchingQueue
+from indextts.engine import PRIORITY_INTERACTIVE, SynthesisEngine
+from indextts.params import GENERATION_FIELDS
+from indextts.utils.log import get_logger
+
+logger = get_logger("server")
+
+SAMPLING_RATE = 24000
+# ``wave`` 写出的 16-bit PCM 文件头长度
+WAV_HEADER_SIZE = 44
+MAX_BODY_SIZE = 1024 * 1024
+_STATUS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error",
+           503: "Service Unavailable"}
+
+
+class BadRequest(Exception):
+    pass
+
+
+def wav_header(sampling_rate: int, data_size: int = 0xFFFFFFFF) -> bytes:
+    """16-bit 单声道 PCM 的 WAV 头，``data_size`` 为默认值时表示长度未知（流式）"""
+    riff_size = 0xFFFFFFFF if data_size == 0xFFFFFFFF else 36 + data_size
+    return struct.pack("<4sI4s4sIHHIIHH4sI", b"RIFF", riff_size, b"WAVE", b"fmt ", 16, 1, 1,
+                       sampling_rate, sampling_rate * 2, 2, 16, b"data", data_size)
+
+
+def wav_bytes(sampling_rate: int, wav_data) -> bytes:
+    data = np.asarray(wav_data, dtype="<i2").reshape(-1).tobytes()
+    return wav_header(sampling_rate, len(data)) + data
+
+
+def parse_tts_request(body: bytes, default_voice: Optional[str] = None) -> Dict:
+    """校验 ``POST /tts`` 的请求体，返回 ``text``、``voice``、``seed``、``stream`` 和生成参数 ``kwargs``"""
+    try:
+        payload = json.loads(body.decode("utf-8"))
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise BadRequest(f"invalid JSON body: {e}")
+    if not isinstance(payload, dict):
+        raise BadRequest("request body must be a JSON object")
+    text = payload.pop("text", None)
+    if not isinstance(text, str) or len(text.strip()) == 0:
+        raise BadRequest("`text` must be a non-empty string")
+    voice = payload.pop("voice", None) or default_voice
+    if not isinstance(voice, str) or not os.path.isfile(voice):
+        raise BadRequest(f"audio prompt file {voice} does not exist")
+    seed = payload.pop("seed", None)
+    if seed is not None and (not isinstance(seed, int) or isinstance(seed, bool)):
+        raise BadRequest("`seed` must be an integer")
+    stream = payload.pop("stream", False)
+    kwargs = {}
+    for name, value in payload.items():
+        if name not in GENERATION_FIELDS:
+            raise BadRequest(f"unknown field `{name}`")
+        field_type = GENERATION_FIELDS[name]
+        if isinstance(value, bool) != (field_type is bool) or not isinstance(value, (int, float)) or \
+                (field_type is int and not isinstance(value, int)):
+            raise BadRequest(f"`{name}` must be {field_type.__name__}")
+        kwargs[name] = field_type(value)
+    return dict(text=text.strip(), voice=voice, seed=seed, stream=bool(stream), kwargs=kwargs)
+
+
+async def read_http_request(reader: asyncio.StreamReader):
+    """读取一个 HTTP/1.1 请求，返回 ``(method, path, headers, body)``，连接已关闭时返回 None"""
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    parts = request_line.decode("latin-1").split()
+    if len(parts) != 3:
+        raise BadRequest("malformed request line")
+    method, path, _ = parts
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise BadRequest("invalid Content-Length")
+    if length > MAX_BODY_SIZE:
+        raise BadRequest("request body too large")
+    body = await reader.readexactly(length) if length > 0 else b""
+    return method, path.split("?", 1)[0], headers, body
+
+
+def http_response(status: int, body: bytes, content_type: str = "application/json") -> bytes:
+    head = (f"HTTP/1.1 {status} {_STATUS.get(status, '')}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n")
+    return head.encode("latin-1") + body
+
+
+def json_response(status: int, payload: Dict) -> bytes:
+    return http_response(status, json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+
+
+def _write_chunk(writer: asyncio.StreamWriter, data: bytes):
+    writer.write(f"{len(data):x}\r\n".encode("latin-1") + data + b"\r\n")
+
+
+def _read_from(path: str, offset: int) -> bytes:
+    try:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            return f.read()
+    except FileNotFoundError:
+        return b""
+
+
+class TTSServer:
+    """
+    处理 HTTP 连接：非流式请求提交给 ``BatchingQueue`` 合并，流式请求以长文本模式直接提交给引擎，
+    每 ``stream_window`` 个分句写入临时文件后立即发送给客户端。
+    """
+
+    def __init__(self, engine: SynthesisEngine, batching: BatchingQueue, default_voice: Optional[str] = None,
+                 stream_window: int = 1, poll_interval: float = 0.02):
+        self.engine = engine
+        self.batching = batching
+        self.default_voice = default_voice
+        self.stream_window = stream_window
+        self.poll_interval = poll_interval
+        self.stats = dict(requests=0, streams=0, errors=0)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        start_time = time.perf_counter()
+        status = 500
+        path = ""
+        try:
+            try:
+                request = await read_http_request(reader)
+                if request is None:
+                    return
+                method, path, _, body = request
+                if path == "/health":
+                    status = 200
+                    writer.write(json_response(status, self.health()))
+                elif path != "/tts":
+                    status = 404
+                    writer.write(json_response(status, {"error": f"unknown path {path}"}))
+                elif method != "POST":
+                    status = 405
+                    writer.write(json_response(status, {"error": "use POST"}))
+                elif not self.engine.ready:
+                    status = 503
+                    writer.write(json_response(status, {"error": "model is still loading"}))
+                else:
+                    tts_request = parse_tts_request(body, self.default_voice)
+                    if tts_request["stream"]:
+                        status = await self.stream(tts_request, reader, writer)
+                    else:
+                        status = 200
+                        writer.write(http_response(status, await self.synthesize(tts_request), "audio/wav"))
+            except (BadRequest, ValueError) as e:
+                # ValueError 来自合成时的参数检查，例如正则化后为空的文本
+                status = 400
+                writer.write(json_response(status, {"error": str(e)}))
+            except (ConnectionError, asyncio.IncompleteReadError):
+                status = None
+                return
+            except Exception as e:
+                logger.exception(">> request failed: %s", path)
+                self.stats["errors"] += 1
+                status = 500
+                writer.write(json_response(status, {"error": f"{type(e).__name__}: {e}"}))
+            await writer.drain()
+        except ConnectionError:
+            status = None
+        finally:
+            writer.close()
+            logger.info(">> %s %s %.3f seconds", path, status if status is not None else "client disconnected",
+                        time.perf_counter() - start_time)
+
+    async def synthesize(self, request: Dict) -> bytes:
+        self.stats["requests"] += 1
+        future = self.batching.submit(request["voice"], request["text"], seed=request["seed"], **request["kwargs"])
+        try:
+            sampling_rate, wav_data = await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            self.batching.cancel(future)
+            raise
+        return wav_bytes(sampling_rate, wav_data)
+
+    async def stream(self, request: Dict, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> int:
+        """逐句发送音频，返回 HTTP 状态码；合成失败时响应头已发出，直接断开连接（不发送结束块）"""
+        self.stats["streams"] += 1
+        fd, path = tempfile.mkstemp(prefix="indextts_stream_", suffix=".wav")
+        os.close(fd)
+        job = self.engine.submit(request["voice"], request["text"], path, priority=PRIORITY_INTERACTIVE, fast=True,
+                                 seed=request["seed"], long_form=True, long_form_window=self.stream_window,
+                                 **request["kwargs"])
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: audio/wav\r\nTransfer-Encoding: chunked\r\n"
+                     b"Connection: close\r\n\r\n")
+        _write_chunk(writer, wav_header(SAMPLING_RATE))
+        offset = WAV_HEADER_SIZE
+        try:
+            while True:
+                finished = job.done()
+                if finished and job.exception() is not None:
+                    raise job.exception()
+                data = _read_from(path, offset)
+                # 只发送完整的采样点
+                data = data[:len(data) // 2 * 2]
+                if data:
+                    offset += len(data)
+                    _write_chunk(writer, data)
+                    await writer.drain()
+                if finished:
+                    break
+                if reader.at_eof():
+                    # 客户端已断开，不必等到下一次写入失败
+                    raise ConnectionResetError("client disconnected")
+                await asyncio.sleep(self.poll_interval)
+        except (ConnectionError, asyncio.CancelledError):
+            self.engine.cancel(job)
+            raise
+        except Exception:
+            logger.exception(">> streaming synthesis failed")
+            self.stats["errors"] += 1
+            return 500
+        finally:
+            # 客户端断开时任务可能仍在执行，结束后再删除临时文件
+            job.add_done_callback(lambda _: os.path.isfile(path) and os.remove(path))
+        writer.write(b"0\r\n\r\n")
+        return 200
+
+    def health(self) -> Dict:
+        return {
+            "status": "ok" if self.engine.ready else "loading",
+            "engine_pending": self.engine.pending,
+            "batching_pending": self.batching.pending,
+            "batching": dict(self.batching.stats),
+            "offload": dict(self.engine.offload_stats),
+            "warmup": list(self.engine.tts.warmup_stats) if self.engine.ready else [],
+            "server": dict(self.stats),
+        }
+
+
+async def serve(server: TTSServer, host: str = "127.0.0.1", port: int = 8300):
+    tcp_server = await asyncio.start_server(server.handle, host, port)
+    logger.info(">> IndexTTS server listening on http://%s:%d", host, port)
+    async with tcp_server:
+        await tcp_server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="IndexTTS HTTP server")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Host to listen on. Default is localhost only")
+    parser.add_argument("--port", type=int, default=8300)
+    parser.add_argument("-c", "--config", type=str, default=None, help="Path to the config file. Default is '<model_dir>/config.yaml'")
+    parser.add_argument("--model_dir", type=str, default="checkpoints", help="Path to the model directory. Default is 'checkpoints'")
+    parser.add_argument("--fp16", action="store_true", default=False, help="Use FP16 for inference if available")
+    parser.add_argument("-d", "--device", type=str, default=None, help="Device to run the model on (cpu, cuda, mps).")
+    parser.add_argument("-v", "--voice", type=str, default=None, help="Default audio prompt for requests without `voice`")
+    parser.add_argument("--max_batch_size", type=int, default=8, help="Maximum number of requests merged into one batch")
+    parser.add_argument("--batch_window_ms", type=float, default=30, help="How long the first request of a batch waits for others")
+    parser.add_argument("--stream_window", type=int, default=1, help="Sentences synthesized per streamed chunk")
+    parser.add_argument("--cache_dir", type=str, default=None, help="Enable the sentence cache in this directory")
+    parser.add_argument("--idle_offload", type=float, default=None, help="Offload model weights after this many idle seconds")
+    parser.add_argument("--low_memory_mb", type=float, default=None, help="Offload model weights while idle when device memory drops below this (MB)")
+    parser.add_argument("--warmup", action="store_true", default=False, help="Warm up every batch size bucket in the background after loading")
+    args = parser.parse_args()
+
+    setup = (lambda tts: tts.enable_sentence_cache(args.cache_dir)) if args.cache_dir else None
+    engine = SynthesisEngine(args.config or os.path.join(args.model_dir, "config.yaml"), args.model_dir,
+                             setup=setup, idle_offload=args.idle_offload, low_memory_mb=args.low_memory_mb,
+                             warmup=args.warmup, warmup_voice=args.voice, is_fp16=args.fp16, device=args.device)
+    batching = BatchingQueue(engine, max_batch_size=args.max_batch_size, max_wait=args.batch_window_ms / 1000)
+    server = TTSServer(engine, batching, default_voice=args.voice, stream_window=args.stream_window)
+    try:
+        engine.wait_ready()
+        asyncio.run(serve(server, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        batching.close()
+        engine.close(cancel_running=True)
+
+
+if __name__ == "__main__":
+    main()
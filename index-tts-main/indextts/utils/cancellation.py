@@ -0,0 +1,82 @@
+import threading
+
+import torch
+from transformers import StoppingCriteria
+
+
+class SynthesisCancelled(Exception):
+    """合成被 ``CancellationToken`` 取消"""
+
+
+class SynthesisPreempted(SynthesisCancelled):
+    """合成在分句边界让出给更高优先级的任务，之后可重新提交继续（已完成的分句在分句缓存中）"""
+
+
+class CancellationToken:
+    """
+    线程安全的取消标记：UI / 工作线程调用 ``cancel()``，推理线程在解码步、分句、分桶和声码器 chunk 之间检查。
+    ``request_preemption()`` 只在分句边界生效，不打断正在解码的分句。
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._preempt = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    def reset(self):
+        self._event.clear()
+        self._preempt.clear()
+
+    def request_preemption(self):
+        self._preempt.set()
+
+    def clear_preemption(self):
+        self._preempt.clear()
+
+    @property
+    def preemption_requested(self) -> bool:
+        return self._preempt.is_set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self.cancelled:
+            raise SynthesisCancelled("synthesis cancelled")
+
+    def raise_if_preempted(self):
+        if self.preemption_requested:
+            raise SynthesisPreempted("synthesis preempted")
+
+
+class ImmediatePreemptionToken(CancellationToken):
+    """
+    共享另一个 ``CancellationToken`` 的状态，但把抢占请求当作取消：在下一个解码步、分桶或声码器 chunk 处停止，
+    并抛出 ``SynthesisPreempted``。用于结果可以丢弃、需要尽快让出的任务（如预热）。
+    """
+
+    def __init__(self, token: CancellationToken):
+        self._event = token._event
+        self._preempt = token._preempt
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set() or self._preempt.is_set()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise SynthesisCancelled("synthesis cancelled")
+        self.raise_if_preempted()
+
+
+class CancellationStoppingCriteria(StoppingCriteria):
+    """取消后让 HF ``generate`` 在下一个解码步结束（返回不完整的 codes，由调用方丢弃并抛出 ``SynthesisCancelled``）"""
+
+    def __init__(self, token: CancellationToken):
+        self.token = token
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs) -> bool:
+        return self.token.cancelled
@@ -16,8 +16,10 @@ def load_audio(audiopath, sampling_rate):
         audio = audio[0].unsqueeze(0)
 
     if sr != sampling_rate:
+        # feature_extractors 依赖本模块，延迟导入避免循环引用
+        from indextts.utils.feature_extractors import get_resampler
         try:
-            audio = torchaudio.functional.resample(audio, sr, sampling_rate)
+            audio = get_resampler(sr, sampling_rate)(audio)
         except Exception as e:
             print(f"Warning: {audiopath}, wave shape: {audio.shape}, sample_rate: {sr}")
             return None
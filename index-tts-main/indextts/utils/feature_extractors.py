@@ -1,3 +1,5 @@
+import functools
+
 import torch
 import torchaudio
 from torch import nn
@@ -48,3 +50,28 @@ class MelSpectrogramFeatures(FeatureExtractor):
         mel = self.mel_spec(audio)
         mel = safe_log(mel)
         return mel
+
+
+@functools.lru_cache(maxsize=16)
+def _cached_resampler(orig_freq: int, new_freq: int, device: str, dtype: torch.dtype) -> torchaudio.transforms.Resample:
+    return torchaudio.transforms.Resample(orig_freq, new_freq, dtype=dtype).to(device)
+
+
+def get_resampler(orig_freq, new_freq=24000, device="cpu", dtype=torch.float32) -> torchaudio.transforms.Resample:
+    """
+    按 (原采样率, 目标采样率, device, dtype) 缓存的 ``Resample`` 实例，避免每次重新计算 sinc 卷积核。
+    与 ``torchaudio.functional.resample`` 的默认参数一致，结果相同。
+    """
+    return _cached_resampler(int(orig_freq), int(new_freq), str(torch.device(device)), dtype)
+
+
+@functools.lru_cache(maxsize=8)
+def _cached_mel_extractor(sample_rate: int, device: str, dtype: torch.dtype) -> MelSpectrogramFeatures:
+    return MelSpectrogramFeatures(sample_rate=sample_rate).to(device=device, dtype=dtype)
+
+
+def get_mel_extractor(sample_rate=24000, device="cpu", dtype=torch.float32) -> MelSpectrogramFeatures:
+    """
+    按 (采样率, device, dtype) 缓存的默认参数 ``MelSpectrogramFeatures`` 实例，复用 mel 滤波器组和 STFT 窗函数。
+    """
+    return _cached_mel_extractor(int(sample_rate), str(torch.device(device)), dtype)
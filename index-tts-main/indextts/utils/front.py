@@ -1,17 +1,31 @@
 # -*- coding: utf-8 -*-
 import os
+import threading
 import traceback
 import re
-from typing import List, Union, overload
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Tuple, Union, overload
 import warnings
 from indextts.utils.common import tokenize_by_CJK_char, de_tokenized_by_CJK_char
+from indextts.utils.log import get_logger
 from sentencepiece import SentencePieceProcessor
 
+logger = get_logger("front")
+
 
 class TextNormalizer:
-    def __init__(self):
+    def __init__(self, cache_dir: str = None):
+        """
+        Args:
+            cache_dir: 中文 tagger FST 缓存目录，默认读取环境变量 ``INDEXTTS_TN_CACHE_DIR``，
+                否则使用包内的 ``tagger_cache``。多个进程指向同一个预先构建好的目录即可共享缓存，无需各自重新构建。
+        """
         self.zh_normalizer = None
         self.en_normalizer = None
+        self.cache_dir = cache_dir or os.environ.get("INDEXTTS_TN_CACHE_DIR") or \
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), "tagger_cache")
+        self._load_lock = threading.Lock()
         self.char_rep_map = {
             "：": ",",
             "；": ",",
@@ -88,6 +102,11 @@ class TextNormalizer:
     def load(self):
         # print(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
         # sys.path.append(model_dir)
+        # 可能在后台线程中加载，加锁避免重复构建
+        with self._load_lock:
+            self._load()
+
+    def _load(self):
         import platform
         if self.zh_normalizer is not None and self.en_normalizer is not None:
             return
@@ -100,9 +119,9 @@ class TextNormalizer:
             from tn.chinese.normalizer import Normalizer as NormalizerZh
             from tn.english.normalizer import Normalizer as NormalizerEn
             # use new cache dir for build tagger rules with disable remove_interjections and remove_erhua
-            cache_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tagger_cache")
+            cache_dir = self.cache_dir
             if not os.path.exists(cache_dir):
-                os.makedirs(cache_dir)
+                os.makedirs(cache_dir, exist_ok=True)
                 with open(os.path.join(cache_dir, ".gitignore"), "w") as f:
                     f.write("*\n")
             self.zh_normalizer = NormalizerZh(
@@ -311,20 +330,31 @@ class TextTokenizer:
             tokens = [tokens]
         return [self.sp_model.PieceToId(token) for token in tokens]
 
-    def tokenize(self, text: str) -> List[str]:
-        return self.encode(text, out_type=str)
+    def tokenize(self, text: str, preprocessed=False) -> List[str]:
+        return self.encode(text, out_type=str, preprocessed=preprocessed)
 
-    def encode(self, text: str, **kwargs):
-        if len(text) == 0:
-            return []
+    def preprocess(self, text: str) -> str:
+        """
+        ``encode`` 的预处理：文本正则化和预分词（单个字符不处理）
+        """
         if len(text.strip()) == 1:
-            return self.sp_model.Encode(text, out_type=kwargs.pop("out_type", int), **kwargs)
-        # 预处理
+            return text
         if self.normalizer:
             text = self.normalizer.normalize(text)
         if len(self.pre_tokenizers) > 0:
             for pre_tokenizer in self.pre_tokenizers:
                 text = pre_tokenizer(text)
+        return text
+
+    def encode(self, text: str, preprocessed=False, **kwargs):
+        """
+        Args:
+            preprocessed: ``text`` 已经过 ``preprocess``，直接分词
+        """
+        if len(text) == 0:
+            return []
+        if not preprocessed:
+            text = self.preprocess(text)
         return self.sp_model.Encode(text, out_type=kwargs.pop("out_type", int), **kwargs)
 
     def batch_encode(self, texts: List[str], **kwargs):
@@ -429,6 +459,64 @@ class TextTokenizer:
         )
 
 
+class TextPrefetcher:
+    """
+    文本前端预取：在后台线程中提前完成正则化、分词和分句，
+    让当前条目在 GPT 解码时，后续条目的文本处理可以同时进行。
+    """
+
+    def __init__(self, tokenizer: TextTokenizer, max_workers: int = 1, max_pending: int = 16):
+        self.tokenizer = tokenizer
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="text_prefetch")
+        self._futures: "OrderedDict[Tuple[str, int], Future]" = OrderedDict()
+        self._lock = threading.Lock()
+        # WeTextProcessing 的 FST 不保证线程安全，正则化串行执行
+        self._tokenize_lock = threading.Lock()
+
+    def _split(self, text: str, max_tokens_per_sentence: int) -> Tuple[List[str], List[List[str]]]:
+        with self._tokenize_lock:
+            tokens = self.tokenizer.tokenize(text)
+        sentences = self.tokenizer.split_sentences(tokens, max_tokens_per_sentence=max_tokens_per_sentence)
+        return tokens, sentences
+
+    def submit(self, text: str, max_tokens_per_sentence=120) -> Future:
+        """
+        提交一条文本到后台处理，重复提交同一文本只会处理一次
+        """
+        key = (text, max_tokens_per_sentence)
+        with self._lock:
+            future = self._futures.get(key)
+            if future is None:
+                future = self._executor.submit(self._split, text, max_tokens_per_sentence)
+                self._futures[key] = future
+                # 丢弃最早提交且未被取用的结果，避免无限堆积
+                while len(self._futures) > self.max_pending:
+                    _, stale = self._futures.popitem(last=False)
+                    stale.cancel()
+        return future
+
+    def get(self, text: str, max_tokens_per_sentence=120) -> Tuple[List[str], List[List[str]]]:
+        """
+        取出预取结果；未预取或预取失败时在当前线程直接处理
+        """
+        with self._lock:
+            future = self._futures.pop((text, max_tokens_per_sentence), None)
+        if future is not None and not future.cancelled():
+            try:
+                return future.result()
+            except Exception:
+                logger.exception(">> text prefetch failed, processing in the current thread")
+        return self._split(text, max_tokens_per_sentence)
+
+    def shutdown(self):
+        with self._lock:
+            for future in self._futures.values():
+                future.cancel()
+            self._futures.clear()
+        self._executor.shutdown(wait=False)
+
+
 if __name__ == "__main__":
     # 测试程序
 
@@ -0,0 +1,99 @@
+"""
+分级日志。
+
+推理过程中的摘要（分句数、分桶、缓存命中）记为 INFO，逐句的 token / codes 张量等调试信息记为 DEBUG。
+默认只向标准输出打印 INFO 及以上；DEBUG 记录只有在某个输出端需要时才会格式化，不影响合成线程的速度。
+也可以通过环境变量配置：
+    ``INDEXTTS_LOG_LEVEL``: 标准输出的日志级别，如 ``DEBUG``、``WARNING``
+    ``INDEXTTS_LOG_FILE``: 额外写入的日志文件，记录 DEBUG 及以上
+"""
+import logging
+import os
+import sys
+from typing import Union
+
+LOGGER_NAME = "indextts"
+
+logger = logging.getLogger(LOGGER_NAME)
+# 不向 root logger 传递，避免应用配置 logging 后重复输出
+logger.propagate = False
+
+
+class _StdoutHandler(logging.StreamHandler):
+    """与 ``print`` 一样在输出时才取 ``sys.stdout``，应用重定向标准输出后仍然生效"""
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+_console_handler = _StdoutHandler()
+_console_handler.setFormatter(logging.Formatter("%(message)s"))
+_console_handler.setLevel(logging.INFO)
+logger.addHandler(_console_handler)
+
+
+def get_logger(name: str = None) -> logging.Logger:
+    """``indextts`` 的子 logger，共用同一组输出端"""
+    return logger.getChild(name) if name else logger
+
+
+def _sync_level():
+    # logger 的级别取各输出端中最低的，没有输出端需要的记录在创建前就被丢弃
+    levels = [handler.level for handler in logger.handlers]
+    logger.setLevel(min(levels) if levels else logging.WARNING)
+
+
+def set_log_level(level: Union[int, str]):
+    """设置标准输出的日志级别，如 ``"DEBUG"`` 打印逐句的张量信息，``"WARNING"`` 只打印警告"""
+    _console_handler.setLevel(logging.getLevelName(level.upper()) if isinstance(level, str) else level)
+    _sync_level()
+
+
+def add_file_sink(path: str, level: Union[int, str] = logging.DEBUG) -> logging.Handler:
+    """
+    把日志同时写入文件（默认包括 DEBUG 级别的张量信息），标准输出的级别不变。
+    Returns:
+        文件 handler，可传给 ``remove_sink`` 移除
+    """
+    if os.path.dirname(path) != "":
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    handler = logging.FileHandler(path, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(threadName)s: %(message)s"))
+    handler.setLevel(logging.getLevelName(level.upper()) if isinstance(level, str) else level)
+    logger.addHandler(handler)
+    _sync_level()
+    return handler
+
+
+def remove_sink(handler: logging.Handler):
+    logger.removeHandler(handler)
+    handler.close()
+    _sync_level()
+
+
+class lazy:
+    """
+    延迟求值的日志参数，只有记录真正输出时才调用 ``fn``：
+        logger.debug("tokens: %s", lazy(tokenizer.convert_ids_to_tokens, ids))
+    """
+
+    __slots__ = ("fn", "args")
+
+    def __init__(self, fn, *args):
+        self.fn = fn
+        self.args = args
+
+    def __str__(self):
+        return str(self.fn(*self.args))
+
+
+if os.environ.get("INDEXTTS_LOG_LEVEL"):
+    set_log_level(os.environ["INDEXTTS_LOG_LEVEL"])
+if os.environ.get("INDEXTTS_LOG_FILE"):
+    add_file_sink(os.environ["INDEXTTS_LOG_FILE"])
+_sync_level()
@@ -0,0 +1,151 @@
+import os
+import threading
+import time
+from typing import List, Optional, Tuple
+
+import torch
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+MB = 1024 * 1024
+
+
+def current_rss() -> Optional[int]:
+    """当前进程的常驻内存（字节），无法获取时返回 None"""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def accelerator_allocated(device) -> Optional[int]:
+    """加速器上 PyTorch 已分配的显存（字节），CPU 返回 None"""
+    device = torch.device(device)
+    try:
+        if device.type == "cuda":
+            return torch.cuda.memory_allocated(device)
+        if device.type == "mps":
+            return torch.mps.current_allocated_memory()
+    except Exception:
+        pass
+    return None
+
+
+def available_memory(device) -> Optional[int]:
+    """设备当前可用的内存（字节）：CUDA 为空闲显存，CPU / MPS（统一内存）为系统可用内存"""
+    device = torch.device(device)
+    if device.type == "cuda":
+        free, _ = torch.cuda.mem_get_info(device)
+        # PyTorch 缓存分配器中已保留但未使用的部分也可以复用
+        return free + torch.cuda.memory_reserved(device) - torch.cuda.memory_allocated(device)
+    if psutil is not None:
+        return psutil.virtual_memory().available
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def kv_cache_bytes(layers: int, model_dim: int, batch_size: int, seq_len: int, element_size: int = 4) -> int:
+    """GPT2 KV cache 大小：每层每个 token 保存 key 和 value 各 ``model_dim`` 个元素"""
+    return 2 * layers * batch_size * seq_len * model_dim * element_size
+
+
+class MemoryMonitor:
+    """
+    后台线程按固定间隔采样进程 RSS 和加速器已分配显存，合成结束后按时间区间求出各阶段、各分桶的峰值。
+    CUDA 上另外用 ``max_memory_allocated`` 记录整次合成的精确显存峰值（采样可能漏掉很短的尖峰）。
+    """
+
+    def __init__(self, device, interval: float = 0.005):
+        self.device = torch.device(device)
+        self.interval = interval
+        # (time, rss, accelerator)
+        self.samples: List[Tuple[float, Optional[int], Optional[int]]] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sample(self):
+        record = (time.perf_counter(), current_rss(), accelerator_allocated(self.device))
+        with self._lock:
+            self.samples.append(record)
+        return record
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        self.stop()
+        with self._lock:
+            self.samples = []
+        if self.device.type == "cuda":
+            torch.cuda.reset_peak_memory_stats(self.device)
+        self.sample()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="memory_monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def peak(self, start: float, end: float) -> Tuple[Optional[int], Optional[int]]:
+        """区间内的 RSS 和显存峰值；区间内没有采样点时取紧邻区间两端的采样"""
+        with self._lock:
+            samples = list(self.samples)
+        window = [s for s in samples if start <= s[0] <= end]
+        if not window:
+            before = [s for s in samples if s[0] < start]
+            after = [s for s in samples if s[0] > end]
+            window = before[-1:] + after[:1]
+        rss = [s[1] for s in window if s[1] is not None]
+        accel = [s[2] for s in window if s[2] is not None]
+        return (max(rss) if rss else None), (max(accel) if accel else None)
+
+    def annotate(self, profile, max_counter_points: int = 2000):
+        """
+        把峰值内存写入 ``profile`` 各区间的 ``peak_rss_mb`` / ``peak_accelerator_mb``，以及 ``profile.meta``，
+        ``generate`` 区间另记 ``rss_growth_mb``（相对区间开始时的增长），采样序列作为 Chrome trace 的计数器
+        """
+        end_sample = self.sample()
+        for span in profile.spans:
+            rss, accel = self.peak(span.start, span.end if span.end is not None else end_sample[0])
+            if rss is not None:
+                span.attrs["peak_rss_mb"] = round(rss / MB, 1)
+                if span.name == "generate":
+                    start_rss, _ = self.peak(span.start, span.start)
+                    span.attrs["rss_growth_mb"] = round(max(0, rss - (start_rss or rss)) / MB, 1)
+            if accel is not None:
+                span.attrs["peak_accelerator_mb"] = round(accel / MB, 1)
+        rss, accel = self.peak(profile.origin, end_sample[0])
+        if rss is not None:
+            profile.meta["peak_rss_mb"] = round(rss / MB, 1)
+        if self.device.type == "cuda":
+            profile.meta["peak_accelerator_mb"] = round(torch.cuda.max_memory_allocated(self.device) / MB, 1)
+        elif accel is not None:
+            profile.meta["peak_accelerator_mb"] = round(accel / MB, 1)
+        with self._lock:
+            samples = list(self.samples)
+        step = max(1, -(-len(samples) // max_counter_points))
+        for t, rss, accel in samples[::step]:
+            values = {}
+            if rss is not None:
+                values["rss_mb"] = round(rss / MB, 1)
+            if accel is not None:
+                values["accelerator_mb"] = round(accel / MB, 1)
+            if values:
+                profile.add_counter("memory", t, **values)
@@ -0,0 +1,72 @@
+"""
+模型权重卸载。
+
+``WeightOffloader`` 把一个模块的全部参数和 buffer 换成磁盘快照的内存映射（``torch.load(mmap=True)``）：
+    - 加速器上的权重移到映射的 CPU 张量，显存立即释放，``reload`` 时再复制回设备
+    - CPU 上的权重直接由映射文件提供，内核按需读入、内存紧张时直接丢弃（不占 swap），``reload`` 无需复制
+快照在第一次卸载时由当前权重（已完成精度转换、去除 weight norm 等处理）写出，之后的卸载只需重新映射。
+"""
+import os
+import time
+from typing import List, Tuple
+
+import torch
+
+
+class WeightOffloader:
+    def __init__(self, module: torch.nn.Module, snapshot_path: str, device):
+        """
+        Args:
+            module: 要卸载的模块，卸载和加载都原地替换其张量的数据，模块和优化过的引用保持不变
+            snapshot_path: 权重快照文件，已存在时直接使用（文件名应包含模型版本、精度等信息，见 ``IndexTTS.offload_weights``）
+            device: 模块正常运行时所在的设备
+        """
+        self.module = module
+        self.snapshot_path = snapshot_path
+        self.device = torch.device(device)
+        self.offloaded = False
+        # 共享的参数（如绑定的词嵌入）只出现一次
+        self._tensors: List[Tuple[str, torch.Tensor]] = list(module.named_parameters()) + list(module.named_buffers())
+
+    def _save_snapshot(self):
+        if os.path.dirname(self.snapshot_path) != "":
+            os.makedirs(os.path.dirname(self.snapshot_path), exist_ok=True)
+        state = {name: tensor.detach().cpu() for name, tensor in self._tensors}
+        # 先写临时文件再替换，中途退出不会留下不完整的快照
+        tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        torch.save(state, tmp_path)
+        os.replace(tmp_path, self.snapshot_path)
+
+    def _load_snapshot(self):
+        """映射快照文件；与当前模块的张量名、形状或精度不一致时返回 None"""
+        state = torch.load(self.snapshot_path, map_location="cpu", mmap=True, weights_only=True)
+        for name, tensor in self._tensors:
+            saved = state.get(name)
+            if saved is None or saved.shape != tensor.shape or saved.dtype != tensor.dtype:
+                return None
+        return state
+
+    def offload(self) -> float:
+        """把权重换成快照的内存映射，返回耗时（秒）"""
+        if self.offloaded:
+            return 0.0
+        start_time = time.perf_counter()
+        state = self._load_snapshot() if os.path.isfile(self.snapshot_path) else None
+        if state is None:
+            self._save_snapshot()
+            state = self._load_snapshot()
+        for name, tensor in self._tensors:
+            tensor.data = state[name]
+        self.offloaded = True
+        return time.perf_counter() - start_time
+
+    def reload(self) -> float:
+        """把权重复制回运行设备（CPU 上保持映射），返回耗时（秒）"""
+        if not self.offloaded:
+            return 0.0
+        start_time = time.perf_counter()
+        if self.device.type != "cpu":
+            for _, tensor in self._tensors:
+                tensor.data = tensor.data.to(self.device)
+        self.offloaded = False
+        return time.perf_counter() - start_time
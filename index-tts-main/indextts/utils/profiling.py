@@ -0,0 +1,138 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class Span:
+    """一个计时区间，``attrs`` 记录分句 / 分桶序号、token 数等附加信息"""
+
+    __slots__ = ("name", "start", "end", "attrs", "thread_id")
+
+    def __init__(self, name: str, start: float, end: Optional[float] = None, thread_id: Optional[int] = None, **attrs):
+        self.name = name
+        self.start = start
+        self.end = end
+        self.attrs = attrs
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def __repr__(self):
+        return f"Span({self.name!r}, {self.duration:.4f}s, {self.attrs})"
+
+
+class SynthesisProfile:
+    """
+    一次合成的分阶段计时：load、normalize、tokenize、conditioning、generate、latent、vocode、save 等，
+    可汇总为各阶段耗时，或导出为 Chrome trace（``chrome://tracing`` / Perfetto 打开）。
+    """
+
+    def __init__(self, name: str = "infer"):
+        self.name = name
+        self.origin = time.perf_counter()
+        self.spans: List[Span] = []
+        # 整体信息，如音频时长、RTF
+        self.meta: Dict[str, Any] = {}
+        # 计数器采样（如内存占用）：(name, time, values)
+        self.counters: List[Tuple[str, float, Dict[str, float]]] = []
+        self._lock = threading.Lock()
+
+    def add(self, name: str, start: float, end: Optional[float] = None, **attrs) -> Span:
+        """记录一个已结束的区间，``end`` 默认为当前时间"""
+        span = Span(name, start, end if end is not None else time.perf_counter(), **attrs)
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    def add_counter(self, name: str, t: float, **values):
+        """记录计数器在 ``t`` 时刻的取值，导出为 Chrome trace 的 counter 事件"""
+        with self._lock:
+            self.counters.append((name, t, values))
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        """计时上下文，可在块内向 ``span.attrs`` 补充信息"""
+        span = Span(name, time.perf_counter(), **attrs)
+        try:
+            yield span
+        finally:
+            span.end = time.perf_counter()
+            with self._lock:
+                self.spans.append(span)
+
+    def extend(self, other: "SynthesisProfile"):
+        """并入另一个 profile 的区间（如模型加载），时间原点取两者中较早的"""
+        with self._lock:
+            self.spans.extend(other.spans)
+            self.spans.sort(key=lambda span: span.start)
+            self.counters.extend(other.counters)
+            self.origin = min(self.origin, other.origin)
+
+    def totals(self) -> Dict[str, float]:
+        """各阶段总耗时（秒），按首次出现顺序"""
+        totals: Dict[str, float] = {}
+        for span in self.spans:
+            totals[span.name] = totals.get(span.name, 0.0) + span.duration
+        return totals
+
+    def counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for span in self.spans:
+            counts[span.name] = counts.get(span.name, 0) + 1
+        return counts
+
+    def sum_attr(self, name: str, attr: str) -> int:
+        return sum(span.attrs.get(attr, 0) for span in self.spans if span.name == name)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """可 JSON 序列化的结果（也用于 Qt 信号传递）"""
+        return {
+            "name": self.name,
+            "meta": dict(self.meta),
+            "totals": self.totals(),
+            "counts": self.counts(),
+            "spans": [
+                {"name": s.name, "start": s.start - self.origin, "duration": s.duration, **s.attrs}
+                for s in self.spans
+            ],
+        }
+
+    def summary(self) -> str:
+        totals = self.totals()
+        parts = [f"{name}: {seconds:.2f}s" for name, seconds in totals.items()]
+        mel_tokens = self.sum_attr("generate", "mel_tokens")
+        if mel_tokens:
+            parts.append(f"mel_tokens: {mel_tokens}")
+        if "rtf" in self.meta:
+            parts.append(f"RTF: {self.meta['rtf']:.4f}")
+        return ", ".join(parts)
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """Chrome trace event 格式（complete events，时间单位为微秒）"""
+        pid = os.getpid()
+        events = []
+        for span in self.spans:
+            events.append({
+                "name": span.name,
+                "cat": self.name,
+                "ph": "X",
+                "ts": (span.start - self.origin) * 1e6,
+                "dur": span.duration * 1e6,
+                "pid": pid,
+                "tid": span.thread_id,
+                "args": {k: v for k, v in span.attrs.items()},
+            })
+        for name, t, values in self.counters:
+            events.append({"name": name, "cat": self.name, "ph": "C", "ts": (t - self.origin) * 1e6, "pid": pid, "args": values})
+        return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": dict(self.meta)}
+
+    def save_chrome_trace(self, path: str):
+        if os.path.dirname(path) != "":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_chrome_trace(), f, ensure_ascii=False, default=str)
@@ -0,0 +1,53 @@
+from typing import Optional, Tuple
+
+import torch
+
+
+def speech_frames(audio: torch.Tensor, sampling_rate: int, frame_seconds=0.025, hop_seconds=0.010, top_db=40.0) -> torch.Tensor:
+    """
+    基于能量的简单 VAD：帧 RMS 低于最大值 ``top_db`` 分贝以上的帧视为静音。
+    Args:
+        audio: ``[1, T]`` 单声道音频
+    Returns:
+        ``[num_frames]`` bool，帧移为 ``hop_seconds``
+    """
+    frame_length = max(1, int(sampling_rate * frame_seconds))
+    hop_length = max(1, int(sampling_rate * hop_seconds))
+    if audio.shape[-1] < frame_length:
+        return torch.ones(1, dtype=torch.bool)
+    frames = audio[0].unfold(0, frame_length, hop_length)
+    db = 20 * torch.log10(frames.pow(2).mean(dim=-1).sqrt() + 1e-10)
+    return db > db.max() - top_db
+
+
+def select_reference_window(audio: torch.Tensor, sampling_rate: int, max_seconds: Optional[float] = None,
+                            trim_silence=True, top_db=40.0, pad_seconds=0.1, hop_seconds=0.010) -> Tuple[int, int]:
+    """
+    选出参考音频中用于提取音色的片段：去掉首尾静音，超过 ``max_seconds`` 时取语音帧最密集的窗口。
+    Args:
+        audio: ``[1, T]`` 单声道音频
+    Returns:
+        ``(start, end)`` 采样点区间
+    """
+    total = audio.shape[-1]
+    hop_length = max(1, int(sampling_rate * hop_seconds))
+    voiced = speech_frames(audio, sampling_rate, hop_seconds=hop_seconds, top_db=top_db)
+    start, end = 0, total
+    if trim_silence and voiced.any():
+        idx = torch.nonzero(voiced).squeeze(-1)
+        pad = int(sampling_rate * pad_seconds)
+        start = max(0, int(idx[0]) * hop_length - pad)
+        end = min(total, int(idx[-1]) * hop_length + int(sampling_rate * 0.025) + pad)
+    max_length = int(sampling_rate * max_seconds) if max_seconds else None
+    if max_length is None or end - start <= max_length:
+        return start, end
+    # 在 [start, end) 内滑动窗口，选语音帧最多的位置（并列时取最靠前的）
+    first_frame = start // hop_length
+    last_frame = min(len(voiced), (end - max_length) // hop_length + 1)
+    window_frames = max(1, max_length // hop_length)
+    counts = torch.cat([torch.zeros(1, dtype=torch.long), voiced.long().cumsum(0)])
+    frames = torch.arange(first_frame, max(first_frame + 1, last_frame))
+    window_counts = counts[(frames + window_frames).clamp(max=len(voiced))] - counts[frames.clamp(max=len(voiced))]
+    best_frame = int(frames[torch.argmax(window_counts)])
+    start = max(start, best_frame * hop_length)
+    return start, min(end, start + max_length)
@@ -0,0 +1,81 @@
+import hashlib
+from typing import List
+
+import torch
+from transformers import LogitsProcessor, TemperatureLogitsWarper, TopKLogitsWarper, TopPLogitsWarper
+
+
+def derive_seed(*parts) -> int:
+    """
+    由任意可转为字符串的部分（如条目 id、分句序号）派生稳定的 63 位随机种子，跨进程、跨平台结果一致。
+    """
+    payload = "\x1f".join(str(p) for p in parts).encode("utf-8")
+    return int.from_bytes(hashlib.sha256(payload).digest()[:8], "little") & ((1 << 63) - 1)
+
+
+# 采样实现变化时递增，旧版本写入分句缓存的结果随之失效
+SEEDED_SAMPLING_VERSION = 2
+
+
+def seeded_generators(seeds: List[int]) -> List[torch.Generator]:
+    """每个分句一个独立的 CPU 随机数生成器"""
+    generators = []
+    for seed in seeds:
+        generator = torch.Generator(device="cpu")
+        generator.manual_seed(derive_seed(seed, 0))
+        generators.append(generator)
+    return generators
+
+
+def gumbel_noise(generators: List[torch.Generator], size: int) -> torch.Tensor:
+    """``[len(generators), size]`` 的 Gumbel 噪声，每行只由对应的生成器决定"""
+    uniform = torch.stack([torch.rand(size, generator=g) for g in generators])
+    return -torch.log(-torch.log(uniform.clamp_(min=1e-20, max=1.0 - 1e-7)))
+
+
+def seeded_sample_without_replacement(scores: torch.FloatTensor, num_samples: int,
+                                      generators: List[torch.Generator]) -> torch.LongTensor:
+    """
+    Gumbel-top-k: the indices of the ``num_samples`` largest ``scores + Gumbel noise`` per row are distributed as
+    ``torch.multinomial(softmax(scores), num_samples)`` without replacement, with row ``i`` drawing its noise
+    from ``generators[i]`` only. The noise is used for the selection only, the caller keeps the original scores.
+    """
+    noise = gumbel_noise(generators, scores.shape[-1]).to(device=scores.device)
+    return torch.topk(scores.float() + noise, num_samples, dim=-1).indices
+
+
+class SeededGumbelLogitsProcessor(LogitsProcessor):
+    """
+    Gumbel-max sampling with an isolated RNG per batch row, for ``num_beams == 1``.
+
+    Each row (one sentence) owns a ``torch.Generator`` seeded from its sentence seed. Adding Gumbel noise
+    to the warped scores and taking the argmax (greedy search) draws from the same distribution as
+    multinomial sampling, but the noise of a row never depends on the other rows in the batch, so batched
+    and sentence-by-sentence inference produce the same tokens for the same seeds.
+    Beam search accumulates the processed scores, so seeded beam sampling is done by
+    ``GPT2InferenceModel.beam_sample`` with ``seeded_sample_without_replacement`` instead.
+    """
+
+    def __init__(self, seeds: List[int]):
+        self.generators = seeded_generators(seeds)
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor) -> torch.FloatTensor:
+        if scores.shape[0] != len(self.generators):
+            raise ValueError(f"expected {len(self.generators)} rows for seeded sampling, got {scores.shape[0]}")
+        gumbel = gumbel_noise(self.generators, scores.shape[-1])
+        return scores + gumbel.to(device=scores.device, dtype=scores.dtype)
+
+
+def build_seeded_sampling_processors(seeds: List[int], temperature=1.0, top_k=None, top_p=None) -> List[LogitsProcessor]:
+    """
+    构建与 ``do_sample=True`` 等价的 warpers + 按行独立的 Gumbel 采样，配合 ``do_sample=False``、``num_beams=1`` 传给 ``generate()``。
+    """
+    processors: List[LogitsProcessor] = []
+    if temperature is not None and temperature != 1.0:
+        processors.append(TemperatureLogitsWarper(temperature))
+    if top_k is not None and top_k > 0:
+        processors.append(TopKLogitsWarper(top_k=top_k))
+    if top_p is not None and top_p < 1.0:
+        processors.append(TopPLogitsWarper(top_p=top_p))
+    processors.append(SeededGumbelLogitsProcessor(seeds))
+    return processors
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+
+def file_content_hash(path: str, chunk_size=1 << 20) -> str:
+    """
+    计算文件内容的 sha256，用于识别参考音频（同一音频换了路径也能命中缓存）
+    """
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class SentenceCache:
+    """
+    按内容寻址的分句合成结果磁盘缓存。
+
+    每个分句的 int16 音频（以及可选的 GPT codes、latent）以 ``make_key()`` 生成的哈希为文件名保存，键由参考音频内容、
+    正则化后的分句 token、生成参数、随机种子和模型版本共同决定，任一项变化都不会命中旧结果。
+    缓存总大小超过 ``max_size_mb`` 时按最近访问时间（LRU）淘汰。
+    """
+
+    SUFFIX = ".npz"
+    # 早期版本只保存音频（``.npy``），没有 codes / latent，不能用于 ``revocode``，扫描时删除
+    LEGACY_SUFFIXES = (".npy",)
+
+    def __init__(self, cache_dir: str, max_size_mb: float = 2048):
+        self.cache_dir = cache_dir
+        self.max_size = int(max_size_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        # key -> (size, last_access)
+        self._entries: Optional[Dict[str, Tuple[int, float]]] = None
+        self._total_size = 0
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(**parts) -> str:
+        payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + self.SUFFIX)
+
+    def _scan(self):
+        # 首次访问时扫描目录建立索引，文件修改时间即最近访问时间
+        if self._entries is not None:
+            return
+        self._entries = {}
+        self._total_size = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(self.LEGACY_SUFFIXES):
+                    try:
+                        os.remove(os.path.join(root, name))
+                    except OSError:
+                        pass
+                    continue
+                if not name.endswith(self.SUFFIX):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(root, name))
+                except OSError:
+                    continue
+                self._entries[name[: -len(self.SUFFIX)]] = (stat.st_size, stat.st_mtime)
+                self._total_size += stat.st_size
+
+    def get(self, key: str) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Returns:
+            ``{"wav": int16 音频, ...}``，未命中时返回 ``None``
+        """
+        path = self._path(key)
+        with self._lock:
+            self._scan()
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            try:
+                with np.load(path) as data:
+                    entry = {name: data[name] for name in data.files}
+                now = time.time()
+                os.utime(path, (now, now))
+            except (OSError, ValueError):
+                # 文件被外部删除或损坏
+                self._drop(key)
+                self.misses += 1
+                return None
+            self._entries[key] = (self._entries[key][0], now)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, wav: np.ndarray, **arrays: np.ndarray):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 先写临时文件再替换，避免并发读到不完整的文件
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, wav=wav, **arrays)
+        os.replace(tmp_path, path)
+        size = os.path.getsize(path)
+        with self._lock:
+            self._scan()
+            if key in self._entries:
+                self._total_size -= self._entries[key][0]
+            self._entries[key] = (size, time.time())
+            self._total_size += size
+            self._evict()
+
+    def _drop(self, key: str):
+        size, _ = self._entries.pop(key, (0, 0))
+        self._total_size -= size
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _evict(self):
+        if self._total_size <= self.max_size:
+            return
+        for key, _ in sorted(self._entries.items(), key=lambda x: x[1][1]):
+            if self._total_size <= self.max_size:
+                break
+            self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._scan()
+            for key in list(self._entries.keys()):
+                self._drop(key)
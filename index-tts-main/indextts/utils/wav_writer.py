@@ -0,0 +1,142 @@
+import os
+import wave
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+import numpy as np
+import torch
+
+
+class IncrementalWavWriter:
+    """
+    边合成边写入 16-bit 单声道 WAV。
+    采样数据直接追加到文件末尾，关闭时回写文件头中的长度字段，内存占用与音频总时长无关。
+    每次 ``write`` 后立即刷新，其他读取方（如流式返回）可以跟随文件读到已完成的分句。
+    """
+
+    def __init__(self, path: str, sampling_rate: int = 24000):
+        if os.path.dirname(path) != "":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.sampling_rate = sampling_rate
+        self.num_samples = 0
+        # 每次 ``write`` 的起始采样位置，逐句写入时即各分句的偏移
+        self.offsets: List[int] = []
+        self._file = open(path, "wb")
+        self._wav = wave.open(self._file, "wb")
+        self._wav.setnchannels(1)
+        self._wav.setsampwidth(2)
+        self._wav.setframerate(sampling_rate)
+
+    def write(self, wav):
+        """
+        Args:
+            wav: ``[1, T]`` 或 ``[T]``，int16 取值范围的 float 或 int16 张量/数组
+        """
+        if isinstance(wav, torch.Tensor):
+            wav = wav.detach().cpu().numpy()
+        data = np.asarray(wav).reshape(-1)
+        if data.dtype != np.int16:
+            # 与 ``tensor.type(torch.int16)`` 一致，向零取整
+            data = np.clip(data, -32768, 32767).astype(np.int16)
+        self._wav.writeframesraw(data.astype("<i2", copy=False).tobytes())
+        self._file.flush()
+        self.offsets.append(self.num_samples)
+        self.num_samples += data.shape[0]
+
+    @property
+    def duration(self) -> float:
+        return self.num_samples / self.sampling_rate
+
+    def close(self):
+        if self._wav is not None:
+            self._wav.close()
+            self._wav = None
+            # wave 不会关闭传入的文件对象
+            self._file.close()
+
+    def discard(self):
+        """关闭并删除写了一半的文件（合成被取消或出错时调用）"""
+        self.close()
+        if os.path.isfile(self.path):
+            os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+
+def write_wav(path: str, wav, sampling_rate: int = 24000) -> str:
+    """把整段音频写入 16-bit 单声道 WAV（覆盖已有文件），返回 ``path``"""
+    with IncrementalWavWriter(path, sampling_rate) as writer:
+        writer.write(wav)
+    return path
+
+
+class AsyncWavWriter:
+    """
+    在后台线程中写入 WAV 文件，合成线程提交内存中的音频后即可继续下一个任务。
+    写入按提交顺序进行，``submit`` 返回的 ``Future`` 在文件写完后完成。
+    """
+
+    def __init__(self, max_workers: int = 1):
+        # 线程在第一次提交时才创建
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="wav_writer")
+
+    def submit(self, path: str, wav, sampling_rate: int = 24000) -> Future:
+        return self._executor.submit(write_wav, path, wav, sampling_rate)
+
+    def close(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+class SynthesisResult:
+    """
+    一次合成的内存结果：int16 音频、采样率、时长和各分句的起始采样位置。
+    指定了输出路径时文件由 ``AsyncWavWriter`` 在后台写入，调用方可以直接使用内存中的音频和时长，
+    需要读取文件时先 ``wait_saved``。
+    """
+
+    def __init__(self, sampling_rate: int, wav: Optional[np.ndarray], sentence_offsets: List[int],
+                 output_path: Optional[str] = None, saved: Optional[Future] = None, num_samples: Optional[int] = None):
+        """
+        Args:
+            wav: ``[T, 1]`` int16，与 Gradio 的 ``(sampling_rate, wav_data)`` 格式相同；
+                长文本模式下音频已边合成边写入文件，为 ``None``，此时需指定 ``num_samples``
+            sentence_offsets: 各分句在 ``wav`` 中的起始采样位置
+            saved: 后台写入 ``output_path`` 的 ``Future``，``None`` 表示无需写入或已写入
+        """
+        self.sampling_rate = sampling_rate
+        self.wav = wav
+        self.sentence_offsets = list(sentence_offsets)
+        self.output_path = output_path
+        self.saved = saved
+        self.num_samples = wav.shape[0] if wav is not None else num_samples
+
+    @property
+    def duration(self) -> float:
+        return self.num_samples / self.sampling_rate
+
+    def sentence_spans(self) -> List[Tuple[float, float]]:
+        """各分句的 ``(开始, 结束)`` 时间（秒）"""
+        bounds = self.sentence_offsets + [self.num_samples]
+        return [(bounds[i] / self.sampling_rate, bounds[i + 1] / self.sampling_rate)
+                for i in range(len(self.sentence_offsets))]
+
+    def to_gradio(self) -> Tuple[int, np.ndarray]:
+        return self.sampling_rate, self.wav
+
+    def wait_saved(self, timeout: Optional[float] = None) -> Optional[str]:
+        """等待后台写入完成并返回输出路径，写入失败时抛出原异常"""
+        if self.saved is not None:
+            self.saved.result(timeout)
+        return self.output_path
+
+    def __repr__(self):
+        return (f"SynthesisResult(duration={self.duration:.2f}s, sentences={len(self.sentence_offsets)}, "
+                f"output_path={self.output_path!r})")
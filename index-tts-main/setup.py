@@ -59,7 +59,7 @@ setup(
         "wetext" if platform.system() == "Darwin" else "WeTextProcessing",
     ],
     extras_require={
-        "webui": ["gradio"],
+        "webui": ["gradio>=4.0"],
     },
     ext_modules=[anti_alias_activation_cuda_ext] if anti_alias_activation_cuda_ext else [],
     cmdclass={"build_ext": cpp_extension.BuildExtension} if anti_alias_activation_cuda_ext else {},
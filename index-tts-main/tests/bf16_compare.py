@@ -0,0 +1,72 @@
+import time
+
+import torch
+
+from indextts.infer import IndexTTS
+
+
+def snr_db(reference: torch.Tensor, estimate: torch.Tensor) -> float:
+    length = min(reference.shape[-1], estimate.shape[-1])
+    reference, estimate = reference[..., :length].double(), estimate[..., :length].double()
+    noise = (reference - estimate).pow(2).sum()
+    return float(10 * torch.log10(reference.pow(2).sum() / noise.clamp(min=1e-12)))
+
+
+if __name__ == "__main__":
+    """
+    Compare fp32 and bf16 autocast CPU inference: speed, GPT greedy token agreement and vocoder SNR.
+    ```
+    python tests/bf16_compare.py checkpoints
+    ```
+    """
+    import sys
+    sys.path.append("..")
+    if len(sys.argv) > 1:
+        model_dir = sys.argv[1]
+    else:
+        model_dir = "checkpoints"
+    audio_prompt = "tests/sample_prompt.wav"
+    texts = [
+        "晕 XUAN4 是 一 种 GAN3 觉",
+        "大家好，我现在正在bilibili 体验 ai 科技，说实话，来之前我绝对想不到！",
+        "There is a vehicle arriving in dock number 7?",
+    ]
+    models = {
+        "fp32": IndexTTS(cfg_path=f"{model_dir}/config.yaml", model_dir=model_dir, device="cpu"),
+        "bf16": IndexTTS(cfg_path=f"{model_dir}/config.yaml", model_dir=model_dir, device="cpu", dtype="bfloat16"),
+    }
+    greedy = dict(do_sample=False, num_beams=1, seed=None)
+    timings = {name: 0.0 for name in models}
+    audio_seconds = {name: 0.0 for name in models}
+    print("--" * 10)
+    for text in texts:
+        latents = {}
+        for name, tts in models.items():
+            # warmup 不计时
+            tts.infer(audio_prompt, text, None, **greedy)
+            start_time = time.perf_counter()
+            sampling_rate, wav_data = tts.infer(audio_prompt, text, None, **greedy)
+            timings[name] += time.perf_counter() - start_time
+            audio_seconds[name] += wav_data.shape[0] / sampling_rate
+            latents[name] = list(tts.infer_latents(audio_prompt, text, **greedy))
+        # GPT：贪心解码的 codes 一致率
+        matched = total = 0
+        for ref, est in zip(latents["fp32"], latents["bf16"]):
+            length = min(ref["codes"].shape[-1], est["codes"].shape[-1])
+            matched += int((ref["codes"][0, :length] == est["codes"][0, :length]).sum())
+            total += max(ref["codes"].shape[-1], est["codes"].shape[-1])
+        # BigVGAN：相同 latent 下 bf16 声码器输出相对 fp32 的 SNR
+        cond_mel = models["fp32"].get_conditioning(audio_prompt)
+        snrs = []
+        for item in latents["fp32"]:
+            reference = models["fp32"].vocode(item["latent"], cond_mel)
+            estimate = models["bf16"].vocode(item["latent"], cond_mel)
+            snrs.append(snr_db(reference, estimate))
+        print(f"text: {text}")
+        print(f"  gpt greedy token agreement: {matched / max(total, 1):.2%}")
+        print(f"  vocoder SNR (bf16 vs fp32): {sum(snrs) / len(snrs):.1f} dB")
+    print("--" * 10)
+    for name in models:
+        print(f"{name}: {timings[name]:.2f} seconds, RTF: {timings[name] / audio_seconds[name]:.4f}")
+    print(f"bf16 speedup: {timings['fp32'] / timings['bf16']:.2f}x")
+    print("Test finished.")
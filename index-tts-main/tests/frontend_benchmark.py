@@ -0,0 +1,206 @@
+"""
+文本前端基准测试：在自带的中英混合语料（``tests/frontend_corpus.txt``，含数字、日期、拼音声调、带 ``·`` 的人名等）上，
+分别测量正则化（WeTextProcessing FST 与拼音 / 人名 / 标点等正则处理各占多少）、预分词、bpe 分词和分句的吞吐（字符/秒），
+统计每行的分句数分布，输出 JSON，并可与之前保存的基线比较。
+```
+python tests/frontend_benchmark.py --output outputs/frontend.json
+python tests/frontend_benchmark.py --baseline outputs/frontend.json --tolerance 0.15
+python tests/frontend_benchmark.py --model_dir checkpoints --corpus my_lines.txt
+```
+与基线比较时，任一阶段吞吐下降超过 ``tolerance`` 则以退出码 1 结束；分句数分布变化只提示不判失败。
+未指定 ``--model_dir`` 时使用随机权重微型模型（见 ``tests/tiny_model.py``）的 bpe，分词耗时与正式词表会略有差异。
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+from collections import Counter
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+STAGES = ["normalize", "pre_tokenize", "tokenize", "split"]
+
+
+class _TimedNormalizer:
+    """包装 WeTextProcessing 的 Normalizer，累计 FST 正则化耗时"""
+
+    def __init__(self, normalizer):
+        self.normalizer = normalizer
+        self.elapsed = 0.0
+
+    def normalize(self, text):
+        start_time = time.perf_counter()
+        try:
+            return self.normalizer.normalize(text)
+        finally:
+            self.elapsed += time.perf_counter() - start_time
+
+
+def load_corpus(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def run_once(tokenizer, lines, max_tokens_per_sentence, fst_timers):
+    """处理一遍语料，返回各阶段耗时、FST 耗时、每行分句数和每行正则化耗时"""
+    stage_seconds = dict.fromkeys(STAGES, 0.0)
+    for timer in fst_timers:
+        timer.elapsed = 0.0
+    split_counts, sentence_lengths, line_seconds = [], [], []
+    for line in lines:
+        start_time = time.perf_counter()
+        text = tokenizer.normalizer.normalize(line)
+        normalize_time = time.perf_counter() - start_time
+        stage_seconds["normalize"] += normalize_time
+        line_seconds.append(normalize_time)
+
+        start_time = time.perf_counter()
+        for pre_tokenizer in tokenizer.pre_tokenizers:
+            text = pre_tokenizer(text)
+        stage_seconds["pre_tokenize"] += time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        tokens = tokenizer.tokenize(text, preprocessed=True)
+        stage_seconds["tokenize"] += time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        sentences = tokenizer.split_sentences(tokens, max_tokens_per_sentence=max_tokens_per_sentence)
+        stage_seconds["split"] += time.perf_counter() - start_time
+        split_counts.append(len(sentences))
+        sentence_lengths.extend(len(s) for s in sentences)
+    fst_seconds = sum(timer.elapsed for timer in fst_timers)
+    return stage_seconds, fst_seconds, split_counts, sentence_lengths, line_seconds
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """逐阶段比较吞吐，返回下降超过 ``tolerance`` 的阶段名"""
+    regressions = []
+    print(f"{'stage':<16}{'baseline chars/s':>18}{'chars/s':>14}{'change':>10}")
+    for stage, stats in results["stages"].items():
+        base = baseline.get("stages", {}).get(stage)
+        if base is None:
+            print(f"{stage:<16}{'-':>18}{stats['chars_per_second']:>14.0f}{'new':>10}")
+            continue
+        change = stats["chars_per_second"] / base["chars_per_second"] - 1
+        flag = ""
+        if change < -tolerance:
+            regressions.append(stage)
+            flag = "  << regression"
+        print(f"{stage:<16}{base['chars_per_second']:>18.0f}{stats['chars_per_second']:>14.0f}{change:>+10.1%}{flag}")
+    if baseline.get("split_count_distribution") != results["split_count_distribution"]:
+        print(">> split count distribution changed:", baseline.get("split_count_distribution"),
+              "->", results["split_count_distribution"])
+    return regressions
+
+
+if __name__ == "__main__":
+    tests_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="IndexTTS text front-end benchmark")
+    parser.add_argument("--corpus", type=str, default=os.path.join(tests_dir, "frontend_corpus.txt"))
+    parser.add_argument("--model_dir", type=str, default=None, help="Model directory with bpe.model; defaults to the tiny model")
+    parser.add_argument("--tiny_model_dir", type=str, default=os.path.join(tempfile.gettempdir(), "indextts_tiny_model"))
+    parser.add_argument("--max_text_tokens_per_sentence", type=int, default=120)
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed passes over the corpus")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed passes, the median per stage is reported")
+    parser.add_argument("--output", type=str, default=None, help="Write results as JSON")
+    parser.add_argument("--baseline", type=str, default=None, help="Compare throughput against a previous JSON result")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed relative throughput drop against the baseline")
+    args = parser.parse_args()
+
+    from omegaconf import OmegaConf
+    from indextts.utils.front import TextNormalizer, TextTokenizer
+
+    if args.model_dir is None:
+        from tiny_model import build_tiny_model
+        build_tiny_model(args.tiny_model_dir)
+        model_dir = args.tiny_model_dir
+    else:
+        model_dir = args.model_dir
+    cfg = OmegaConf.load(os.path.join(model_dir, "config.yaml"))
+    lines = load_corpus(args.corpus)
+    total_chars = sum(len(line) for line in lines)
+
+    normalizer = TextNormalizer()
+    load_start = time.perf_counter()
+    tokenizer = TextTokenizer(os.path.join(model_dir, cfg.dataset["bpe_model"]), normalizer)
+    load_seconds = time.perf_counter() - load_start
+    fst_timers = [_TimedNormalizer(normalizer.zh_normalizer), _TimedNormalizer(normalizer.en_normalizer)]
+    normalizer.zh_normalizer, normalizer.en_normalizer = fst_timers
+    zh_lines = sum(1 for line in lines if normalizer.use_chinese(line))
+
+    # 超长分句的 RuntimeWarning 不影响计时，这里不输出
+    warnings.simplefilter("ignore", RuntimeWarning)
+    for _ in range(args.warmup):
+        run_once(tokenizer, lines, args.max_text_tokens_per_sentence, fst_timers)
+    runs = [run_once(tokenizer, lines, args.max_text_tokens_per_sentence, fst_timers) for _ in range(args.repeat)]
+
+    stages = {}
+    for stage in STAGES:
+        seconds = statistics.median(run[0][stage] for run in runs)
+        stages[stage] = {"seconds": seconds, "chars_per_second": total_chars / seconds if seconds else None}
+    fst_seconds = statistics.median(run[1] for run in runs)
+    normalize_seconds = stages["normalize"]["seconds"]
+    _, _, split_counts, sentence_lengths, _ = runs[0]
+    line_seconds = [statistics.median(run[4][i] for run in runs) for i in range(len(lines))]
+    slowest = sorted(range(len(lines)), key=lambda i: line_seconds[i], reverse=True)[:5]
+    total_seconds = sum(stats["seconds"] for stats in stages.values())
+
+    results = {
+        "env": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "config": {
+            "corpus": os.path.basename(args.corpus),
+            "bpe_model": args.model_dir or "tiny",
+            "max_text_tokens_per_sentence": args.max_text_tokens_per_sentence,
+            "warmup": args.warmup,
+            "repeat": args.repeat,
+        },
+        "corpus": {"lines": len(lines), "chars": total_chars, "zh_lines": zh_lines, "en_lines": len(lines) - zh_lines},
+        "load_seconds": load_seconds,
+        "total_chars_per_second": total_chars / total_seconds if total_seconds else None,
+        "stages": stages,
+        "normalize_breakdown": {
+            "fst_seconds": fst_seconds,
+            "regex_seconds": normalize_seconds - fst_seconds,
+            "fst_share": fst_seconds / normalize_seconds if normalize_seconds else None,
+        },
+        # 每行分句数 -> 行数
+        "split_count_distribution": {str(k): v for k, v in sorted(Counter(split_counts).items())},
+        "sentence_tokens": {
+            "min": min(sentence_lengths),
+            "median": statistics.median(sentence_lengths),
+            "max": max(sentence_lengths),
+        },
+        "slowest_lines": [{"line": lines[i][:40], "chars": len(lines[i]), "normalize_seconds": line_seconds[i]} for i in slowest],
+    }
+
+    for stage, stats in stages.items():
+        print(f">> {stage:<13} {stats['seconds'] * 1000:8.1f} ms  {stats['chars_per_second']:10.0f} chars/s")
+    breakdown = results["normalize_breakdown"]
+    print(f">> normalize: FST {breakdown['fst_share']:.1%}, regex and other {1 - breakdown['fst_share']:.1%}")
+    print(">> split count distribution:", results["split_count_distribution"])
+
+    if args.output:
+        if os.path.dirname(args.output) != "":
+            os.makedirs(os.path.dirname(args.output), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(">> results saved to:", args.output)
+    else:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(results, baseline, args.tolerance)
+        if regressions:
+            print(f">> {len(regressions)} stage(s) slower than baseline by more than {args.tolerance:.0%}:", ", ".join(regressions))
+            sys.exit(1)
+        print(">> no regression against baseline")
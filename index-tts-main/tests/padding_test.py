@@ -1,7 +1,7 @@
 import torch
 import torchaudio
 from indextts.infer import IndexTTS
-from indextts.utils.feature_extractors import MelSpectrogramFeatures
+from indextts.utils.feature_extractors import get_mel_extractor, get_resampler
 from torch.nn import functional as F
 
 if __name__ == "__main__":
@@ -28,8 +28,8 @@ if __name__ == "__main__":
 
     audio, sr = torchaudio.load(audio_prompt)
     audio = torch.mean(audio, dim=0, keepdim=True)
-    audio = torchaudio.transforms.Resample(sr, 24000)(audio)
-    auto_conditioning = MelSpectrogramFeatures()(audio).to(tts.device)
+    audio = get_resampler(sr, 24000)(audio)
+    auto_conditioning = get_mel_extractor()(audio).to(tts.device)
     cond_mel_lengths = torch.tensor([auto_conditioning.shape[-1]]).to(tts.device)
     with torch.no_grad():
         kwargs = {
@@ -0,0 +1,254 @@
+"""
+RTF 基准测试：用随机权重的微型模型（见 ``tests/tiny_model.py``）或正式模型，
+在不同文本长度和分桶大小下测量 ``infer`` / ``infer_fast`` / ``CPUSynthesisPool`` 的耗时，
+输出 JSON（RTF、mel tokens/s、各阶段耗时、各用例采样得到的峰值 RSS），并可与之前保存的基线比较。
+```
+python tests/rtf_benchmark.py --output outputs/bench.json
+python tests/rtf_benchmark.py --baseline outputs/bench.json --tolerance 0.15
+python tests/rtf_benchmark.py --model_dir checkpoints --device cuda --lengths short,long --buckets 1,4,8
+```
+与基线比较时，任一用例的 RTF 变慢超过 ``tolerance`` 则以退出码 1 结束，可直接用于 CI。
+注意：``infer_fast`` 在 ``device="cpu"`` 时固定不分桶，需用 ``--device cpu:0`` 才能测到不同分桶大小的效果。
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 每种长度的分句数，分句取自下面的文本循环拼接
+TEXT_LENGTHS = {"short": 1, "medium": 4, "long": 12}
+SENTENCES = [
+    "大家好，今天天气很好。",
+    "HELLO WORLD, THIS IS A TEST OF THE TINY MODEL.",
+    "我们一起勇敢前行，迈向更加美好的明天！",
+    "THE WEATHER IS REALLY NICE TODAY. THANK YOU!",
+]
+
+
+def make_text(num_sentences: int) -> str:
+    return "".join(SENTENCES[i % len(SENTENCES)] for i in range(num_sentences))
+
+
+def peak_rss_mb(children=False):
+    """
+    进程（或已结束子进程）整个生命周期的峰值常驻内存，单位 MB；不支持的平台返回 None。
+    只能作为整次运行的峰值，各用例的峰值见 ``run_case``（``MemoryMonitor`` 采样）。
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # Linux 上 ru_maxrss 单位为 KB，macOS 上为字节
+    scale = 1 if sys.platform == "darwin" else 1024
+    return usage.ru_maxrss * scale / 1024 / 1024
+
+
+def run_case(tts, mode, text, args, output_path, bucket_size=None):
+    kwargs = dict(audio_prompt=args.voice, text=text, output_path=output_path, seed=args.seed,
+                  max_text_tokens_per_sentence=args.max_text_tokens_per_sentence, max_mel_tokens=args.max_mel_tokens,
+                  num_beams=args.num_beams, return_profile=True)
+    if mode == "infer_fast":
+        kwargs["sentences_bucket_max_size"] = bucket_size
+    # 预热：CPU 上每个新的输入长度首次经过 BigVGAN 时都有一次性的卷积初始化开销，可达正常耗时的数十倍
+    for _ in range(args.warmup):
+        getattr(tts, mode)(**kwargs)
+    walls, profiles = [], []
+    for _ in range(args.repeat):
+        start_time = time.perf_counter()
+        _, profile = getattr(tts, mode)(**kwargs)
+        walls.append(time.perf_counter() - start_time)
+        profiles.append(profile)
+    wall = statistics.median(walls)
+    # 各阶段耗时取中位数对应的那一次
+    profile = profiles[walls.index(wall)] if wall in walls else profiles[0]
+    audio_seconds = profile.meta["audio_seconds"]
+    gen_seconds = profile.totals().get("generate", 0.0)
+    mel_tokens = profile.sum_attr("generate", "mel_tokens")
+    return {
+        "mode": mode,
+        "bucket_size": bucket_size,
+        "sentences": profile.meta.get("sentences"),
+        "text_tokens": profile.meta.get("text_tokens"),
+        "batches": profile.counts().get("generate", 0),
+        "mel_tokens": mel_tokens,
+        "audio_seconds": audio_seconds,
+        "wall_seconds": wall,
+        "wall_seconds_all": walls,
+        "rtf": wall / audio_seconds if audio_seconds else None,
+        "mel_tokens_per_second": mel_tokens / gen_seconds if gen_seconds else None,
+        "stages": {name: seconds for name, seconds in profile.totals().items() if name != profile.name},
+        # 本用例计时运行期间采样得到的 RSS 峰值（见 ``IndexTTS.enable_memory_profiling``）
+        "peak_rss_mb": max((p.meta["peak_rss_mb"] for p in profiles if "peak_rss_mb" in p.meta), default=None),
+    }
+
+
+def run_pool_case(pool, text, args, output_dir, num_items):
+    """多进程吞吐：同一文本提交 ``num_items`` 份，RTF 按总耗时 / 总音频时长计算"""
+    import torchaudio
+    jobs = [dict(audio_prompt=args.voice, text=text, output_path=os.path.join(output_dir, f"pool_{i}.wav"),
+                 seed=args.seed, max_text_tokens_per_sentence=args.max_text_tokens_per_sentence,
+                 max_mel_tokens=args.max_mel_tokens, num_beams=args.num_beams)
+            for i in range(num_items)]
+    for _ in range(args.warmup):
+        pool.map(jobs)
+    start_time = time.perf_counter()
+    results = pool.map(jobs)
+    wall = time.perf_counter() - start_time
+    audio_seconds = 0.0
+    for output_path, _ in results:
+        info = torchaudio.info(output_path)
+        audio_seconds += info.num_frames / info.sample_rate
+    return {
+        "mode": "pool",
+        "workers": pool.num_workers,
+        "threads_per_worker": pool.threads_per_worker,
+        "items": num_items,
+        "audio_seconds": audio_seconds,
+        "wall_seconds": wall,
+        "rtf": wall / audio_seconds if audio_seconds else None,
+    }
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """逐个用例比较 RTF，返回变慢超过 ``tolerance`` 的用例名"""
+    base_cases = baseline.get("cases", {})
+    regressions = []
+    print(f"{'case':<28}{'baseline RTF':>14}{'RTF':>10}{'change':>10}")
+    for name, case in results["cases"].items():
+        base = base_cases.get(name)
+        if base is None or not base.get("rtf") or not case.get("rtf"):
+            print(f"{name:<28}{'-':>14}{case.get('rtf') or 0:>10.4f}{'new':>10}")
+            continue
+        change = case["rtf"] / base["rtf"] - 1
+        flag = ""
+        if change > tolerance:
+            regressions.append(name)
+            flag = "  << regression"
+        print(f"{name:<28}{base['rtf']:>14.4f}{case['rtf']:>10.4f}{change:>+10.1%}{flag}")
+    for name in base_cases:
+        if name not in results["cases"]:
+            print(f"{name:<28}{base_cases[name].get('rtf') or 0:>14.4f}{'-':>10}{'missing':>10}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="IndexTTS RTF benchmark")
+    parser.add_argument("--model_dir", type=str, default=None,
+                        help="Model directory with config.yaml; defaults to a random-weight tiny model")
+    parser.add_argument("--tiny_model_dir", type=str, default=os.path.join(tempfile.gettempdir(), "indextts_tiny_model"),
+                        help="Where the tiny model is built and cached")
+    parser.add_argument("--voice", type=str, default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_prompt.wav"))
+    parser.add_argument("--device", type=str, default="cpu")
+    parser.add_argument("--fp16", action="store_true", default=False)
+    parser.add_argument("--modes", type=str, default="infer,infer_fast", help="Comma separated: infer, infer_fast, pool")
+    parser.add_argument("--lengths", type=str, default=",".join(TEXT_LENGTHS), help="Comma separated: " + ", ".join(TEXT_LENGTHS))
+    parser.add_argument("--buckets", type=str, default="1,2,4", help="infer_fast sentences_bucket_max_size values")
+    parser.add_argument("--max_text_tokens_per_sentence", type=int, default=30,
+                        help="Small enough that every sample sentence becomes its own segment")
+    parser.add_argument("--max_mel_tokens", type=int, default=50)
+    parser.add_argument("--num_beams", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed runs per case before timing")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per case, the median is reported")
+    parser.add_argument("--pool_workers", type=int, default=2)
+    parser.add_argument("--pool_items", type=int, default=4)
+    parser.add_argument("--output", type=str, default=None, help="Write results as JSON")
+    parser.add_argument("--baseline", type=str, default=None, help="Compare RTF against a previous JSON result")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed relative RTF slowdown against the baseline")
+    args = parser.parse_args()
+
+    import torch
+    from indextts.infer import IndexTTS
+
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    lengths = [l.strip() for l in args.lengths.split(",") if l.strip()]
+    buckets = [int(b) for b in args.buckets.split(",") if b.strip()]
+    if args.model_dir is None:
+        from tiny_model import build_tiny_model
+        build_tiny_model(args.tiny_model_dir)
+        model_dir = args.tiny_model_dir
+    else:
+        model_dir = args.model_dir
+    cfg_path = os.path.join(model_dir, "config.yaml")
+    output_dir = tempfile.mkdtemp(prefix="indextts_bench_")
+
+    results = {
+        "env": {
+            "python": platform.python_version(),
+            "torch": torch.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "torch_threads": torch.get_num_threads(),
+            "device": args.device,
+            "fp16": args.fp16,
+        },
+        "config": {
+            "model_dir": args.model_dir or "tiny",
+            "max_text_tokens_per_sentence": args.max_text_tokens_per_sentence,
+            "max_mel_tokens": args.max_mel_tokens,
+            "num_beams": args.num_beams,
+            "seed": args.seed,
+            "warmup": args.warmup,
+            "repeat": args.repeat,
+        },
+        "cases": {},
+    }
+
+    # CPUSynthesisPool 需要在主进程做任何推理之前 fork，所以最先测
+    if "pool" in modes:
+        from indextts.parallel import CPUSynthesisPool
+        with CPUSynthesisPool(cfg_path, model_dir, num_workers=args.pool_workers) as pool:
+            for length in lengths:
+                name = f"pool/{length}/w{args.pool_workers}"
+                results["cases"][name] = run_pool_case(pool, make_text(TEXT_LENGTHS[length]), args, output_dir, args.pool_items)
+                print(f">> {name}: RTF {results['cases'][name]['rtf']:.4f}")
+        # 工作进程退出后才计入 RUSAGE_CHILDREN，只能给出所有 pool 用例的整体峰值
+        results["pool_peak_rss_mb"] = peak_rss_mb(children=True)
+
+    if "infer" in modes or "infer_fast" in modes:
+        load_start = time.perf_counter()
+        tts = IndexTTS(cfg_path=cfg_path, model_dir=model_dir, is_fp16=args.fp16, device=args.device, use_cuda_kernel=False)
+        results["load_seconds"] = time.perf_counter() - load_start
+        # 逐个用例记录峰值 RSS；ru_maxrss 是整个进程的峰值，不能区分用例
+        tts.enable_memory_profiling(interval=0.01)
+        if args.device == "cpu" and "infer_fast" in modes and len(buckets) > 1:
+            print(">> infer_fast ignores sentences_bucket_max_size on device 'cpu', use --device cpu:0 to benchmark bucketing.")
+        for length in lengths:
+            text = make_text(TEXT_LENGTHS[length])
+            cases = []
+            if "infer" in modes:
+                cases.append(("infer", None, f"infer/{length}"))
+            if "infer_fast" in modes:
+                cases.extend(("infer_fast", bucket, f"infer_fast/{length}/b{bucket}") for bucket in buckets)
+            for mode, bucket, name in cases:
+                output_path = os.path.join(output_dir, name.replace("/", "_") + ".wav")
+                results["cases"][name] = run_case(tts, mode, text, args, output_path, bucket_size=bucket)
+                case = results["cases"][name]
+                print(f">> {name}: RTF {case['rtf']:.4f}, {case['mel_tokens_per_second']:.1f} mel tokens/s, "
+                      f"{case['batches']} batches, peak RSS {case['peak_rss_mb'] or 0:.0f} MB")
+
+    results["process_peak_rss_mb"] = peak_rss_mb()
+    if args.output:
+        if os.path.dirname(args.output) != "":
+            os.makedirs(os.path.dirname(args.output), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(">> results saved to:", args.output)
+    else:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(results, baseline, args.tolerance)
+        if regressions:
+            print(f">> {len(regressions)} case(s) slower than baseline by more than {args.tolerance:.0%}:", ", ".join(regressions))
+            sys.exit(1)
+        print(">> no regression against baseline")
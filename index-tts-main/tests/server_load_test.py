@@ -0,0 +1,183 @@
+"""
+HTTP 服务压测：以固定并发向 ``indextts.server`` 发送合成请求，统计延迟 p50 / p99 和吞吐（请求/秒、音频秒/秒），
+流式请求另统计首包（第一段音频）延迟。
+```
+python -m indextts.server --model_dir checkpoints --voice tests/sample_prompt.wav &
+python tests/server_load_test.py --concurrency 8 --requests 64
+python tests/server_load_test.py --concurrency 4 --requests 16 --stream --output outputs/server_load.json
+```
+服务端的合并统计（批次数、最大批大小）取自 ``GET /health``，压测前后的差值即本次压测的合并情况。
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rtf_benchmark import SENTENCES
+
+SAMPLING_RATE = 24000
+WAV_HEADER_SIZE = 44
+
+
+def percentile(values, q):
+    """最近秩百分位数"""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    rank = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+async def _read_response(reader):
+    """读取响应，返回 ``(status, headers, body, first_data_time)``；chunked 响应的第一段数据为 WAV 头，首包取第二段"""
+    status_line = await reader.readline()
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    first_data_time = None
+    if headers.get("transfer-encoding") == "chunked":
+        chunks = []
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            if size == 0:
+                await reader.readline()
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+            if len(chunks) == 2:
+                first_data_time = time.perf_counter()
+        body = b"".join(chunks)
+    else:
+        body = await reader.readexactly(int(headers.get("content-length", 0)))
+        first_data_time = time.perf_counter()
+    return status, headers, body, first_data_time
+
+
+async def request(host, port, method, path, payload=None):
+    reader, writer = await asyncio.open_connection(host, port)
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8") if payload is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: {host}:{port}\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body)
+    await writer.drain()
+    try:
+        return await _read_response(reader)
+    finally:
+        writer.close()
+
+
+async def run_load(args):
+    queue = asyncio.Queue()
+    for i in range(args.requests):
+        queue.put_nowait(i)
+    records = []
+
+    async def worker():
+        while True:
+            try:
+                i = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            text = "".join(SENTENCES[(i + k) % len(SENTENCES)] for k in range(args.sentences))
+            payload = dict(text=text, stream=args.stream, max_mel_tokens=args.max_mel_tokens,
+                           max_text_tokens_per_sentence=args.max_text_tokens_per_sentence)
+            if args.voice:
+                payload["voice"] = args.voice
+            if args.seed is not None:
+                payload["seed"] = args.seed + i
+            start_time = time.perf_counter()
+            try:
+                status, _, body, first_data_time = await request(args.host, args.port, "POST", "/tts", payload)
+            except (ConnectionError, asyncio.IncompleteReadError, ValueError) as e:
+                records.append(dict(ok=False, error=f"{type(e).__name__}: {e}"))
+                continue
+            end_time = time.perf_counter()
+            record = dict(ok=status == 200, status=status, latency=end_time - start_time,
+                          audio_seconds=max(0, len(body) - WAV_HEADER_SIZE) / 2 / SAMPLING_RATE)
+            if first_data_time is not None:
+                record["first_audio_latency"] = first_data_time - start_time
+            if status != 200:
+                record["error"] = body[:200].decode("utf-8", "replace")
+            records.append(record)
+
+    health_before = (await request(args.host, args.port, "GET", "/health"))[2]
+    start_time = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(args.concurrency)])
+    wall = time.perf_counter() - start_time
+    health_after = (await request(args.host, args.port, "GET", "/health"))[2]
+    return records, wall, json.loads(health_before), json.loads(health_after)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="IndexTTS HTTP server load test")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8300)
+    parser.add_argument("--concurrency", type=int, default=8, help="Number of concurrent clients")
+    parser.add_argument("--requests", type=int, default=32, help="Total number of requests")
+    parser.add_argument("--sentences", type=int, default=1, help="Sentences per request text")
+    parser.add_argument("--voice", type=str, default=None, help="Audio prompt path on the server; defaults to the server's --voice")
+    parser.add_argument("--seed", type=int, default=None, help="Request i uses seed + i; default is not fixed")
+    parser.add_argument("--stream", action="store_true", default=False, help="Use streaming responses and report first-audio latency")
+    parser.add_argument("--max_mel_tokens", type=int, default=600)
+    parser.add_argument("--max_text_tokens_per_sentence", type=int, default=100)
+    parser.add_argument("--output", type=str, default=None, help="Write results as JSON")
+    args = parser.parse_args()
+
+    records, wall, health_before, health_after = asyncio.run(run_load(args))
+    ok = [r for r in records if r["ok"]]
+    latencies = [r["latency"] for r in ok]
+    audio_seconds = sum(r["audio_seconds"] for r in ok)
+    batching_before, batching_after = health_before["batching"], health_after["batching"]
+    batches = batching_after["batches"] - batching_before["batches"]
+    results = {
+        "config": {k: getattr(args, k) for k in ("concurrency", "requests", "sentences", "stream", "seed", "max_mel_tokens")},
+        "succeeded": len(ok),
+        "failed": len(records) - len(ok),
+        "wall_seconds": wall,
+        "requests_per_second": len(ok) / wall if wall else None,
+        "audio_seconds_per_second": audio_seconds / wall if wall else None,
+        "latency": {
+            "p50": percentile(latencies, 50),
+            "p99": percentile(latencies, 99),
+            "mean": statistics.mean(latencies) if latencies else None,
+            "max": max(latencies) if latencies else None,
+        },
+        "batching": {
+            "batches": batches,
+            "mean_batch_size": (batching_after["requests"] - batching_before["requests"]) / batches if batches else None,
+            "max_batch_size": batching_after["max_batch_size"],
+        },
+        "errors": sorted({r["error"] for r in records if not r["ok"]})[:5],
+    }
+    if args.stream:
+        first = [r["first_audio_latency"] for r in ok if "first_audio_latency" in r]
+        results["first_audio_latency"] = {"p50": percentile(first, 50), "p99": percentile(first, 99)}
+
+    print(f">> {len(ok)}/{len(records)} requests succeeded in {wall:.2f} seconds, "
+          f"{results['requests_per_second']:.2f} req/s, {results['audio_seconds_per_second']:.2f} audio seconds/s")
+    if latencies:
+        print(f">> latency p50: {results['latency']['p50']:.3f}s p99: {results['latency']['p99']:.3f}s")
+    if args.stream and results["first_audio_latency"]["p50"] is not None:
+        print(f">> first audio p50: {results['first_audio_latency']['p50']:.3f}s "
+              f"p99: {results['first_audio_latency']['p99']:.3f}s")
+    if not args.stream and batches:
+        print(f">> merged into {batches} batches, mean size {results['batching']['mean_batch_size']:.2f}")
+    if args.output:
+        if os.path.dirname(args.output) != "":
+            os.makedirs(os.path.dirname(args.output), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(">> results saved to:", args.output)
+    else:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    if records and not ok:
+        sys.exit(1)
@@ -0,0 +1,111 @@
+"""
+构建随机权重的微型 IndexTTS 模型（缩小的 UnifiedVoice + BigVGAN 配置和合成语料训练的 bpe 模型），
+不需要下载正式权重即可在 CPU 上跑通完整推理流程，用于基准测试和回归测试。
+合成的音频没有意义，生成长度总是达到 ``max_mel_tokens``（随机模型不会输出停止符）。
+```
+python tests/tiny_model.py outputs/tiny_model
+```
+"""
+import os
+import sys
+
+TINY_CONFIG = """\
+dataset:
+  bpe_model: bpe.model
+gpt:
+  model_dim: 64
+  max_mel_tokens: 200
+  max_text_tokens: 120
+  heads: 4
+  use_mel_codes_as_input: true
+  mel_length_compression: 1024
+  layers: 2
+  number_text_tokens: 400
+  number_mel_codes: 8194
+  start_mel_token: 8192
+  stop_mel_token: 8193
+  start_text_token: 0
+  stop_text_token: 1
+  train_solo_embeddings: false
+  condition_type: conformer_perceiver
+  condition_module:
+    output_size: 64
+    linear_units: 128
+    attention_heads: 4
+    num_blocks: 1
+    input_layer: conv2d2
+    perceiver_mult: 2
+bigvgan:
+  resblock: "1"
+  upsample_rates: [4, 4, 4, 4, 2, 2]
+  upsample_kernel_sizes: [8, 8, 4, 4, 4, 4]
+  upsample_initial_channel: 128
+  resblock_kernel_sizes: [3]
+  resblock_dilation_sizes: [[1, 3, 5]]
+  feat_upsample: false
+  speaker_embedding_dim: 64
+  cond_d_vector_in_each_upsampling_layer: true
+  gpt_dim: 64
+  activation: snakebeta
+  snake_logscale: true
+  num_mels: 100
+gpt_checkpoint: gpt.pth
+bigvgan_checkpoint: bigvgan_generator.pth
+version: 1.5
+"""
+
+# bpe 训练语料：覆盖英文大写单词、常用汉字、数字和标点
+CORPUS_LINES = [
+    "HELLO WORLD THIS IS A TEST , OF THE TINY MODEL .",
+    "THE WEATHER IS REALLY NICE TODAY ! THANK YOU .",
+    "你 好 世 界 这 是 一 个 测 试 ， 今 天 天 气 很 好 。",
+    "大 家 好 我 们 一 起 勇 敢 前 行 ！ 迈 向 更 加 美 好 的 明 天 ？",
+]
+
+
+def build_tiny_model(model_dir: str, seed: int = 0, overwrite: bool = False) -> str:
+    """
+    在 ``model_dir`` 下生成 ``config.yaml``、``gpt.pth``、``bigvgan_generator.pth`` 和 ``bpe.model``，
+    已存在时直接复用（``overwrite`` 为 True 时重新生成）。
+
+    Returns:
+        ``config.yaml`` 的路径
+    """
+    import sentencepiece as spm
+    import torch
+    from omegaconf import OmegaConf
+
+    from indextts.BigVGAN.models import BigVGAN
+    from indextts.gpt.model import UnifiedVoice
+
+    cfg_path = os.path.join(model_dir, "config.yaml")
+    files = ["config.yaml", "gpt.pth", "bigvgan_generator.pth", "bpe.model"]
+    if not overwrite and all(os.path.exists(os.path.join(model_dir, name)) for name in files):
+        return cfg_path
+    os.makedirs(model_dir, exist_ok=True)
+    with open(cfg_path, "w", encoding="utf-8") as f:
+        f.write(TINY_CONFIG)
+    cfg = OmegaConf.load(cfg_path)
+
+    torch.manual_seed(seed)
+    gpt = UnifiedVoice(**cfg.gpt)
+    torch.save(gpt.state_dict(), os.path.join(model_dir, cfg.gpt_checkpoint))
+    bigvgan = BigVGAN(cfg.bigvgan)
+    torch.save({"generator": bigvgan.state_dict()}, os.path.join(model_dir, cfg.bigvgan_checkpoint))
+
+    corpus_path = os.path.join(model_dir, "corpus.txt")
+    with open(corpus_path, "w", encoding="utf-8") as f:
+        for i in range(100):
+            for line in CORPUS_LINES:
+                f.write(f"{line} {i}\n")
+    spm.SentencePieceTrainer.train(input=corpus_path, model_prefix=os.path.join(model_dir, "bpe"), vocab_size=160,
+                                   character_coverage=1.0, model_type="bpe", bos_id=0, eos_id=1, unk_id=2, pad_id=-1,
+                                   user_defined_symbols=[",", ".", "!", "?", "'", "-"], minloglevel=2)
+    os.remove(corpus_path)
+    print(f">> tiny model saved to {model_dir}")
+    return cfg_path
+
+
+if __name__ == "__main__":
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    build_tiny_model(sys.argv[1] if len(sys.argv) > 1 else "outputs/tiny_model", overwrite=True)
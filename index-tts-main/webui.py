@@ -1,8 +1,8 @@
 import json
 import os
 import sys
-import threading
 import time
+import uuid
 
 import warnings
 warnings.filterwarnings("ignore", category=FutureWarning)
@@ -18,6 +18,8 @@ parser.add_argument("--verbose", action="store_true", default=False, help="Enabl
 parser.add_argument("--port", type=int, default=7860, help="Port to run the web UI on")
 parser.add_argument("--host", type=str, default="127.0.0.1", help="Host to run the web UI on")
 parser.add_argument("--model_dir", type=str, default="checkpoints", help="Model checkpoints directory")
+parser.add_argument("--max_batch_size", type=int, default=4, help="Maximum number of concurrent requests merged into one batch")
+parser.add_argument("--batch_window_ms", type=float, default=50, help="How long the first request of a batch waits for others")
 cmd_args = parser.parse_args()
 
 if not os.path.exists(cmd_args.model_dir):
@@ -37,12 +39,17 @@ for file in [
 
 import gradio as gr
 
+from indextts.batching import BatchingQueue
+from indextts.engine import PRIORITY_INTERACTIVE, SynthesisEngine
 from indextts.infer import IndexTTS
 from tools.i18n.i18n import I18nAuto
 
 i18n = I18nAuto(language="zh_CN")
 MODE = 'local'
 tts = IndexTTS(model_dir=cmd_args.model_dir, cfg_path=os.path.join(cmd_args.model_dir, "config.yaml"),)
+# 所有请求由引擎线程独占模型执行；批次推理的并发请求先经合并队列，同音色、同参数的请求合成一批
+engine = SynthesisEngine(tts=tts)
+batching = BatchingQueue(engine, max_batch_size=cmd_args.max_batch_size, max_wait=cmd_args.batch_window_ms / 1000)
 
 
 os.makedirs("outputs/tasks",exist_ok=True)
@@ -62,9 +69,8 @@ def gen_single(prompt, text, infer_mode, max_text_tokens_per_sentence=120, sente
                 *args, progress=gr.Progress()):
     output_path = None
     if not output_path:
-        output_path = os.path.join("outputs", f"spk_{int(time.time())}.wav")
-    # set gradio progress
-    tts.gr_progress = progress
+        # 并发请求可能在同一秒内到达
+        output_path = os.path.join("outputs", f"spk_{int(time.time())}_{uuid.uuid4().hex[:8]}.wav")
     do_sample, top_p, top_k, temperature, \
         length_penalty, num_beams, repetition_penalty, max_mel_tokens = args
     kwargs = {
@@ -79,24 +85,28 @@ def gen_single(prompt, text, infer_mode, max_text_tokens_per_sentence=120, sente
         # "typical_sampling": bool(typical_sampling),
         # "typical_mass": float(typical_mass),
     }
+    # 进度只发给本次请求的 progress，不再共用 tts.gr_progress
+    # 直接返回内存中的音频，outputs 下的文件在后台写入
     if infer_mode == "普通推理":
-        output = tts.infer(prompt, text, output_path, verbose=cmd_args.verbose,
-                           max_text_tokens_per_sentence=int(max_text_tokens_per_sentence),
-                           **kwargs)
+        future = engine.submit(prompt, text, output_path, priority=PRIORITY_INTERACTIVE, progress=progress,
+                               verbose=cmd_args.verbose, return_result=True,
+                               max_text_tokens_per_sentence=int(max_text_tokens_per_sentence),
+                               **kwargs)
     else:
         # 批次推理
-        output = tts.infer_fast(prompt, text, output_path, verbose=cmd_args.verbose,
+        future = batching.submit(prompt, text, output_path, progress=progress, verbose=cmd_args.verbose,
+            return_result=True,
             max_text_tokens_per_sentence=int(max_text_tokens_per_sentence),
-            sentences_bucket_max_size=(sentences_bucket_max_size),
+            sentences_bucket_max_size=int(sentences_bucket_max_size),
             **kwargs)
-    return gr.update(value=output,visible=True)
+    result = future.result()
+    return gr.update(value=result.to_gradio(),visible=True)
 
 def update_prompt_audio():
     update_button = gr.update(interactive=True)
     return update_button
 
 with gr.Blocks(title="IndexTTS Demo") as demo:
-    mutex = threading.Lock()
     gr.HTML('''
     <h2><center>IndexTTS: An Industrial-Level Controllable and Efficient Zero-Shot Text-To-Speech System</h2>
     <h2><center>(一款工业级可控且高效的零样本文本转语音系统)</h2>
@@ -204,7 +214,9 @@ with gr.Blocks(title="IndexTTS Demo") as demo:
                              max_text_tokens_per_sentence, sentences_bucket_max_size,
                              *advanced_params,
                      ],
-                     outputs=[output_audio])
+                     outputs=[output_audio],
+                     # 允许多个请求同时等待，批次推理的请求才能合并
+                     concurrency_limit=cmd_args.max_batch_size)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,152 @@
+import hashlib
+import json
+import os
+import threading
+import uuid
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+# 任务日志文件名，放在剪映工程目录下，与 textReading 文件夹同级
+JOB_JOURNAL_NAME = "tts_job_journal.jsonl"
+# 日志中保留的最近任务数，超出时在新建任务前压缩
+JOB_JOURNAL_MAX_JOBS = 20
+
+
+def item_content_hash(item: Dict[str, Any]) -> str:
+    """计算文本条目的内容哈希：文本、参考音频（路径、大小、修改时间）、推理模式和参数都相同时才视为同一结果"""
+    reference_voice = item.get('reference_voice', '')
+    try:
+        stat = os.stat(reference_voice)
+        reference_info = [os.path.abspath(reference_voice), stat.st_size, int(stat.st_mtime)]
+    except OSError:
+        reference_info = [reference_voice]
+    payload = {
+        'text_content': item.get('text_content', ''),
+        'reference_voice': reference_info,
+        'infer_mode': item.get('infer_mode', '普通推理'),
+        'tts_params': item.get('tts_params', {}),
+    }
+    data = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+class JobJournal:
+    """
+    TTS 批量转换任务日志（JSONL，只追加）。
+    每行一条记录：
+        {"type": "job", "job_id", "created", "text_ids"}             新建任务
+        {"type": "item", "job_id", "text_id", "content_hash", "output_path"}  条目转换完成
+        {"type": "done", "job_id"}                                    任务全部完成
+    程序崩溃或被关闭后，可根据日志跳过已完成的条目继续转换。
+    """
+
+    def __init__(self, journal_path: str):
+        self.journal_path = journal_path
+        self._lock = threading.Lock()
+
+    def _append(self, record: Dict[str, Any]):
+        directory = os.path.dirname(self.journal_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.journal_path, 'ab+') as f:
+                # 上次崩溃时可能留下写了一半的行，先换行避免与新记录粘连
+                if f.seek(0, os.SEEK_END) > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        line = "\n" + line
+                f.write(line.encode('utf-8'))
+                f.flush()
+                os.fsync(f.fileno())
+
+    def load_records(self) -> List[Dict[str, Any]]:
+        """读取全部记录，忽略崩溃时写了一半的行"""
+        records = []
+        if not os.path.exists(self.journal_path):
+            return records
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        records.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+        except Exception as e:
+            print(f"读取任务日志失败: {e}")
+        return records
+
+    def start_job(self, text_items: List[Dict[str, Any]]) -> str:
+        """新建任务，返回任务ID"""
+        self.compact()
+        job_id = str(uuid.uuid4())
+        self._append({
+            'type': 'job',
+            'job_id': job_id,
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'text_ids': [item['text_id'] for item in text_items],
+        })
+        return job_id
+
+    def record_item(self, job_id: str, text_id: str, content_hash: str, output_path: str):
+        """记录一个已完成的条目"""
+        self._append({
+            'type': 'item',
+            'job_id': job_id,
+            'text_id': text_id,
+            'content_hash': content_hash,
+            'output_path': output_path,
+        })
+
+    def finish_job(self, job_id: str):
+        """标记任务全部完成"""
+        self._append({'type': 'done', 'job_id': job_id})
+
+    def completed_items(self, job_id: str) -> Dict[str, Dict[str, Any]]:
+        """返回任务中已完成的条目: text_id -> 最后一次完成记录"""
+        completed = {}
+        for record in self.load_records():
+            if record.get('type') == 'item' and record.get('job_id') == job_id:
+                completed[record['text_id']] = record
+        return completed
+
+    def last_unfinished_job(self) -> Optional[Dict[str, Any]]:
+        """返回最近一个未完成的任务记录（附带 completed 条目），没有则返回 None"""
+        jobs = {}
+        order = []
+        finished = set()
+        for record in self.load_records():
+            record_type = record.get('type')
+            job_id = record.get('job_id')
+            if record_type == 'job':
+                jobs[job_id] = dict(record, completed={})
+                order.append(job_id)
+            elif record_type == 'item' and job_id in jobs:
+                jobs[job_id]['completed'][record['text_id']] = record
+            elif record_type == 'done':
+                finished.add(job_id)
+        for job_id in reversed(order):
+            if job_id not in finished:
+                return jobs[job_id]
+        return None
+
+    def compact(self):
+        """只保留最近 JOB_JOURNAL_MAX_JOBS 个任务的记录"""
+        records = self.load_records()
+        job_ids = [r.get('job_id') for r in records if r.get('type') == 'job']
+        if len(job_ids) < JOB_JOURNAL_MAX_JOBS:
+            return
+        keep = set(job_ids[-(JOB_JOURNAL_MAX_JOBS - 1):])
+        tmp_path = self.journal_path + ".tmp"
+        try:
+            with self._lock:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    for record in records:
+                        if record.get('job_id') in keep:
+                            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                os.replace(tmp_path, self.journal_path)
+        except Exception as e:
+            print(f"压缩任务日志失败: {e}")
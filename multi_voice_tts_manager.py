@@ -4,6 +4,7 @@ import uuid
 import time
 import threading
 import subprocess
+from concurrent.futures import CancelledError
 from datetime import datetime, timedelta
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, 
                              QTableWidgetItem, QHeaderView, QCheckBox,
@@ -25,7 +26,7 @@ from text_editor import SmartTextAddDialog, MultiLineTextEditDialog
 # 导入TTS相关组件
 from tts_manager import (MultiLineTextEdit, ParameterSpinBox, ParameterIntSpinBox, 
                         ParameterCheckBox, AudioPreviewWidget, AudioTreeDialog, 
-                        BatchParameterDialog)
+                        BatchParameterDialog, get_synthesis_engine, tts_generation_kwargs, format_profile)
 
 try:
     from pygame_audio_player import get_audio_player
@@ -33,17 +34,23 @@ try:
 except ImportError:
     PYGAME_PLAYER_AVAILABLE = False
 
+# 合成当前条目时提前处理文本的后续条目数
+TEXT_PREFETCH_DEPTH = 3
+
 class MultiVoiceTTSWorker(QThread):
     """多人语音合成TTS转换工作线程"""
     progress_updated = pyqtSignal(int, str)  # 进度, 状态信息
     conversion_finished = pyqtSignal(str, str, bool, float)  # text_id, output_path, success, duration
     error_occurred = pyqtSignal(str, str)  # text_id, error_message
+    profile_ready = pyqtSignal(str, dict)  # text_id, SynthesisProfile.to_dict()
     
     def __init__(self, text_items, project_name=""):
         super().__init__()
         self.text_items = text_items
         self.project_name = project_name
         self.is_cancelled = False
+        self.engine = None
+        self.current_future = None
         
     def run(self):
         """执行TTS转换"""
@@ -70,7 +77,8 @@ class MultiVoiceTTSWorker(QThread):
                 if index_tts_path not in sys.path:
                     sys.path.insert(0, index_tts_path)
                 
-                from indextts.infer import IndexTTS
+                from indextts.engine import PRIORITY_BATCH
+                from indextts.utils.cancellation import SynthesisCancelled
             except ImportError as e:
                 self.progress_updated.emit(0, f"TTS模块导入失败: {str(e)}\n请确保已安装必要的依赖库，如torchaudio等")
                 # 发出所有文本转换失败的信号
@@ -86,13 +94,11 @@ class MultiVoiceTTSWorker(QThread):
                     self.conversion_finished.emit(item['text_id'], "", False, 0.0)
                 return
             
-            # 初始化TTS模型
+            # 初始化TTS模型（常驻引擎只在第一次转换时加载）
             self.progress_updated.emit(0, "正在初始化TTS模型...")
             try:
-                tts = IndexTTS(
-                    model_dir="checkpoints",
-                    cfg_path="checkpoints/config.yaml"
-                )
+                self.engine = get_synthesis_engine()
+                tts = self.engine.wait_ready()
             except Exception as e:
                 self.progress_updated.emit(0, f"TTS模型初始化失败: {str(e)}")
                 # 发出所有文本转换失败的信号
@@ -115,6 +121,12 @@ class MultiVoiceTTSWorker(QThread):
             for i, item in enumerate(self.text_items):
                 if self.is_cancelled:
                     break
+                
+                # 预取后续条目的文本正则化和分句结果，与当前条目的合成并行进行
+                for next_item in self.text_items[i + 1:i + 1 + TEXT_PREFETCH_DEPTH]:
+                    next_params = next_item.get('tts_params', {})
+                    tts.prefetch_text(next_item['text_content'],
+                                      int(next_params.get('max_text_tokens_per_sentence', 120)))
                     
                 text_id = item['text_id']
                 text_content = item['text_content']
@@ -147,49 +159,61 @@ class MultiVoiceTTSWorker(QThread):
                     infer_mode = item.get('infer_mode', '普通推理')
                     
                     # 设置完整的TTS参数（使用表格中的用户配置）
-                    kwargs = {
-                        "do_sample": bool(tts_params.get('do_sample', True)),
-                        "top_p": float(tts_params.get('top_p', 0.8)),
-                        "top_k": int(tts_params.get('top_k', 30)) if int(tts_params.get('top_k', 30)) > 0 else None,
-                        "temperature": float(tts_params.get('temperature', 1.0)),
-                        "length_penalty": float(tts_params.get('length_penalty', 1.0)),
-                        "num_beams": int(tts_params.get('num_beams', 3)),
-                        "repetition_penalty": float(tts_params.get('repetition_penalty', 10.0)),
-                        "max_mel_tokens": int(tts_params.get('max_mel_tokens', 2048)),
-                    }
+                    kwargs = tts_generation_kwargs(tts_params)
+                    
+                    # 随机种子由文本ID派生，未修改的文本重新转换时结果可复现
+                    seed = tts_params.get('seed', text_id)
                     
                     # 获取分句参数
                     max_text_tokens = int(tts_params.get('max_text_tokens_per_sentence', 120))
                     sentences_bucket_size = int(tts_params.get('sentences_bucket_max_size', 4))
                     
-                    # 执行TTS转换 - 使用用户配置的参数
+                    # 执行TTS转换 - 使用用户配置的参数，以批量优先级排队，试听请求可在分句边界插队
                     if infer_mode == "普通推理":
-                        tts.infer(
+                        self.current_future = self.engine.submit(
                             reference_voice, 
                             text_content, 
                             output_path, 
+                            priority=PRIORITY_BATCH,
+                            return_profile=True,
+                            return_result=True,
                             verbose=True,
                             max_text_tokens_per_sentence=max_text_tokens,
+                            seed=seed,
                             **kwargs
                         )
                     else:
                         # 批次推理
-                        tts.infer_fast(
+                        self.current_future = self.engine.submit(
                             reference_voice, 
                             text_content, 
                             output_path, 
+                            priority=PRIORITY_BATCH,
+                            return_profile=True,
+                            return_result=True,
+                            fast=True,
                             verbose=True,
                             max_text_tokens_per_sentence=max_text_tokens,
+                            seed=seed,
                             sentences_bucket_max_size=sentences_bucket_size,
                             **kwargs
                         )
+                    if self.is_cancelled:
+                        self.engine.cancel(self.current_future)
+                    result, profile = self.current_future.result()
+                    self.profile_ready.emit(text_id, profile.to_dict())
                     
-                    # 获取音频时长
-                    audio_duration = self.get_audio_duration(output_path)
+                    # 音频时长直接取自合成结果，文件在后台写入，写完后再通知界面
+                    audio_duration = result.duration
+                    result.wait_saved()
                     
                     # 转换成功
                     self.conversion_finished.emit(text_id, output_path, True, audio_duration)
                     
+                except (SynthesisCancelled, CancelledError):
+                    # 用户停止转换，当前条目未完成
+                    self.progress_updated.emit(progress, "转换已取消")
+                    break
                 except Exception as e:
                     # 转换失败
                     error_msg = f"转换失败: {str(e)}"
@@ -295,8 +319,10 @@ class MultiVoiceTTSWorker(QThread):
         return safe_name
         
     def cancel(self):
-        """取消转换"""
+        """取消转换：正在进行的合成在下一个解码步停止"""
         self.is_cancelled = True
+        if self.engine is not None and self.current_future is not None:
+            self.engine.cancel(self.current_future)
 
 class MultiVoiceProject:
     """多人语音合成项目类"""
@@ -1681,6 +1707,7 @@ class MultiVoiceTTSManager(QWidget):
         self.tts_worker.progress_updated.connect(self.on_progress_updated)
         self.tts_worker.conversion_finished.connect(self.on_conversion_finished)
         self.tts_worker.error_occurred.connect(self.on_error_occurred)
+        self.tts_worker.profile_ready.connect(self.on_profile_ready)
         self.tts_worker.finished.connect(self.on_worker_finished)
         self.tts_worker.start()
         
@@ -1991,6 +2018,11 @@ class MultiVoiceTTSManager(QWidget):
         """转换错误"""
         print(f"转换错误 [{text_id}]: {error_message}")
         
+    @pyqtSlot(str, dict)
+    def on_profile_ready(self, text_id, profile):
+        """单条文本的分阶段耗时"""
+        print(f"耗时 [{text_id[:8]}]: {format_profile(profile)}")
+        
     @pyqtSlot()
     def on_worker_finished(self):
         """工作线程完成"""
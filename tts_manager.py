@@ -3,6 +3,8 @@ import os
 import uuid
 import time
 import threading
+import tempfile
+from concurrent.futures import CancelledError
 from datetime import datetime
 try:
     import pygame
@@ -30,6 +32,8 @@ from qfluentwidgets import (CardWidget, StrongBodyLabel, BodyLabel,
                            PushButton, MessageBox, InfoBar, InfoBarPosition,
                            FluentIcon, ComboBox as FluentComboBox)
 
+from job_journal import JobJournal, JOB_JOURNAL_NAME, item_content_hash
+
 # 导入 pygame 音频播放器
 try:
     from pygame_audio_player import PygameAudioPlayer, get_audio_player
@@ -643,18 +647,92 @@ class AudioTreeDialog(QDialog):
         """获取选中的音频路径"""
         return self.selected_audio_path
 
+# 合成当前条目时提前处理文本的后续条目数
+TEXT_PREFETCH_DEPTH = 3
+# 分句合成结果缓存目录及大小上限（MB），重新转换未修改的文本时直接复用
+SENTENCE_CACHE_DIR = os.path.join(os.getcwd(), "cache", "tts_sentences")
+SENTENCE_CACHE_MAX_MB = 2048
+# 参考音频最长使用的秒数（去掉首尾静音后取语音最密集的片段），从视频中提取的长音频无需整段参与音色编码
+REFERENCE_MAX_SECONDS = 15
+# 试听音频的输出目录
+PREVIEW_DIR = os.path.join(tempfile.gettempdir(), "tts_preview")
+# 合成引擎空闲多少秒后卸载模型权重，下次转换或试听时自动重新加载
+ENGINE_IDLE_OFFLOAD_SECONDS = 600
+# 引擎空闲时可用内存（MB，GPU 为显存）低于该值即卸载模型权重，给插帧、播放等其他任务让出内存
+ENGINE_LOW_MEMORY_MB = 1024
+# 模型加载后在后台预热，第一次试听不再承担冷启动开销
+ENGINE_WARMUP = True
+
+_synthesis_engine = None
+_synthesis_engine_lock = threading.Lock()
+
+def get_synthesis_engine():
+    """获取常驻合成引擎（首次调用时在后台加载模型），转换和试听共用同一个模型和优先级队列"""
+    global _synthesis_engine
+    with _synthesis_engine_lock:
+        if _synthesis_engine is None:
+            from indextts.engine import SynthesisEngine
+            
+            def setup(tts):
+                tts.enable_sentence_cache(SENTENCE_CACHE_DIR, max_size_mb=SENTENCE_CACHE_MAX_MB)
+                tts.set_reference_options(trim_silence=True, max_seconds=REFERENCE_MAX_SECONDS)
+                
+            _synthesis_engine = SynthesisEngine(
+                model_dir="checkpoints",
+                cfg_path="checkpoints/config.yaml",
+                setup=setup,
+                idle_offload=ENGINE_IDLE_OFFLOAD_SECONDS,
+                low_memory_mb=ENGINE_LOW_MEMORY_MB,
+                warmup=ENGINE_WARMUP
+            )
+        return _synthesis_engine
+
+def release_synthesis_engine_memory():
+    """请求常驻引擎在空闲时卸载模型权重（引擎尚未创建时不做任何事），用于即将运行插帧等占用大量内存的任务"""
+    with _synthesis_engine_lock:
+        if _synthesis_engine is not None:
+            _synthesis_engine.request_offload()
+
+def format_profile(profile):
+    """把 ``SynthesisProfile.to_dict()`` 的结果格式化为一行耗时摘要"""
+    meta = profile.get('meta', {})
+    totals = profile.get('totals', {})
+    stages = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in totals.items() if name != profile.get('name'))
+    mel_tokens = sum(span.get('mel_tokens', 0) for span in profile.get('spans', []) if span['name'] == 'generate')
+    cold_start = "（冷启动）" if meta.get('cold_start') else ""
+    return (f"总计 {totals.get(profile.get('name'), 0.0):.2f}s{cold_start}, 音频 {meta.get('audio_seconds', 0.0):.2f}s, "
+            f"RTF {meta.get('rtf', 0.0):.3f}, mel tokens {mel_tokens} | {stages}")
+
+def tts_generation_kwargs(tts_params):
+    """表格中的TTS参数转换为推理参数"""
+    return {
+        "do_sample": bool(tts_params.get('do_sample', True)),
+        "top_p": float(tts_params.get('top_p', 0.8)),
+        "top_k": int(tts_params.get('top_k', 30)) if int(tts_params.get('top_k', 30)) > 0 else None,
+        "temperature": float(tts_params.get('temperature', 1.0)),
+        "length_penalty": float(tts_params.get('length_penalty', 1.0)),
+        "num_beams": int(tts_params.get('num_beams', 3)),
+        "repetition_penalty": float(tts_params.get('repetition_penalty', 10.0)),
+        "max_mel_tokens": int(tts_params.get('max_mel_tokens', 2048)),
+    }
+
 class TTSWorker(QThread):
     """TTS转换工作线程"""
     progress_updated = pyqtSignal(int, str)  # 进度, 状态信息
     conversion_finished = pyqtSignal(str, str, bool)  # text_id, output_path, success
     error_occurred = pyqtSignal(str, str)  # text_id, error_message
+    profile_ready = pyqtSignal(str, dict)  # text_id, SynthesisProfile.to_dict()
+    duration_ready = pyqtSignal(str, float)  # output_path, 音频时长（秒）
     
-    def __init__(self, text_items, draft_file_path=None, draft_data=None):
+    def __init__(self, text_items, draft_file_path=None, draft_data=None, resume_job_id=None):
         super().__init__()
         self.text_items = text_items
         self.draft_file_path = draft_file_path
         self.draft_data = draft_data
+        self.resume_job_id = resume_job_id
         self.is_cancelled = False
+        self.engine = None
+        self.current_future = None
         
     def run(self):
         """执行TTS转换"""
@@ -671,23 +749,45 @@ class TTSWorker(QThread):
             
             # 导入TTS模块
             try:
-                from indextts.infer import IndexTTS
+                from indextts.engine import PRIORITY_BATCH
+                from indextts.utils.cancellation import SynthesisCancelled
+                self.engine = get_synthesis_engine()
             except ImportError as e:
                 self.progress_updated.emit(0, f"TTS模块导入失败: {str(e)}")
                 return
             
-            # 初始化TTS模型
+            # 输出目录 - 放到draft文件同目录的textReading文件夹
+            if self.draft_file_path:
+                draft_dir = os.path.dirname(self.draft_file_path)
+            else:
+                draft_dir = os.path.dirname(os.path.abspath("draft_content.json"))
+            textreading_dir = os.path.join(draft_dir, "textReading")
+            
+            # 任务日志：记录已完成的条目，中断后可恢复
+            journal = JobJournal(os.path.join(draft_dir, JOB_JOURNAL_NAME))
+            if self.resume_job_id:
+                job_id = self.resume_job_id
+                completed_items = journal.completed_items(job_id)
+            else:
+                job_id = journal.start_job(self.text_items)
+                completed_items = {}
+            has_failure = False
+            
+            # 等待常驻模型加载完成（只在第一次转换时加载）
             self.progress_updated.emit(0, "正在初始化TTS模型...")
-            tts = IndexTTS(
-                model_dir="checkpoints",
-                cfg_path="checkpoints/config.yaml"
-            )
+            tts = self.engine.wait_ready()
             
             total_items = len(self.text_items)
             
             for i, item in enumerate(self.text_items):
                 if self.is_cancelled:
                     break
+                
+                # 预取后续条目的文本正则化和分句结果，与当前条目的合成并行进行
+                for next_item in self.text_items[i + 1:i + 1 + TEXT_PREFETCH_DEPTH]:
+                    next_params = next_item.get('tts_params', {})
+                    tts.prefetch_text(next_item['text_content'],
+                                      int(next_params.get('max_text_tokens_per_sentence', 120)))
                     
                 text_id = item['text_id']
                 text_content = item['text_content']
@@ -695,6 +795,16 @@ class TTSWorker(QThread):
                 
                 # 更新进度
                 progress = int((i / total_items) * 100)
+                
+                # 恢复任务时跳过内容未变且输出文件仍存在的条目
+                content_hash = item_content_hash(item)
+                completed = completed_items.get(text_id)
+                if (completed and completed.get('content_hash') == content_hash
+                        and os.path.exists(completed.get('output_path', ''))):
+                    self.progress_updated.emit(progress, f"跳过已完成: {text_content[:20]}...")
+                    self.conversion_finished.emit(text_id, completed['output_path'], True)
+                    continue
+                
                 self.progress_updated.emit(progress, f"正在转换: {text_content[:20]}...")
                 
                 try:
@@ -702,13 +812,6 @@ class TTSWorker(QThread):
                     if not reference_voice or not os.path.exists(reference_voice):
                         raise Exception("参考音频文件不存在")
                     
-                    # 生成输出路径 - 放到draft文件同目录的textReading文件夹
-                    if self.draft_file_path:
-                        draft_dir = os.path.dirname(self.draft_file_path)
-                    else:
-                        draft_dir = os.path.dirname(os.path.abspath("draft_content.json"))
-                    
-                    textreading_dir = os.path.join(draft_dir, "textReading")
                     os.makedirs(textreading_dir, exist_ok=True)
                     
                     # 检查是否已存在该文本的音频文件
@@ -754,54 +857,74 @@ class TTSWorker(QThread):
                     infer_mode = item.get('infer_mode', '普通推理')
                     
                     # 设置完整的TTS参数（使用表格中的用户配置）
-                    kwargs = {
-                        "do_sample": bool(tts_params.get('do_sample', True)),
-                        "top_p": float(tts_params.get('top_p', 0.8)),
-                        "top_k": int(tts_params.get('top_k', 30)) if int(tts_params.get('top_k', 30)) > 0 else None,
-                        "temperature": float(tts_params.get('temperature', 1.0)),
-                        "length_penalty": float(tts_params.get('length_penalty', 1.0)),
-                        "num_beams": int(tts_params.get('num_beams', 3)),
-                        "repetition_penalty": float(tts_params.get('repetition_penalty', 10.0)),
-                        "max_mel_tokens": int(tts_params.get('max_mel_tokens', 2048)),
-                    }
+                    kwargs = tts_generation_kwargs(tts_params)
+                    
+                    # 随机种子由文本ID派生，未修改的文本重新转换时结果可复现
+                    seed = tts_params.get('seed', text_id)
                     
                     # 获取分句参数
                     max_text_tokens = int(tts_params.get('max_text_tokens_per_sentence', 120))
                     sentences_bucket_size = int(tts_params.get('sentences_bucket_max_size', 4))
                     
-                    # 执行TTS转换 - 使用用户配置的参数
+                    # 执行TTS转换 - 使用用户配置的参数，以批量优先级排队，试听请求可在分句边界插队
                     if infer_mode == "普通推理":
-                        tts.infer(
+                        self.current_future = self.engine.submit(
                             reference_voice, 
                             text_content, 
                             output_path, 
+                            priority=PRIORITY_BATCH,
+                            return_profile=True,
+                            return_result=True,
                             verbose=True,
                             max_text_tokens_per_sentence=max_text_tokens,
+                            seed=seed,
                             **kwargs
                         )
                     else:
                         # 批次推理
-                        tts.infer_fast(
+                        self.current_future = self.engine.submit(
                             reference_voice, 
                             text_content, 
                             output_path, 
+                            priority=PRIORITY_BATCH,
+                            return_profile=True,
+                            return_result=True,
+                            fast=True,
                             verbose=True,
                             max_text_tokens_per_sentence=max_text_tokens,
-                            sentences_bucket_size=sentences_bucket_size,
+                            seed=seed,
+                            sentences_bucket_max_size=sentences_bucket_size,
                             **kwargs
                         )
+                    if self.is_cancelled:
+                        self.engine.cancel(self.current_future)
+                    result, profile = self.current_future.result()
+                    self.profile_ready.emit(text_id, profile.to_dict())
+                    
+                    # 音频文件在后台写入，写完后再通知界面；时长直接取自合成结果，不必再探测文件
+                    result.wait_saved()
+                    self.duration_ready.emit(output_path, result.duration)
                     
                     # 转换成功
+                    journal.record_item(job_id, text_id, content_hash, output_path)
                     self.conversion_finished.emit(text_id, output_path, True)
                     
+                except (SynthesisCancelled, CancelledError):
+                    # 用户停止转换，当前条目未完成
+                    self.progress_updated.emit(progress, "转换已取消")
+                    break
                 except Exception as e:
                     # 转换失败
+                    has_failure = True
                     error_msg = f"转换失败: {str(e)}"
                     self.error_occurred.emit(text_id, error_msg)
                     self.conversion_finished.emit(text_id, "", False)
             
             # 完成
             if not self.is_cancelled:
+                # 有失败条目时保留任务，可通过“恢复上次任务”重试
+                if not has_failure:
+                    journal.finish_job(job_id)
                 self.progress_updated.emit(100, "转换完成!")
                 
         except Exception as e:
@@ -848,8 +971,42 @@ class TTSWorker(QThread):
         return safe_text
         
     def cancel(self):
-        """取消转换"""
+        """取消转换：正在进行的合成在下一个解码步停止"""
         self.is_cancelled = True
+        if self.engine is not None and self.current_future is not None:
+            self.engine.cancel(self.current_future)
+
+class TTSPreviewWorker(QThread):
+    """试听工作线程：以交互优先级合成单条文本，正在进行的批量转换在分句边界让出"""
+    preview_ready = pyqtSignal(str, str)  # text_id, output_path
+    error_occurred = pyqtSignal(str, str)  # text_id, error_message
+    
+    def __init__(self, text_item):
+        super().__init__()
+        self.text_item = text_item
+        
+    def run(self):
+        text_id = self.text_item['text_id']
+        try:
+            from indextts.engine import PRIORITY_INTERACTIVE
+            engine = get_synthesis_engine()
+            engine.wait_ready()
+            
+            tts_params = self.text_item.get('tts_params', {})
+            os.makedirs(PREVIEW_DIR, exist_ok=True)
+            output_path = os.path.join(PREVIEW_DIR, f"{text_id}.wav")
+            engine.submit(
+                self.text_item['reference_voice'],
+                self.text_item['text_content'],
+                output_path,
+                priority=PRIORITY_INTERACTIVE,
+                max_text_tokens_per_sentence=int(tts_params.get('max_text_tokens_per_sentence', 120)),
+                seed=tts_params.get('seed', text_id),
+                **tts_generation_kwargs(tts_params)
+            ).result()
+            self.preview_ready.emit(text_id, output_path)
+        except Exception as e:
+            self.error_occurred.emit(text_id, f"试听失败: {str(e)}")
 
 class BatchParameterDialog(QDialog):
     """批量参数设置对话框"""
@@ -1174,7 +1331,9 @@ class TTSManager(QWidget):
         self.draft_data = None
         self.draft_file_path = None
         self.tts_worker = None
+        self.preview_workers = []
         self.text_configs = {}  # 存储每个文本的配置
+        self.synthesized_durations = {}  # 本次会话合成的音频路径 -> 时长（微秒），免去探测文件
         
         # 初始化音频播放器
         if PYGAME_PLAYER_AVAILABLE:
@@ -1217,6 +1376,14 @@ class TTSManager(QWidget):
         self.stop_btn.clicked.connect(self.stop_conversion)
         self.stop_btn.setEnabled(False)
         
+        self.preview_btn = PushButton(FluentIcon.MUSIC, "试听当前行")
+        self.preview_btn.clicked.connect(self.preview_current_text)
+        self.preview_btn.setToolTip("优先合成当前行并播放，正在进行的批量转换会暂停让出，试听完成后自动继续")
+        
+        self.resume_btn = PushButton(FluentIcon.HISTORY, "恢复上次任务")
+        self.resume_btn.clicked.connect(self.resume_last_job)
+        self.resume_btn.setToolTip("继续上次中断的转换任务，跳过已完成的文本")
+        
         self.batch_settings_btn = PushButton(FluentIcon.SETTING, "批量设置参数")
         self.batch_settings_btn.clicked.connect(self.open_batch_settings)
         
@@ -1241,6 +1408,8 @@ class TTSManager(QWidget):
         btn_layout.addWidget(self.batch_settings_btn)
         btn_layout.addWidget(self.convert_btn)
         btn_layout.addWidget(self.stop_btn)
+        btn_layout.addWidget(self.resume_btn)
+        btn_layout.addWidget(self.preview_btn)
         btn_layout.addWidget(self.save_btn)
         btn_layout.addWidget(self.auto_resize_btn)
         btn_layout.addWidget(self.play_all_btn)
@@ -2073,42 +2242,124 @@ class TTSManager(QWidget):
             if checkbox:
                 checkbox.setChecked(False)
 
+    def get_text_item(self, row):
+        """获取指定行的文本项"""
+        # 从内嵌的文本编辑器获取文本ID
+        text_edit = self.text_table.cellWidget(row, 1)
+        if not text_edit or not hasattr(text_edit, 'text_id'):
+            return None
+        text_id = text_edit.text_id
+        
+        # 从内嵌编辑器获取当前的文本内容
+        text_content = text_edit.get_text()
+        config = self.text_configs.get(text_id, {})
+        
+        return {
+            'text_id': text_id,
+            'text_content': text_content,
+            'reference_voice': config.get('reference_voice', ''),
+            'infer_mode': config.get('infer_mode', '普通推理'),
+            'tts_params': config.get('tts_params', {}),
+            'row': row
+        }
+        
     def get_selected_text_items(self):
         """获取选中的文本项"""
         selected_items = []
         for row in range(self.text_table.rowCount()):
             checkbox = self.text_table.cellWidget(row, 0)
             if checkbox and checkbox.isChecked():
-                # 从内嵌的文本编辑器获取文本ID
-                text_edit = self.text_table.cellWidget(row, 1)
-                if not text_edit or not hasattr(text_edit, 'text_id'):
+                item = self.get_text_item(row)
+                if item is None:
                     continue
-                text_id = text_edit.text_id
-                
-                # 从内嵌编辑器获取当前的文本内容
-                text_content = text_edit.get_text()
-                config = self.text_configs.get(text_id, {})
+                text_id, text_content = item['text_id'], item['text_content']
                 
                 # 调试信息：记录获取到的文本内容长度
                 print(f"DEBUG: 文本ID {text_id} 的内容长度: {len(text_content)}, 内容: {text_content[:50]}{'...' if len(text_content) > 50 else ''}")
                 
-                selected_items.append({
-                    'text_id': text_id,
-                    'text_content': text_content,
-                    'reference_voice': config.get('reference_voice', ''),
-                    'infer_mode': config.get('infer_mode', '普通推理'),
-                    'tts_params': config.get('tts_params', {}),
-                    'row': row
-                })
+                selected_items.append(item)
         return selected_items
         
+    def get_job_journal(self):
+        """获取当前工程的转换任务日志"""
+        if self.draft_file_path:
+            draft_dir = os.path.dirname(self.draft_file_path)
+        else:
+            draft_dir = os.path.dirname(os.path.abspath("draft_content.json"))
+        return JobJournal(os.path.join(draft_dir, JOB_JOURNAL_NAME))
+        
     def start_conversion(self):
         """开始转换"""
         selected_items = self.get_selected_text_items()
         if not selected_items:
             MessageBox("提示", "请先选择要转换的文本", self).exec()
             return
+        self.run_conversion(selected_items)
+        
+    def resume_last_job(self):
+        """恢复上次未完成的转换任务"""
+        if self.tts_worker and self.tts_worker.isRunning():
+            MessageBox("提示", "当前有转换任务正在进行", self).exec()
+            return
+        job = self.get_job_journal().last_unfinished_job()
+        if not job:
+            MessageBox("提示", "没有可恢复的转换任务", self).exec()
+            return
             
+        # 按任务中的文本ID重新读取当前表格中的文本和参数，已删除的文本跳过
+        rows = {}
+        for row in range(self.text_table.rowCount()):
+            item = self.get_text_item(row)
+            if item is not None:
+                rows[item['text_id']] = item
+        text_items = [rows[text_id] for text_id in job.get('text_ids', []) if text_id in rows]
+        if not text_items:
+            MessageBox("提示", "上次任务中的文本已不存在", self).exec()
+            return
+            
+        for row in range(self.text_table.rowCount()):
+            checkbox = self.text_table.cellWidget(row, 0)
+            if checkbox:
+                checkbox.setChecked(False)
+        for item in text_items:
+            checkbox = self.text_table.cellWidget(item['row'], 0)
+            if checkbox:
+                checkbox.setChecked(True)
+                
+        self.log_message(f"恢复任务 {job['job_id'][:8]} ({job.get('created', '')})：共 {len(text_items)} 个文本，"
+                         f"已完成 {len(job.get('completed', {}))} 个")
+        self.run_conversion(text_items, resume_job_id=job['job_id'])
+        
+    def preview_current_text(self):
+        """试听当前行（未选中行时试听第一个勾选的文本）"""
+        row = self.text_table.currentRow()
+        if row < 0:
+            selected_items = self.get_selected_text_items()
+            row = selected_items[0]['row'] if selected_items else -1
+        item = self.get_text_item(row) if row >= 0 else None
+        if item is None or not item['text_content'].strip():
+            MessageBox("提示", "请先选中要试听的文本", self).exec()
+            return
+        if not item['reference_voice'] or not os.path.exists(item['reference_voice']):
+            MessageBox("错误", "该文本缺少参考音频", self).exec()
+            return
+            
+        worker = TTSPreviewWorker(item)
+        worker.preview_ready.connect(self.on_preview_ready)
+        worker.error_occurred.connect(self.on_error_occurred)
+        worker.finished.connect(lambda w=worker: self.preview_workers.remove(w))
+        self.preview_workers.append(worker)
+        worker.start()
+        self.log_message(f"试听: {item['text_content'][:20]}...")
+        
+    @pyqtSlot(str, str)
+    def on_preview_ready(self, text_id, output_path):
+        """试听音频合成完成"""
+        self.log_message(f"试听音频已生成: {output_path}")
+        self.play_audio_file(output_path)
+        
+    def run_conversion(self, selected_items, resume_job_id=None):
+        """检查配置并启动转换线程"""
         # 检查配置
         missing_audio = []
         for item in selected_items:
@@ -2121,6 +2372,7 @@ class TTSManager(QWidget):
             
         # 更新UI状态
         self.convert_btn.setEnabled(False)
+        self.resume_btn.setEnabled(False)
         self.stop_btn.setEnabled(True)
         self.progress_bar.setVisible(True)
         self.progress_bar.setValue(0)
@@ -2140,10 +2392,13 @@ class TTSManager(QWidget):
             self.log_message(f"文本 {i}: 长度={len(text_content)}, 内容=\"{text_content}\"")
         
         # 启动工作线程
-        self.tts_worker = TTSWorker(selected_items, self.draft_file_path, self.draft_data)
+        self.tts_worker = TTSWorker(selected_items, self.draft_file_path, self.draft_data,
+                                    resume_job_id=resume_job_id)
         self.tts_worker.progress_updated.connect(self.on_progress_updated)
         self.tts_worker.conversion_finished.connect(self.on_conversion_finished)
         self.tts_worker.error_occurred.connect(self.on_error_occurred)
+        self.tts_worker.profile_ready.connect(self.on_profile_ready)
+        self.tts_worker.duration_ready.connect(self.on_duration_ready)
         self.tts_worker.finished.connect(self.on_worker_finished)
         self.tts_worker.start()
         
@@ -2228,10 +2483,21 @@ class TTSManager(QWidget):
         """转换错误"""
         self.log_message(f"转换错误 [{text_id}]: {error_message}")
         
+    @pyqtSlot(str, dict)
+    def on_profile_ready(self, text_id, profile):
+        """单条文本的分阶段耗时"""
+        self.log_message(f"耗时 [{text_id[:8]}]: {format_profile(profile)}")
+        
+    @pyqtSlot(str, float)
+    def on_duration_ready(self, output_path, duration):
+        """记录合成结果的时长，更新工程文件时不必再读取音频"""
+        self.synthesized_durations[os.path.abspath(output_path)] = int(duration * 1000000)
+        
     @pyqtSlot()
     def on_worker_finished(self):
         """工作线程完成"""
         self.convert_btn.setEnabled(True)
+        self.resume_btn.setEnabled(True)
         self.stop_btn.setEnabled(False)
         self.progress_bar.setVisible(False)
         self.status_label.setText("转换完成")
@@ -3025,6 +3291,7 @@ class TTSManager(QWidget):
     def on_worker_finished(self):
         """工作线程完成"""
         self.convert_btn.setEnabled(True)
+        self.resume_btn.setEnabled(True)
         self.stop_btn.setEnabled(False)
         self.progress_bar.setVisible(False)
         self.status_label.setText("转换完成")
@@ -3042,6 +3309,10 @@ class TTSManager(QWidget):
             
     def get_audio_duration(self, audio_path):
         """获取音频时长（微秒）"""
+        # 本次合成的音频直接使用合成结果的时长
+        known_duration = self.synthesized_durations.get(os.path.abspath(audio_path))
+        if known_duration is not None:
+            return known_duration
         try:
             # 尝试使用多种方法获取音频时长
             duration_us = None